@@ -2,14 +2,21 @@
 Analyst interface component for data visualization and export.
 """
 
+import os
+import tempfile
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
-from database import queries
-from utils.validation import parse_timestamp
+from typing import Optional
+from urllib.parse import urlencode
+from components import charts
+from database import async_queries, queries
+from utils import frames
+from utils.export import (
+    EXPORT_FORMATS, export_filename, export_frames, sign_export_link, to_export_frame, write_export
+)
 from utils.i18n import t
-from utils.timezone import local_to_utc, utc_to_local, format_local_datetime
+from utils.timezone import local_to_utc, format_local_datetime
 
 
 def render_analyst_interface():
@@ -24,6 +31,42 @@ def render_analyst_interface():
         render_data_table_tab()
 
 
+# ============================================================================
+# RECORD FRAMES
+# ============================================================================
+
+# Assumed plot width used to pick the rollup tier and the LTTB target (about
+# one bucket or a few raw points per pixel)
+CHART_PIXEL_WIDTH = int(os.getenv("CHART_PIXEL_WIDTH", "1200"))
+
+# Public URL of the ingestion service (ingest_service.py). With the shared
+# EXPORT_LINK_SECRET set, exports stream from its /export endpoint through
+# signed links valid for EXPORT_LINK_TTL seconds
+EXPORT_SERVICE_URL = os.getenv("EXPORT_SERVICE_URL", "").rstrip("/")
+EXPORT_LINK_SECRET = os.getenv("EXPORT_LINK_SECRET", "")
+EXPORT_LINK_TTL = int(os.getenv("EXPORT_LINK_TTL", "600"))
+
+
+def records_to_frame(records: list) -> pd.DataFrame:
+    """Convert a chunk of record dicts into a DataFrame with local timestamps."""
+    return frames.records_to_frame(records, queries.sensor_catalog.index_for)
+
+
+def series_to_frame(columns: pd.DataFrame) -> pd.DataFrame:
+    """Convert cached record columns into a DataFrame with local timestamps."""
+    return frames.columns_to_frame(columns, queries.sensor_catalog.index_for)
+
+
+def to_display_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Select, rename and format record columns for table display."""
+    display_df = to_export_frame(df)
+
+    # Format timestamp (already in local timezone)
+    display_df['Timestamp'] = display_df['Timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S')
+
+    return display_df
+
+
 # ============================================================================
 # CHARTS TAB
 # ============================================================================
@@ -102,105 +145,129 @@ def render_charts_tab():
         st.error(f"❌ Failed to render charts: {str(e)}")
 
 
+def get_chart_zoom(zoom_key: tuple) -> Optional[tuple]:
+    """Return the zoomed (start, end) UTC range for this chart, if any."""
+    zoom = st.session_state.get('chart_zoom')
+    if zoom and zoom['key'] == zoom_key:
+        return zoom['range']
+    return None
+
+
+def apply_box_zoom(event, zoom_key: tuple, start_date: datetime, end_date: datetime) -> bool:
+    """
+    Store a box selection on the chart as the new zoom range.
+
+    Box x coordinates are local wall-clock times; they are converted to UTC
+    and clamped to the selected date range.
+
+    Returns:
+        True if a new zoom range was stored
+    """
+    boxes = event.selection.get('box', []) if event else []
+    if not boxes or not boxes[0].get('x'):
+        return False
+
+    x0, x1 = sorted(pd.Timestamp(x).to_pydatetime() for x in boxes[0]['x'])
+    zoom_start = max(local_to_utc(x0), start_date)
+    zoom_end = min(local_to_utc(x1), end_date)
+    if zoom_start >= zoom_end:
+        return False
+
+    st.session_state.chart_zoom = {'key': zoom_key, 'range': (zoom_start, zoom_end)}
+    # New widget key, so the handled selection is not replayed on rerun
+    st.session_state.chart_zoom_version = st.session_state.get('chart_zoom_version', 0) + 1
+    return True
+
+
 def render_chart(sensor_ids: list, start_date: datetime, end_date: datetime):
     """Render Plotly line chart for selected sensors."""
     try:
+        # A box selection zooms in: the narrower range is re-read (and
+        # re-downsampled) at full resolution
+        zoom_key = (tuple(sensor_ids), start_date, end_date)
+        zoom = get_chart_zoom(zoom_key)
+        view_start, view_end = zoom or (start_date, end_date)
+
+        # Long ranges read pre-aggregated rollups, short ones plot raw records
+        tier = queries.plan_chart_query(view_start, view_end, CHART_PIXEL_WIDTH)
+
         with st.spinner("Loading..."):
-            records = queries.get_records_for_chart(
-                sensor_ids=sensor_ids,
-                start_date=start_date,
-                end_date=end_date
+            # The chart read and the summary statistics run concurrently
+            if tier:
+                chart_read = async_queries.call_sync(
+                    queries.get_rollup_records, sensor_ids, view_start, view_end, tier
+                )
+            else:
+                chart_read = async_queries.call_sync(
+                    queries.get_series_records, sensor_ids, view_start, view_end
+                )
+            chart_rows, stats_rows = async_queries.gather(
+                chart_read,
+                async_queries.call_sync(queries.get_record_stats, sensor_ids, view_start, view_end)
             )
+            df = frames.buckets_to_frame(chart_rows) if tier else series_to_frame(chart_rows)
 
-        if not records:
+        if df.empty:
             st.warning("⚠️ No data found for the selected sensors and date range.")
+            if zoom and st.button("🔍 Reset Zoom"):
+                st.session_state.pop('chart_zoom', None)
+                st.rerun()
             return
 
-        # Convert to DataFrame
-        df = pd.DataFrame(records)
-
-        # Extract sensor name and unit from nested structure
-        df['sensor_name'] = df['sensors'].apply(lambda x: x['name'])
-        df['sensor_unit'] = df['sensors'].apply(lambda x: x['unit'])
-
-        # Parse timestamps safely and convert to local timezone
-        df['recorded_at'] = df['recorded_at'].apply(lambda x: parse_timestamp(x) if isinstance(x, str) else x)
-        df['recorded_at'] = df['recorded_at'].apply(lambda x: utc_to_local(x))
-        df['recorded_at'] = pd.to_datetime(df['recorded_at'])
-
-        # Create Plotly figure
-        fig = go.Figure()
-
-        # Group by sensor and add traces
-        for sensor_id in sensor_ids:
-            sensor_df = df[df['sensor_id'] == sensor_id]
-
-            if not sensor_df.empty:
-                sensor_name = sensor_df.iloc[0]['sensor_name']
-                sensor_unit = sensor_df.iloc[0]['sensor_unit']
-
-                # Create hover text with unit
-                hover_template = f"<b>{sensor_name}</b><br>"
-                hover_template += "Time: %{x}<br>"
-                hover_template += f"Value: %{{y}}"
-                if sensor_unit:
-                    hover_template += f" {sensor_unit}"
-                hover_template += "<extra></extra>"
-
-                fig.add_trace(go.Scatter(
-                    x=sensor_df['recorded_at'],
-                    y=sensor_df['value'],
-                    mode='lines+markers',
-                    name=sensor_name,
-                    hovertemplate=hover_template,
-                    line=dict(width=2),
-                    marker=dict(size=6)
-                ))
-
-        # Update layout
-        fig.update_layout(
-            title="Sensor Data Over Time",
-            xaxis_title="Timestamp",
-            yaxis_title="Value",
-            hovermode='closest',
-            legend=dict(
-                yanchor="top",
-                y=0.99,
-                xanchor="left",
-                x=0.01,
-                bgcolor="rgba(255, 255, 255, 0.8)",
-                bordercolor="rgba(0, 0, 0, 0.2)",
-                borderwidth=1
-            ),
-            height=600,
-            margin=dict(l=50, r=50, t=50, b=50)
+        df = frames.compact_frame(df)
+        frames.log_memory(df, f"Chart frame ({len(sensor_ids)} sensors)")
+
+        # Group rows by sensor once and build traces from contiguous views;
+        # raw traces are reduced with LTTB and dense figures drawn with WebGL
+        series = charts.split_by_sensor(df, sensor_ids)
+        fig = charts.build_figure(
+            series,
+            bucketed=tier is not None,
+            chart_width=CHART_PIXEL_WIDTH,
+            view_key=f"{view_start.isoformat()}/{view_end.isoformat()}"
         )
-
-        # Enable interactive features
-        fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='rgba(128, 128, 128, 0.2)')
-        fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='rgba(128, 128, 128, 0.2)')
+        fig.update_layout(dragmode='select')
 
         # Display chart
-        st.plotly_chart(fig, use_container_width=True)
+        event = st.plotly_chart(
+            fig,
+            use_container_width=True,
+            on_select="rerun",
+            selection_mode="box",
+            key=f"analyst_chart_{st.session_state.get('chart_zoom_version', 0)}"
+        )
+        if apply_box_zoom(event, zoom_key, start_date, end_date):
+            st.rerun()
+
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            st.caption("Drag a box on the chart to zoom in at full resolution.")
+        with col2:
+            if zoom and st.button("🔍 Reset Zoom", use_container_width=True):
+                st.session_state.pop('chart_zoom', None)
+                st.rerun()
 
-        # Display summary statistics
+        # Display summary statistics (aggregated in the database)
         st.markdown("### Summary Statistics")
+        stats = {row['sensor_id']: row for row in stats_rows}
         summary_data = []
 
         for sensor_id in sensor_ids:
-            sensor_df = df[df['sensor_id'] == sensor_id]
+            row = stats.get(sensor_id)
 
-            if not sensor_df.empty:
-                sensor_name = sensor_df.iloc[0]['sensor_name']
-                sensor_unit = sensor_df.iloc[0]['sensor_unit']
-                unit_text = f" {sensor_unit}" if sensor_unit else ""
+            if row:
+                unit_text = f" {row['sensor_unit']}" if row['sensor_unit'] else ""
+                stddev = row['stddev_value']
 
                 summary_data.append({
-                    "Sensor": sensor_name,
-                    "Min": f"{sensor_df['value'].min():.2f}{unit_text}",
-                    "Max": f"{sensor_df['value'].max():.2f}{unit_text}",
-                    "Average": f"{sensor_df['value'].mean():.2f}{unit_text}",
-                    "Count": len(sensor_df)
+                    "Sensor": row['sensor_name'],
+                    "Min": f"{row['min_value']:.2f}{unit_text}",
+                    "Max": f"{row['max_value']:.2f}{unit_text}",
+                    "Average": f"{row['avg_value']:.2f}{unit_text}",
+                    "Std Dev": f"{stddev:.2f}{unit_text}" if stddev is not None else "-",
+                    "First": f"{row['first_value']:.2f}{unit_text}",
+                    "Last": f"{row['last_value']:.2f}{unit_text}",
+                    "Count": row['sample_count']
                 })
 
         summary_df = pd.DataFrame(summary_data)
@@ -272,42 +339,11 @@ def render_data_table_tab():
             start_date_local = datetime.now() - timedelta(days=90)
             start_date = local_to_utc(start_date_local)
 
-        # Fetch data
         sensor_ids = None if selected_sensor == "all" else [selected_sensor]
-        with st.spinner("Loading..."):
-            records = queries.get_records_for_chart(
-                sensor_ids=sensor_ids,
-                start_date=start_date,
-                end_date=end_date
-            )
-
-        if not records:
-            st.warning("⚠️ No data found matching the selected filters.")
-            return
-
-        # Convert to DataFrame
-        df = pd.DataFrame(records)
-        df['sensor_name'] = df['sensors'].apply(lambda x: x['name'])
-        df['sensor_unit'] = df['sensors'].apply(lambda x: x['unit'] if x['unit'] else '')
-
-        # Parse timestamps safely and convert to local timezone
-        df['recorded_at'] = df['recorded_at'].apply(lambda x: parse_timestamp(x) if isinstance(x, str) else x)
-        df['recorded_at'] = df['recorded_at'].apply(lambda x: utc_to_local(x))
-        df['recorded_at'] = pd.to_datetime(df['recorded_at'])
-
-        # Select and rename columns for display
-        display_df = df[['sensor_name', 'sensor_unit', 'recorded_at', 'value']].copy()
-        display_df.columns = ['Sensor', 'Unit', 'Timestamp', 'Value']
-
-        # Format timestamp (already in local timezone)
-        display_df['Timestamp'] = display_df['Timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S')
 
         # Sort options
         col1, col2 = st.columns([3, 1])
 
-        with col1:
-            st.markdown(f"**Showing {len(display_df)} records**")
-
         with col2:
             sort_order = st.selectbox(
                 "Sort by Time",
@@ -315,77 +351,223 @@ def render_data_table_tab():
                 label_visibility="collapsed"
             )
 
-        # Apply sorting
-        if sort_order == "Newest First":
-            display_df = display_df.sort_values('Timestamp', ascending=False)
-        else:
-            display_df = display_df.sort_values('Timestamp', ascending=True)
+        # Count in the database (planner estimate for very large results)
+        with st.spinner("Loading..."):
+            total_rows = queries.count_records(sensor_ids, start_date, end_date, estimated=True)
+
+        if total_rows == 0:
+            st.warning("⚠️ No data found matching the selected filters.")
+            return
+
+        with col1:
+            if total_rows > queries.RECORDS_PAGE_SIZE:
+                st.markdown(f"**Showing about {total_rows:,} records**")
+            else:
+                st.markdown(f"**Showing {total_rows} records**")
+
+        # Rolling ranges ("Last 7 days") move with the clock, so pagination
+        # is keyed on the filter choices rather than the computed dates
+        table_key = (selected_sensor, date_range_option, sort_order)
+        if date_range_option == "Custom":
+            table_key += (start_date, end_date)
 
         # Display table with pagination
-        render_paginated_table(display_df)
+        render_paginated_table(
+            sensor_ids, start_date, end_date, total_rows,
+            newest_first=sort_order == "Newest First",
+            table_key=table_key
+        )
 
-        # CSV Export
+        # Export
         st.markdown("### Export Data")
-        col1, col2 = st.columns([3, 1])
+        render_export(sensor_ids, start_date, end_date, newest_first=sort_order == "Newest First")
 
-        with col1:
-            st.markdown("Download the displayed data as CSV")
+    except Exception as e:
+        st.error(f"❌ Failed to render data table: {str(e)}")
 
-        with col2:
-            csv_data = display_df.to_csv(index=False)
-            filename = f"biogas_sensor_data_{datetime.now().strftime('%Y%m%d')}.csv"
-
-            st.download_button(
-                label="📥 Download CSV",
-                data=csv_data,
-                file_name=filename,
-                mime="text/csv",
+
+def iter_export_frames(sensor_ids: Optional[list], start_date: Optional[datetime],
+                       end_date: Optional[datetime], newest_first: bool = True):
+    """Yield export frames one keyset page at a time."""
+    return export_frames(
+        queries.iter_records(
+            sensor_ids=sensor_ids,
+            start_date=start_date,
+            end_date=end_date,
+            descending=newest_first
+        ),
+        queries.sensor_catalog.index_for
+    )
+
+
+def render_export(sensor_ids: Optional[list], start_date: Optional[datetime],
+                  end_date: Optional[datetime], newest_first: bool = True):
+    """
+    Render format choice and a download of the displayed data.
+
+    With EXPORT_SERVICE_URL and EXPORT_LINK_SECRET configured, the button is
+    a signed link to the ingestion service's /export endpoint, which streams
+    the file page by page, so the app holds none of it. Otherwise the file
+    is built on demand by streaming pages to a temp file, and its bytes are
+    handed to st.download_button for this run only: they are not kept in
+    session state, so Streamlit releases them after the next rerun.
+    """
+    col1, col2, col3 = st.columns([2, 1, 1])
+
+    with col1:
+        st.markdown("Download the displayed data")
+
+    with col2:
+        fmt = st.selectbox(
+            "Format",
+            options=list(EXPORT_FORMATS.keys()),
+            format_func=lambda x: EXPORT_FORMATS[x][0],
+            label_visibility="collapsed"
+        )
+
+    with col3:
+        label, _, mime = EXPORT_FORMATS[fmt]
+
+        if EXPORT_SERVICE_URL and EXPORT_LINK_SECRET:
+            token = sign_export_link(
+                sensor_ids, start_date, end_date, newest_first, fmt, EXPORT_LINK_SECRET, EXPORT_LINK_TTL
+            )
+            st.link_button(
+                f"📥 Download {label}",
+                f"{EXPORT_SERVICE_URL}/export?{urlencode({'token': token})}",
                 use_container_width=True
             )
+            return
 
-    except Exception as e:
-        st.error(f"❌ Failed to render data table: {str(e)}")
-
+        # Built on demand from the chunked reader, not on every rerun
+        slot = st.empty()
+        if slot.button("📄 Prepare Export", use_container_width=True):
+            progress = st.empty()
+            with tempfile.NamedTemporaryFile(suffix=EXPORT_FORMATS[fmt][1], delete=False) as f:
+                export_path = f.name
+            try:
+                write_export(
+                    iter_export_frames(sensor_ids, start_date, end_date, newest_first),
+                    export_path, fmt,
+                    on_chunk=lambda size: progress.caption(f"{size / 1_000_000:.1f} MB written")
+                )
+                with open(export_path, 'rb') as f:
+                    export_data = f.read()
+            finally:
+                os.remove(export_path)
+            progress.empty()
+
+            slot.download_button(
+                label=f"📥 Download {label}",
+                data=export_data,
+                file_name=export_filename(fmt),
+                mime=mime,
+                use_container_width=True
+            )
 
-def render_paginated_table(df: pd.DataFrame, rows_per_page: int = 50):
-    """Render a paginated data table."""
-    total_rows = len(df)
-    total_pages = (total_rows + rows_per_page - 1) // rows_per_page
 
-    # Initialize page number in session state
-    if 'current_page' not in st.session_state:
-        st.session_state.current_page = 1
+def _step_page(number: int, step: int) -> int:
+    """
+    Page number one step forward (+1) or back (-1).
+
+    Numbers from the start stay >= 1 and numbers from the end stay <= -1:
+    stepping forward from the last page means rows were added after it was
+    fetched, and the page shown is still the last one.
+    """
+    if number < 0:
+        return min(number + step, -1)
+    return max(number + step, 1)
+
+
+def _page_label(number: int, total_pages: int, approximate: bool) -> str:
+    """Label of page `number` (counted from the first page, or from the last if negative)."""
+    if number > 0:
+        return f"Page {number} of {'about ' if approximate else ''}{total_pages:,}"
+    if number >= -1:
+        return "Last page"
+    return f"Page {-number} from the end"
+
+
+def render_paginated_table(sensor_ids: Optional[list], start_date: Optional[datetime],
+                           end_date: Optional[datetime], total_rows: int,
+                           newest_first: bool = True, table_key: tuple = (),
+                           rows_per_page: int = 50):
+    """
+    Render a paginated data table, fetching and formatting only the visible page.
+
+    The session keeps the page number and the keyset anchor the current page
+    was fetched with, so every page flip is one indexed range query no
+    matter how deep the page is. Each page is fetched with one extra row in
+    its direction of travel, which tells whether another page follows, so
+    Next and Last never depend on total_rows. total_rows (an estimate for
+    large results) is only shown as the approximate page count.
+
+    Pages reached from Last are a plain page of the newest (or oldest)
+    rows_per_page rows and are numbered from the end.
+    """
+    approximate = total_rows > queries.RECORDS_PAGE_SIZE
+    total_pages = max(1, (total_rows + rows_per_page - 1) // rows_per_page)
+
+    # Start over on page 1 whenever the filters or sort order change
+    page = st.session_state.get('table_page')
+    if page is None or page['key'] != table_key:
+        page = {'key': table_key, 'number': 1, 'anchor': {}}
+        st.session_state.table_page = page
+
+    # Walking backwards ('before' / 'from_end') the extra row comes first
+    backwards = bool(page['anchor'].get('before') or page['anchor'].get('from_end'))
+    records = queries.get_records_page(
+        sensor_ids, start_date, end_date,
+        page_size=rows_per_page + 1,
+        descending=newest_first,
+        **page['anchor']
+    )
+    if not records and page['number'] != 1:
+        # Rows under the anchor were deleted, go back to the first page
+        st.session_state.pop('table_page')
+        st.rerun()
+
+    more = len(records) > rows_per_page
+    records = records[-rows_per_page:] if backwards else records[:rows_per_page]
+
+    # number counts from the first page (1, 2, ...) or from the last (-1, -2, ...)
+    current = page['number']
+    has_previous = more if backwards else current != 1
+    has_next = bool(page['anchor'].get('before')) if backwards else more
+
+    def go_to(number: int, anchor: dict):
+        st.session_state.table_page = {'key': table_key, 'number': number, 'anchor': anchor}
+        st.rerun()
+
+    def key_of(record: dict) -> tuple:
+        return (record['recorded_at'], record['id'])
 
     # Pagination controls
     col1, col2, col3, col4, col5 = st.columns([1, 1, 2, 1, 1])
 
     with col1:
-        if st.button("◀◀ First", disabled=st.session_state.current_page == 1, use_container_width=True):
-            st.session_state.current_page = 1
-            st.rerun()
+        if st.button("◀◀ First", disabled=current == 1, use_container_width=True):
+            go_to(1, {})
 
     with col2:
-        if st.button("◀ Previous", disabled=st.session_state.current_page == 1, use_container_width=True):
-            st.session_state.current_page -= 1
-            st.rerun()
+        if st.button("◀ Previous", disabled=not has_previous or not records, use_container_width=True):
+            if current == 2:
+                go_to(1, {})
+            go_to(_step_page(current, -1), {'before': key_of(records[0])})
 
     with col3:
-        st.markdown(f"<div style='text-align: center; padding-top: 5px;'>Page {st.session_state.current_page} of {total_pages}</div>", unsafe_allow_html=True)
+        label = _page_label(current, total_pages, approximate)
+        st.markdown(f"<div style='text-align: center; padding-top: 5px;'>{label}</div>", unsafe_allow_html=True)
 
     with col4:
-        if st.button("Next ▶", disabled=st.session_state.current_page == total_pages, use_container_width=True):
-            st.session_state.current_page += 1
-            st.rerun()
+        if st.button("Next ▶", disabled=not has_next or not records, use_container_width=True):
+            go_to(_step_page(current, 1), {'after': key_of(records[-1])})
 
     with col5:
-        if st.button("Last ▶▶", disabled=st.session_state.current_page == total_pages, use_container_width=True):
-            st.session_state.current_page = total_pages
-            st.rerun()
-
-    # Calculate start and end indices
-    start_idx = (st.session_state.current_page - 1) * rows_per_page
-    end_idx = min(start_idx + rows_per_page, total_rows)
+        if st.button("Last ▶▶", disabled=not has_next, use_container_width=True):
+            go_to(-1, {'from_end': True})
 
     # Display page data
-    page_df = df.iloc[start_idx:end_idx]
-    st.dataframe(page_df, use_container_width=True, hide_index=True)
+    if records:
+        page_df = to_display_frame(records_to_frame(records))
+        st.dataframe(page_df, use_container_width=True, hide_index=True)
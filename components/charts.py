@@ -0,0 +1,311 @@
+"""
+Plotly chart building for the analyst interface.
+
+A chart frame holds the rows of every selected sensor. Instead of masking
+the frame once per sensor (O(sensors x rows)), the builder orders it by
+sensor once and hands each sensor contiguous slices of the underlying
+NumPy arrays, so building traces for 50+ sensors is one pass over the rows.
+"""
+
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from utils.downsample import lttb, minmax_lttb
+
+# Frame columns carried into per-sensor views when present
+SERIES_COLUMNS = ['value', 'min_value', 'max_value', 'sample_count']
+
+# Raw traces are reduced to this many points per pixel of chart width
+DOWNSAMPLE_POINTS_PER_PIXEL = float(os.getenv("DOWNSAMPLE_POINTS_PER_PIXEL", "2"))
+
+# minmax_lttb keeps every spike; lttb is the classic algorithm
+DOWNSAMPLE_METHOD = os.getenv("DOWNSAMPLE_METHOD", "minmax_lttb")
+
+DOWNSAMPLERS = {'lttb': lttb, 'minmax_lttb': minmax_lttb}
+
+# Above this many points in the whole figure, traces are drawn with WebGL
+# (Scattergl) instead of SVG
+WEBGL_POINT_THRESHOLD = int(os.getenv("WEBGL_POINT_THRESHOLD", "20000"))
+
+# Markers are only drawn for points at least this many pixels from both neighbours
+MARKER_MIN_SPACING_PX = float(os.getenv("MARKER_MIN_SPACING_PX", "8"))
+
+MARKER_SIZE = 6
+
+
+class SensorSeries:
+    """Rows of one sensor as contiguous array views, oldest first."""
+
+    def __init__(self, sensor_id: str, name: str, unit: str,
+                 x: np.ndarray, columns: Dict[str, np.ndarray]):
+        """
+        Args:
+            sensor_id: Sensor ID
+            name: Sensor name
+            unit: Unit of measurement ('' if none)
+            x: Timestamps as naive local datetime64 (wall-clock for the axis)
+            columns: Views of the value columns (see SERIES_COLUMNS)
+        """
+        self.sensor_id = sensor_id
+        self.name = name
+        self.unit = unit
+        self.x = x
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    @property
+    def y(self) -> np.ndarray:
+        return self.columns['value']
+
+    def take(self, indices: np.ndarray) -> "SensorSeries":
+        """New series holding only the given rows."""
+        return SensorSeries(
+            self.sensor_id, self.name, self.unit, self.x[indices],
+            {name: values[indices] for name, values in self.columns.items()}
+        )
+
+    def downsample(self, n_out: int, method: str = DOWNSAMPLE_METHOD) -> "SensorSeries":
+        """
+        Reduce the series to at most n_out visually representative points.
+
+        Args:
+            n_out: Target number of points
+            method: Key of DOWNSAMPLERS
+
+        Returns:
+            This series if it is already small enough, else a reduced copy
+        """
+        if len(self) <= n_out:
+            return self
+        return self.take(DOWNSAMPLERS[method](self.x, self.y, n_out))
+
+    def hover_template(self) -> str:
+        """Hover text with sensor name and unit."""
+        template = f"<b>{self.name}</b><br>Time: %{{x}}<br>Value: %{{y}}"
+        if self.unit:
+            template += f" {self.unit}"
+        return template + "<extra></extra>"
+
+
+def split_by_sensor(df: pd.DataFrame, sensor_ids: Optional[List[str]] = None) -> List[SensorSeries]:
+    """
+    Split a chart frame into per-sensor series in one pass.
+
+    Rows are ordered by sensor with a single stable sort (skipped when the
+    frame is already grouped, as series-cache and bucket reads are), and
+    each sensor gets slices of the sorted arrays, not copies or masks.
+
+    Args:
+        df: Chart frame with sensor_id, sensor_name, sensor_unit,
+            recorded_at (local timezone) and value columns
+        sensor_ids: Output order; sensors without rows are skipped
+            (default: order of first appearance)
+
+    Returns:
+        List of SensorSeries
+    """
+    if df.empty:
+        return []
+
+    codes, uniques = pd.factorize(df['sensor_id'], sort=False)
+    if len(codes) > 1 and np.any(codes[1:] < codes[:-1]):
+        order = np.argsort(codes, kind='stable')
+        codes = codes[order]
+    else:
+        order = None
+
+    def column(name: str) -> np.ndarray:
+        values = df[name].to_numpy()
+        return values if order is None else values[order]
+
+    timestamps = df['recorded_at']
+    if timestamps.dt.tz is not None:
+        timestamps = timestamps.dt.tz_localize(None)
+    x = timestamps.to_numpy()
+    x = x if order is None else x[order]
+
+    columns = {name: column(name) for name in SERIES_COLUMNS if name in df.columns}
+    names = column('sensor_name')
+    units = column('sensor_unit')
+
+    # Segment boundaries where the sensor code changes
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(codes)) + 1))
+    ends = np.concatenate((starts[1:], [len(codes)]))
+
+    by_id = {}
+    for start, end in zip(starts, ends):
+        sensor_id = str(uniques[codes[start]])
+        by_id[sensor_id] = SensorSeries(
+            sensor_id,
+            names[start],
+            units[start] or '',
+            x[start:end],
+            {name: values[start:end] for name, values in columns.items()},
+        )
+
+    if sensor_ids is None:
+        return list(by_id.values())
+    return [by_id[str(sensor_id)] for sensor_id in sensor_ids if str(sensor_id) in by_id]
+
+
+def marker_sizes(x: np.ndarray, x_span: float, chart_width: int) -> Optional[np.ndarray]:
+    """
+    Per-point marker sizes that hide markers where points are dense.
+
+    A point keeps its marker only if both neighbours are at least
+    MARKER_MIN_SPACING_PX pixels away on the x axis, so sparse stretches
+    show individual readings and dense ones are drawn as a plain line.
+
+    Args:
+        x: Timestamps (datetime64) of one trace
+        x_span: Width of the x axis range in nanoseconds
+        chart_width: Plot width in pixels
+
+    Returns:
+        Array of sizes (MARKER_SIZE or 0), or None if no point gets a marker
+    """
+    if len(x) == 0 or x_span <= 0:
+        return None
+
+    pixels = x.astype('datetime64[ns]').astype(np.int64) * (chart_width / x_span)
+    gaps = np.diff(pixels)
+    spacing = np.minimum(np.append(np.inf, gaps), np.append(gaps, np.inf))
+    sparse = spacing >= MARKER_MIN_SPACING_PX
+
+    if not sparse.any():
+        return None
+    return np.where(sparse, MARKER_SIZE, 0)
+
+
+def build_traces(series: SensorSeries, bucketed: bool = False, webgl: bool = False,
+                 marker_size: Optional[np.ndarray] = None) -> List[go.Scatter]:
+    """
+    Build the traces of one sensor.
+
+    Args:
+        series: Sensor series
+        bucketed: Series holds bucket aggregates (draw a min/max envelope)
+        webgl: Use Scattergl instead of SVG Scatter
+        marker_size: Per-point marker sizes for raw series (see marker_sizes);
+            None draws the line only
+
+    Returns:
+        List of traces, envelope first
+    """
+    scatter = go.Scattergl if webgl else go.Scatter
+    traces = []
+
+    if bucketed and 'min_value' in series.columns:
+        # Min/max envelope of each bucket, drawn behind the average line
+        traces.append(scatter(
+            x=series.x,
+            y=series.columns['max_value'],
+            mode='lines',
+            line=dict(width=0),
+            legendgroup=series.sensor_id,
+            showlegend=False,
+            hoverinfo='skip'
+        ))
+        traces.append(scatter(
+            x=series.x,
+            y=series.columns['min_value'],
+            mode='lines',
+            line=dict(width=0),
+            fill='tonexty',
+            legendgroup=series.sensor_id,
+            showlegend=False,
+            hoverinfo='skip'
+        ))
+
+    show_markers = not bucketed and marker_size is not None
+    traces.append(scatter(
+        x=series.x,
+        y=series.y,
+        mode='lines+markers' if show_markers else 'lines',
+        name=series.name,
+        legendgroup=series.sensor_id,
+        hovertemplate=series.hover_template(),
+        line=dict(width=2),
+        marker=dict(size=marker_size if show_markers else MARKER_SIZE)
+    ))
+    return traces
+
+
+def target_points(chart_width: int) -> int:
+    """Points per trace worth drawing on a chart of the given pixel width."""
+    return max(3, int(chart_width * DOWNSAMPLE_POINTS_PER_PIXEL))
+
+
+def build_figure(series_list: List[SensorSeries], bucketed: bool = False,
+                 chart_width: Optional[int] = None, view_key: Optional[str] = None) -> go.Figure:
+    """
+    Build the multi-sensor chart.
+
+    Rendering adapts to density: raw series are downsampled to the chart
+    width, markers are kept only where points are sparse, and above
+    WEBGL_POINT_THRESHOLD points the traces switch to WebGL.
+
+    Args:
+        series_list: Per-sensor series, in legend order
+        bucketed: Series hold bucket aggregates
+        chart_width: Plot width in pixels; raw series longer than
+            target_points(chart_width) are downsampled (default: no limit)
+        view_key: Identifies the loaded range; client-side pan/zoom is kept
+            across reruns until it changes
+
+    Returns:
+        Plotly figure
+    """
+    if chart_width and not bucketed:
+        n_out = target_points(chart_width)
+        series_list = [series.downsample(n_out) for series in series_list]
+
+    total_points = sum(len(series) for series in series_list)
+    webgl = total_points > WEBGL_POINT_THRESHOLD
+
+    # Marker spacing is measured against the shared x range of all traces
+    marker_width = chart_width or 1200
+    non_empty = [series.x for series in series_list if len(series)]
+    if non_empty:
+        x_min = min(x[0] for x in non_empty).astype('datetime64[ns]').astype(np.int64)
+        x_max = max(x[-1] for x in non_empty).astype('datetime64[ns]').astype(np.int64)
+        x_span = float(x_max - x_min)
+    else:
+        x_span = 0.0
+
+    traces = []
+    for series in series_list:
+        sizes = None if bucketed else marker_sizes(series.x, x_span, marker_width)
+        traces.extend(build_traces(series, bucketed, webgl, sizes))
+    fig = go.Figure(data=traces)
+
+    fig.update_layout(
+        title="Sensor Data Over Time",
+        xaxis_title="Timestamp",
+        yaxis_title="Value",
+        hovermode='closest',
+        legend=dict(
+            yanchor="top",
+            y=0.99,
+            xanchor="left",
+            x=0.01,
+            bgcolor="rgba(255, 255, 255, 0.8)",
+            bordercolor="rgba(0, 0, 0, 0.2)",
+            borderwidth=1
+        ),
+        height=600,
+        margin=dict(l=50, r=50, t=50, b=50),
+        uirevision=view_key
+    )
+
+    # Enable interactive features
+    fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor='rgba(128, 128, 128, 0.2)')
+    fig.update_yaxes(showgrid=True, gridwidth=1, gridcolor='rgba(128, 128, 128, 0.2)')
+
+    return fig
@@ -6,6 +6,10 @@ import streamlit as st
 from datetime import datetime
 from typing import Optional
 from database import queries
+from utils.bulk_import import (
+    DEFAULT_TIMESTAMP_FORMAT, TIMESTAMP_FORMATS, RejectionReport, read_import_header,
+    iter_import_chunks, guess_timestamp_column, match_sensor_columns, prepare_import_chunk
+)
 from utils.validation import validate_numeric_value, validate_timestamp, validate_required_field, parse_timestamp
 from utils.i18n import t
 from utils.timezone import local_to_utc, utc_to_local, format_local_datetime
@@ -182,6 +186,10 @@ def render_record_management():
     with st.expander(f"➕ {t('engineer.add_record')}", expanded=True):
         render_create_record_form()
 
+    # Bulk import from logger files - COLLAPSED by default
+    with st.expander(f"📥 {t('engineer.bulk_import')}", expanded=False):
+        render_bulk_import()
+
     # Display recent records - COLLAPSED by default, show 10 records
     record_limit = 10  # Mobile-optimized: show only 10
     with st.expander(f"📋 {t('engineer.recent_records')} ({t('engineer.last_n_records', n=record_limit)})", expanded=False):
@@ -241,22 +249,159 @@ def render_create_record_form():
                     return
 
                 try:
-                    with st.spinner("Loading..."):
-                        # Convert local time to UTC for storage
-                        recorded_at_utc = local_to_utc(recorded_at_local)
-                        queries.create_record(
-                            sensor_id=selected_sensor_id,
-                            recorded_at=recorded_at_utc,
-                            value=value
-                        )
+                    # Convert local time to UTC for storage
+                    recorded_at_utc = local_to_utc(recorded_at_local)
+                    # Committed to the local outbox, written to the database in the background
+                    queries.submit_record(
+                        sensor_id=selected_sensor_id,
+                        recorded_at=recorded_at_utc,
+                        value=value
+                    )
                     st.rerun()
                 except Exception as e:
                     st.error(f"❌ Failed to create record: {str(e)}")
 
+        render_outbox_status()
+
     except Exception as e:
         st.error(f"❌ Failed to load sensors: {str(e)}")
 
 
+def render_outbox_status():
+    """Show records waiting in the local outbox and any the database refused."""
+    if queries.record_outbox is None:
+        return
+
+    stats = queries.record_outbox.stats()
+    if stats['pending']:
+        message = f"🕓 {stats['pending']} record(s) saved on this device, waiting to sync"
+        if stats['last_error']:
+            message += f" (last attempt: {stats['last_error']})"
+        st.caption(message)
+
+    if not stats['rejected']:
+        return
+
+    st.warning(f"⚠️ {stats['rejected']} saved record(s) were refused by the database.")
+    sensors = queries.sensor_catalog.by_id()
+    for record in queries.record_outbox.rejected():
+        sensor = sensors.get(record['sensor_id'], {})
+        recorded_at = format_local_datetime(parse_timestamp(record['recorded_at']))
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            st.caption(
+                f"{sensor.get('name', record['sensor_id'])} · {recorded_at} · {record['value']} — "
+                f"{record['last_error']}"
+            )
+        with col2:
+            if st.button("🗑️ Dismiss", key=f"dismiss_outbox_{record['id']}", use_container_width=True):
+                queries.record_outbox.discard(record['id'])
+                st.rerun()
+
+
+def render_bulk_import():
+    """Render CSV/Excel upload that imports logger dumps in chunks."""
+    try:
+        sensors = queries.get_all_sensors()
+
+        if not sensors:
+            st.warning("⚠️ Please create a sensor first before adding records.")
+            return
+
+        uploaded_file = st.file_uploader(
+            "Logger file (CSV or Excel)",
+            type=["csv", "xlsx"],
+            key="bulk_import_file"
+        )
+        st.caption("One timestamp column in local time (or with a UTC offset), one column per sensor named like the sensor.")
+
+        if uploaded_file is None:
+            return
+
+        columns = read_import_header(uploaded_file, uploaded_file.name)
+        if not columns:
+            st.error("❌ The file has no header row.")
+            return
+
+        default_column = guess_timestamp_column(columns)
+        timestamp_column = st.selectbox(
+            "Timestamp column*",
+            options=columns,
+            index=columns.index(default_column)
+        )
+        timestamp_format = st.selectbox(
+            "Timestamp format*",
+            options=list(TIMESTAMP_FORMATS.keys()),
+            format_func=lambda x: TIMESTAMP_FORMATS[x],
+            help="Rows whose timestamp does not match this format are rejected and listed in the report."
+        )
+
+        column_map = match_sensor_columns(
+            [c for c in columns if c != timestamp_column], sensors
+        )
+        if not column_map:
+            st.warning("⚠️ No columns match an existing sensor name.")
+            return
+
+        sensor_names = {s['id']: s['name'] for s in sensors}
+        st.markdown("**Matched columns:** " + ", ".join(
+            f"{column} → {sensor_names[sensor_id]}" for column, sensor_id in column_map.items()
+        ))
+        ignored = [c for c in columns if c != timestamp_column and c not in column_map]
+        if ignored:
+            st.caption(f"Ignored columns: {', '.join(ignored)}")
+
+        if st.button("📥 Import", use_container_width=True):
+            run_bulk_import(uploaded_file, timestamp_column, column_map, timestamp_format)
+
+    except Exception as e:
+        st.error(f"❌ Failed to import records: {str(e)}")
+
+
+def run_bulk_import(uploaded_file, timestamp_column: str, column_map: dict,
+                    timestamp_format: str = DEFAULT_TIMESTAMP_FORMAT):
+    """Stream an uploaded file through validation and batched inserts."""
+    progress = st.progress(0.0, text="Importing...")
+    inserted = 0
+    rejections = RejectionReport()
+
+    for chunk, fraction in iter_import_chunks(uploaded_file, uploaded_file.name):
+        records, origins, chunk_rejections = prepare_import_chunk(
+            chunk, timestamp_column, column_map, timestamp_format
+        )
+        rejections.add(chunk_rejections)
+
+        if records:
+            result = queries.create_records_batch(records)
+            inserted += result['inserted']
+            rejections.add({
+                **origins[failure['index']],
+                "value": failure['row'][2],
+                "error": failure['error'],
+            } for failure in result['failed'])
+
+        progress.progress(fraction, text=f"Importing... {inserted} readings stored")
+
+    progress.progress(1.0, text=f"Done: {inserted} readings stored")
+
+    if not rejections.total:
+        st.success(f"✅ Imported {inserted} readings.")
+        return
+
+    st.warning(f"⚠️ Imported {inserted} readings, {rejections.total} cells rejected.")
+    if rejections.truncated:
+        st.caption(f"The report lists the first {len(rejections.rows)} rejected cells.")
+    report_df = rejections.to_frame()
+    st.dataframe(report_df.head(1000), use_container_width=True, hide_index=True)
+    st.download_button(
+        label="📥 Download rejection report",
+        data=report_df.to_csv(index=False),
+        file_name=f"import_rejections_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
+        mime="text/csv",
+        use_container_width=True
+    )
+
+
 def render_record_list(limit: int = 100):
     """Render list of recent records with edit and delete options."""
     try:
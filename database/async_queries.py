@@ -0,0 +1,288 @@
+"""
+Async query functions with concurrent fan-out.
+
+Independent reads (record partitions, counts, and sync queries wrapped
+with call_sync) are issued as coroutines and gathered, so a page waits
+for its slowest query instead of the sum of all of them. On Supabase they
+use the async client; other backends run their sync calls on worker
+threads.
+
+All coroutines run on one background event loop owned by this module, so
+the async client's connection pool stays bound to a single loop. Call them
+from sync code (Streamlit reruns) through run() or gather().
+
+Large range reads are split into disjoint time partitions that are fetched
+concurrently and concatenated in order (get_records_partitioned), so a
+multi-month load is limited by bandwidth rather than by the latency of one
+sequential chain of keyset pages.
+"""
+
+import os
+import math
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from database.backend import get_backend
+from database.metrics import instrumented
+from database.queries import RECORDS_PAGE_SIZE
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Partitioned range reads: rows aimed at per partition, most partitions per
+# range, and most partition requests in flight across all ranges
+PARTITION_TARGET_ROWS = int(os.getenv("PARTITION_TARGET_ROWS", "20000"))
+PARTITION_MAX_COUNT = int(os.getenv("PARTITION_MAX_COUNT", "16"))
+PARTITION_MAX_CONCURRENCY = int(os.getenv("PARTITION_MAX_CONCURRENCY", "8"))
+
+# Stored timestamps have microsecond precision, so ending a partition one
+# microsecond before the next one starts makes inclusive ranges disjoint
+_TIMESTAMP_RESOLUTION = timedelta(microseconds=1)
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+# Created on the background loop by the first partitioned read
+_partition_slots: Optional[asyncio.Semaphore] = None
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Get the background event loop, starting its thread on first use."""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever, name="async-queries", daemon=True
+                )
+                thread.start()
+                _loop = loop
+    return _loop
+
+
+def submit(coro: Awaitable) -> Future:
+    """
+    Schedule a coroutine on the background loop without waiting for it.
+
+    Returns:
+        concurrent.futures.Future with the coroutine's result
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _get_loop())
+
+
+def run(coro: Awaitable) -> Any:
+    """
+    Run a coroutine on the background loop and wait for its result.
+
+    Args:
+        coro: Coroutine to run
+
+    Returns:
+        The coroutine's result (exceptions are re-raised)
+    """
+    return submit(coro).result()
+
+
+def gather(*coros: Awaitable) -> List[Any]:
+    """
+    Run coroutines concurrently and wait for all of them.
+
+    Returns:
+        List of results in argument order
+    """
+    async def _gather():
+        return await asyncio.gather(*coros)
+
+    return run(_gather())
+
+
+async def call_sync(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run a blocking query function on a worker thread, so it can be gathered.
+
+    Args:
+        func: Sync query (e.g. from database.queries)
+        *args, **kwargs: Arguments passed to func
+
+    Returns:
+        func's result
+    """
+    return await asyncio.to_thread(func, *args, **kwargs)
+
+
+# ============================================================================
+# ANALYST QUERY OPERATIONS
+# ============================================================================
+
+@instrumented
+async def get_records_for_chart(sensor_ids: Optional[List[str]] = None,
+                                start_date: Optional[datetime] = None,
+                                end_date: Optional[datetime] = None,
+                                page_size: int = RECORDS_PAGE_SIZE) -> List[Dict[str, Any]]:
+    """
+    Fetch sensor records with optional filters, walking keyset pages.
+
+    Args:
+        sensor_ids: List of sensor IDs to filter by (optional)
+        start_date: Start of date range (optional)
+        end_date: End of date range (optional)
+        page_size: Number of rows per page (default: RECORDS_PAGE_SIZE)
+
+    Returns:
+        List of record dictionaries (id, sensor_id, recorded_at, value), oldest first
+    """
+    backend = get_backend()
+    records = []
+    last_key = None
+
+    while True:
+        page = await backend.fetch_records_page_async(
+            sensor_ids, start_date, end_date, last_key, page_size
+        )
+        records.extend(page)
+
+        if len(page) < page_size:
+            return records
+        last_key = (page[-1]["recorded_at"], page[-1]["id"])
+
+
+@instrumented
+async def count_records(sensor_ids: Optional[List[str]] = None,
+                        start_date: Optional[datetime] = None,
+                        end_date: Optional[datetime] = None,
+                        estimated: bool = False) -> int:
+    """
+    Count sensor records matching the filters.
+
+    Args:
+        estimated: Allow a planner estimate for large counts (see
+            StorageBackend.count_records)
+
+    Returns:
+        Number of matching records
+    """
+    return await get_backend().count_records_async(sensor_ids, start_date, end_date, estimated)
+
+
+def choose_partition_count(estimated_rows: int) -> int:
+    """
+    Number of time partitions for a range of the given size.
+
+    Args:
+        estimated_rows: Estimated rows in the range
+
+    Returns:
+        One partition per PARTITION_TARGET_ROWS rows, between 1 and
+        PARTITION_MAX_COUNT
+    """
+    return max(1, min(PARTITION_MAX_COUNT, math.ceil(estimated_rows / PARTITION_TARGET_ROWS)))
+
+
+def split_time_range(start_date: datetime, end_date: datetime,
+                     partitions: int) -> List[Tuple[datetime, datetime]]:
+    """
+    Split an inclusive time range into disjoint, equally long windows.
+
+    Args:
+        start_date: Start of range
+        end_date: End of range (inclusive)
+        partitions: Number of windows
+
+    Returns:
+        List of inclusive (start, end) windows, oldest first; together
+        they cover the range exactly once
+    """
+    if partitions <= 1:
+        return [(start_date, end_date)]
+    step = (end_date - start_date) / partitions
+    if step <= _TIMESTAMP_RESOLUTION:
+        return [(start_date, end_date)]
+
+    bounds = [start_date + step * i for i in range(partitions)] + [end_date]
+    windows = [(bounds[i], bounds[i + 1] - _TIMESTAMP_RESOLUTION) for i in range(partitions - 1)]
+    windows.append((bounds[-2], end_date))
+    return windows
+
+
+def _slots() -> asyncio.Semaphore:
+    """Shared limit on concurrent partition requests (created on the loop that uses it)."""
+    global _partition_slots
+    if _partition_slots is None:
+        _partition_slots = asyncio.Semaphore(PARTITION_MAX_CONCURRENCY)
+    return _partition_slots
+
+
+async def _fetch_partition(sensor_ids: Optional[List[str]], start_date: datetime,
+                           end_date: datetime) -> List[Dict[str, Any]]:
+    """Fetch one partition, waiting for a slot in the shared concurrency limit."""
+    async with _slots():
+        return await get_records_for_chart(sensor_ids, start_date, end_date)
+
+
+async def _count_window(sensor_ids: Optional[List[str]], start_date: datetime,
+                        end_date: datetime) -> int:
+    async with _slots():
+        return await get_backend().count_records_async(sensor_ids, start_date, end_date)
+
+
+@instrumented
+async def count_records_by_window(sensor_ids: Optional[List[str]],
+                                  windows: List[Tuple[datetime, datetime]]) -> List[int]:
+    """
+    Count records exactly in each time window, concurrently.
+
+    Requests share the PARTITION_MAX_CONCURRENCY limit with partitioned reads.
+
+    Args:
+        sensor_ids: List of sensor IDs to filter by (optional)
+        windows: Inclusive (start, end) windows
+
+    Returns:
+        One count per window, in order
+    """
+    return list(await asyncio.gather(*(
+        _count_window(sensor_ids, start_date, end_date) for start_date, end_date in windows
+    )))
+
+
+@instrumented
+async def get_records_partitioned(sensor_ids: Optional[List[str]] = None,
+                                  start_date: Optional[datetime] = None,
+                                  end_date: Optional[datetime] = None,
+                                  partitions: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Fetch a range as concurrent time partitions, reassembled in order.
+
+    The partition count follows the estimated row count (see
+    choose_partition_count), so small ranges stay a single request stream.
+    Open-ended ranges are not split.
+
+    Args:
+        sensor_ids: List of sensor IDs to filter by (optional)
+        start_date: Start of date range (optional)
+        end_date: End of date range (optional)
+        partitions: Number of partitions (default: from the estimated count)
+
+    Returns:
+        List of record dictionaries (id, sensor_id, recorded_at, value),
+        oldest first, exactly as get_records_for_chart returns them
+    """
+    if start_date is None or end_date is None:
+        return await get_records_for_chart(sensor_ids, start_date, end_date)
+
+    if partitions is None:
+        estimated_rows = await count_records(sensor_ids, start_date, end_date, estimated=True)
+        partitions = choose_partition_count(estimated_rows)
+
+    windows = split_time_range(start_date, end_date, partitions)
+    results = await asyncio.gather(*(
+        _fetch_partition(sensor_ids, window_start, window_end)
+        for window_start, window_end in windows
+    ))
+    if len(windows) > 1:
+        logger.info(f"✅ Fetched {sum(map(len, results))} records in {len(windows)} partitions")
+    return [row for rows in results for row in rows]
@@ -0,0 +1,277 @@
+"""
+Storage backend interface and configuration-based backend selection.
+
+Query functions in database/queries.py talk to a StorageBackend instead of
+a concrete database client, so the app can run against the hosted Supabase
+project or an embedded local database with the same code.
+
+Select the backend with the STORAGE_BACKEND environment variable:
+- "supabase" (default): hosted Supabase project (SUPABASE_URL, SUPABASE_KEY)
+- "sqlite": embedded SQLite file at SQLITE_PATH (default: biogas_sensor.db)
+"""
+
+import os
+import asyncio
+import logging
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Position of the last row of a page, used to request the next page
+PageKey = Tuple[str, str]
+
+# Rollup tiers of sensor_records (tier name -> bucket width in seconds), each
+# built from the one before it; day buckets are UTC days
+ROLLUP_TIERS: Dict[str, int] = {"1m": 60, "1h": 3600, "1d": 86400}
+
+
+class RejectedDataError(Exception):
+    """Raised when the database refuses the data itself (constraint, type or key errors)."""
+
+
+class RecordNotFoundError(LookupError):
+    """Raised when a record to update does not exist."""
+
+
+class StorageBackend(ABC):
+    """Storage operations for the sensors and sensor_records tables."""
+
+    name = "abstract"
+
+    # ------------------------------------------------------------------
+    # Sensors
+    # ------------------------------------------------------------------
+
+    @abstractmethod
+    def list_sensors(self) -> List[Dict[str, Any]]:
+        """Return all sensors ordered by name."""
+
+    @abstractmethod
+    def get_sensor(self, sensor_id: str) -> Optional[Dict[str, Any]]:
+        """Return one sensor or None if not found."""
+
+    @abstractmethod
+    def insert_sensor(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert a sensor and return the stored row."""
+
+    @abstractmethod
+    def update_sensor(self, sensor_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Update a sensor and return the stored row."""
+
+    @abstractmethod
+    def delete_sensor(self, sensor_id: str) -> None:
+        """Delete a sensor and, by cascade, its records."""
+
+    # ------------------------------------------------------------------
+    # Records
+    # ------------------------------------------------------------------
+
+    @abstractmethod
+    def list_recent_records(self, limit: int) -> List[Dict[str, Any]]:
+        """Return the newest records (id, sensor_id, recorded_at, value)."""
+
+    @abstractmethod
+    def get_record(self, record_id: str) -> Optional[Dict[str, Any]]:
+        """Return one record (id, sensor_id, recorded_at, value), or None."""
+
+    @abstractmethod
+    def insert_records(self, payloads: List[Dict[str, Any]],
+                       returning: bool = True,
+                       ignore_duplicates: bool = False) -> List[Dict[str, Any]]:
+        """
+        Insert records in one multi-row statement.
+
+        Args:
+            payloads: Dictionaries with keys sensor_id, recorded_at (ISO string),
+                value and optionally id (generated when missing)
+            returning: Return the stored rows (False returns an empty list)
+            ignore_duplicates: Skip payloads whose id is already stored, so a
+                batch can be resent safely (use with returning=False)
+
+        Raises:
+            RejectedDataError: If the database rejects any of the rows
+                (constraint, type or key errors). Transport, gateway, auth
+                and timeout failures raise other exceptions, and the same
+                rows may be resent.
+        """
+
+    @abstractmethod
+    def update_record(self, record_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Update a record and return the stored row.
+
+        Raises:
+            RecordNotFoundError: If no record has this ID
+        """
+
+    @abstractmethod
+    def delete_record(self, record_id: str) -> None:
+        """Delete a record."""
+
+    @abstractmethod
+    def fetch_records_page(self, sensor_ids: Optional[List[str]],
+                           start_date: Optional[datetime], end_date: Optional[datetime],
+                           after: Optional[PageKey], page_size: int,
+                           descending: bool = False) -> List[Dict[str, Any]]:
+        """
+        Return one page of records ordered by (recorded_at, id).
+
+        Rows have keys: id, sensor_id, recorded_at, value. Sensor metadata
+        is not included, callers join it from the sensor catalog.
+
+        Args:
+            after: (recorded_at, id) of the last row of the previous page, or None
+        """
+
+    @abstractmethod
+    def fetch_record_stats(self, sensor_ids: Optional[List[str]],
+                           start_date: Optional[datetime],
+                           end_date: Optional[datetime]) -> List[Dict[str, Any]]:
+        """
+        Return per-sensor summary statistics of the records in a range.
+
+        One row per sensor with records, ordered by sensor_id, with keys:
+        sensor_id, sample_count, min_value, max_value, avg_value,
+        stddev_value (None for a single reading), first_at, first_value,
+        last_at, last_value.
+        """
+
+    @abstractmethod
+    def has_rollups(self) -> bool:
+        """Return True if the rollup tiers exist (on Supabase: sensor_record_rollups.sql was applied)."""
+
+    @abstractmethod
+    def fetch_rollup_page(self, tier: str, sensor_ids: Optional[List[str]],
+                          start_date: datetime, end_date: datetime,
+                          after: Optional[PageKey], page_size: int) -> List[Dict[str, Any]]:
+        """
+        Return one page of a rollup tier ordered by (sensor_id, bucket_start).
+
+        Rows have keys: sensor_id, bucket_start, sample_count, min_value,
+        max_value, sum_value. Rollups are kept current by the backend on
+        every record write.
+
+        Args:
+            tier: Key of ROLLUP_TIERS
+            start_date: Buckets starting at or after this time (pass it
+                floored to the tier width to include the first partial bucket)
+            end_date: Buckets starting at or before this time
+            after: (sensor_id, bucket_start) of the last row of the previous page, or None
+        """
+
+    @abstractmethod
+    def fetch_changes_page(self, sensor_ids: List[str], since: str,
+                           after: Optional[PageKey], page_size: int) -> List[Dict[str, Any]]:
+        """
+        Return one page of records inserted or updated since a point in time.
+
+        Rows have keys: id, sensor_id, recorded_at, value, updated_at, and are
+        ordered by (updated_at, id).
+
+        Args:
+            sensor_ids: Sensors to look at
+            since: ISO timestamp; rows with updated_at >= since are returned
+            after: (updated_at, id) of the last row of the previous page, or None
+        """
+
+    @abstractmethod
+    def latest_update(self, sensor_ids: List[str]) -> Optional[str]:
+        """Return the newest updated_at of the sensors' records, or None if they have none."""
+
+    @abstractmethod
+    def count_records(self, sensor_ids: Optional[List[str]],
+                      start_date: Optional[datetime], end_date: Optional[datetime],
+                      estimated: bool = False) -> int:
+        """
+        Return the number of records matching the filters.
+
+        With estimated=True a backend may answer from planner statistics
+        instead of scanning when the count is large (PostgREST: above max-rows).
+        """
+
+    # ------------------------------------------------------------------
+    # Async variants
+    #
+    # Defaults run the sync method on a worker thread; backends with a
+    # native async client override them.
+    # ------------------------------------------------------------------
+
+    async def fetch_records_page_async(self, sensor_ids: Optional[List[str]],
+                                       start_date: Optional[datetime], end_date: Optional[datetime],
+                                       after: Optional[PageKey], page_size: int,
+                                       descending: bool = False) -> List[Dict[str, Any]]:
+        """Async fetch_records_page."""
+        return await asyncio.to_thread(
+            self.fetch_records_page, sensor_ids, start_date, end_date, after, page_size, descending
+        )
+
+    async def count_records_async(self, sensor_ids: Optional[List[str]],
+                                  start_date: Optional[datetime], end_date: Optional[datetime],
+                                  estimated: bool = False) -> int:
+        """Async count_records."""
+        return await asyncio.to_thread(self.count_records, sensor_ids, start_date, end_date, estimated)
+
+
+_backend: Optional[StorageBackend] = None
+_backend_lock = threading.Lock()
+
+
+def create_backend(kind: Optional[str] = None) -> StorageBackend:
+    """
+    Build a storage backend from configuration.
+
+    Args:
+        kind: Backend name, defaults to the STORAGE_BACKEND environment variable
+
+    Returns:
+        StorageBackend instance
+
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    kind = (kind or os.getenv("STORAGE_BACKEND", "supabase")).strip().lower()
+
+    if kind == "supabase":
+        from database.supabase_backend import SupabaseBackend
+        return SupabaseBackend()
+    if kind == "sqlite":
+        from database.sqlite_backend import SQLiteBackend
+        return SQLiteBackend(os.getenv("SQLITE_PATH", "biogas_sensor.db"))
+
+    raise ValueError(f"Unknown STORAGE_BACKEND '{kind}' (expected 'supabase' or 'sqlite')")
+
+
+def get_backend() -> StorageBackend:
+    """
+    Get the configured storage backend, creating it on first use.
+
+    Returns:
+        StorageBackend instance shared by the whole process
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = create_backend()
+                logger.info(f"🗄️ Using {_backend.name} storage backend")
+    return _backend
+
+
+def set_backend(backend: Optional[StorageBackend]) -> None:
+    """
+    Replace the process-wide storage backend (None resets to configuration).
+
+    Args:
+        backend: Backend to use from now on
+    """
+    global _backend
+    with _backend_lock:
+        _backend = backend
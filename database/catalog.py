@@ -0,0 +1,116 @@
+"""
+Process-wide in-memory sensor catalog.
+
+The sensors table is small and rarely changes, but nearly every rerun
+needs it. The catalog keeps one shared copy indexed by ID, reloads it after
+SENSOR_CATALOG_TTL seconds, and is invalidated by the sensor write
+functions in database/queries.py.
+"""
+
+import os
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Seconds before the catalog is reloaded even without local writes
+# (picks up changes made by other processes)
+SENSOR_CATALOG_TTL = float(os.getenv("SENSOR_CATALOG_TTL", "300"))
+
+
+class SensorCatalog:
+    """Thread-safe, TTL-bound cache of all sensors, indexed by ID."""
+
+    def __init__(self, loader: Callable[[], List[Dict[str, Any]]], ttl: float = SENSOR_CATALOG_TTL):
+        """
+        Args:
+            loader: Function returning all sensors ordered by name
+            ttl: Seconds a loaded catalog stays valid
+        """
+        self._loader = loader
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._sensors: Optional[List[Dict[str, Any]]] = None
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._loaded_at = 0.0
+
+    def _is_fresh(self) -> bool:
+        return self._sensors is not None and time.monotonic() - self._loaded_at < self._ttl
+
+    def _snapshot(self) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        """Get (sensors, index), reloading first if the catalog is empty or expired."""
+        sensors, by_id = self._sensors, self._by_id
+        if self._is_fresh() and sensors is not None:
+            return sensors, by_id
+
+        with self._lock:
+            # Another thread may have reloaded while we waited
+            if not self._is_fresh():
+                sensors = self._loader()
+                self._by_id = {str(sensor['id']): sensor for sensor in sensors}
+                self._sensors = sensors
+                self._loaded_at = time.monotonic()
+            return self._sensors, self._by_id
+
+    def all(self) -> List[Dict[str, Any]]:
+        """
+        Get all sensors ordered by name.
+
+        Returns:
+            List of sensor dictionaries (shared, do not modify)
+        """
+        sensors, _ = self._snapshot()
+        return list(sensors)
+
+    def get(self, sensor_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a sensor by ID.
+
+        Args:
+            sensor_id: UUID of the sensor
+
+        Returns:
+            Sensor dictionary or None if not in the catalog
+        """
+        _, by_id = self._snapshot()
+        return by_id.get(str(sensor_id))
+
+    def by_id(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the ID index of the catalog.
+
+        Returns:
+            Dictionary mapping sensor ID to sensor dictionary
+        """
+        _, by_id = self._snapshot()
+        return by_id
+
+    def index_for(self, sensor_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Get the ID index, reloading once if any of the given IDs is unknown.
+
+        Sensors created by another process are not in this catalog until it
+        expires; records referring to them trigger an early reload.
+
+        Args:
+            sensor_ids: Sensor IDs the caller is about to look up
+
+        Returns:
+            Dictionary mapping sensor ID to sensor dictionary
+        """
+        by_id = self.by_id()
+        if any(str(sensor_id) not in by_id for sensor_id in set(sensor_ids)):
+            self.invalidate()
+            by_id = self.by_id()
+        return by_id
+
+    def invalidate(self) -> None:
+        """Drop the cached sensors so the next read reloads them."""
+        with self._lock:
+            self._sensors = None
+            self._by_id = {}
+            self._loaded_at = 0.0
+        logger.info("🔄 Sensor catalog invalidated")
@@ -1,12 +1,29 @@
 """
 Supabase client wrapper for database connection.
+
+All Streamlit sessions share one client per process, so its HTTP pool is
+configured explicitly instead of using the library defaults:
+- HTTP/2 with keep-alive, so concurrent reruns multiplex over a few
+  long-lived TLS connections instead of reconnecting per request
+- Bounded pool size and connect/read/pool timeouts from environment variables
+- Connection retries, and one transparent retry of idempotent requests
+  when a kept-alive connection turns out to be dead
+- A health check after idle periods that rebuilds the client if the
+  server is unreachable
+
+get_pool_stats() reports occupancy and connection reuse for sizing.
 """
 
 import os
+import time
 import logging
-from typing import Optional
-from supabase import create_client, Client
+import threading
+from typing import Any, Dict, Optional, Union
+import httpx
+from postgrest import AsyncPostgrestClient, SyncPostgrestClient
+from supabase import AsyncClient, Client
 from dotenv import load_dotenv
+from database.metrics import add_response_bytes
 
 # Load environment variables
 load_dotenv()
@@ -15,17 +32,273 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Pool configuration
+MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("SUPABASE_MAX_KEEPALIVE", "10"))
+KEEPALIVE_EXPIRY = float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "30"))
+CONNECT_TIMEOUT = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("SUPABASE_READ_TIMEOUT", "30"))
+POOL_TIMEOUT = float(os.getenv("SUPABASE_POOL_TIMEOUT", "10"))
+CONNECT_RETRIES = int(os.getenv("SUPABASE_CONNECT_RETRIES", "2"))
+HEALTH_CHECK_INTERVAL = float(os.getenv("SUPABASE_HEALTH_CHECK_INTERVAL", "60"))
+
+# Methods that are safe to send again on a fresh connection
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# Errors raised when a kept-alive connection was closed by the server
+STALE_CONNECTION_ERRORS = (httpx.RemoteProtocolError, httpx.ReadError, httpx.WriteError)
+
+
+def pool_limits() -> httpx.Limits:
+    """Connection limits shared by the sync and async clients."""
+    return httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+
+
+def pool_timeout() -> httpx.Timeout:
+    """Timeouts shared by the sync and async clients."""
+    return httpx.Timeout(
+        connect=CONNECT_TIMEOUT, read=READ_TIMEOUT, write=READ_TIMEOUT, pool=POOL_TIMEOUT
+    )
+
+
+# ============================================================================
+# POOL STATISTICS
+# ============================================================================
+
+class _PoolStats:
+    """Request and connection counters shared by the pooled transports."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+        self.stale_retries = 0
+        self.errors = 0
+        self.reconnects = 0
+        self.last_response_at = 0.0
+
+    def add(self, **counts: int) -> None:
+        with self._lock:
+            for name, count in counts.items():
+                setattr(self, name, getattr(self, name) + count)
+
+    def trace(self, event: str, info: Dict[str, Any]) -> None:
+        """httpcore trace hook: count every new TCP connection."""
+        if event == "connection.connect_tcp.complete":
+            self.add(connections_opened=1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            reused = max(self.requests - self.connections_opened, 0)
+            return {
+                "requests": self.requests,
+                "connections_opened": self.connections_opened,
+                "reuse_ratio": round(reused / self.requests, 3) if self.requests else 0.0,
+                "stale_retries": self.stale_retries,
+                "errors": self.errors,
+                "reconnects": self.reconnects,
+            }
+
+
+_stats = _PoolStats()
+
+
+def _pool_occupancy(transport: Optional[httpx.BaseTransport]) -> Dict[str, int]:
+    """Count open and idle connections in a transport's pool."""
+    pool = getattr(transport, "_pool", None)
+    connections = list(getattr(pool, "connections", []))
+    idle = sum(1 for connection in connections if connection.is_idle())
+    return {"open": len(connections), "idle": idle, "active": len(connections) - idle}
+
+
+class _CountingStream(httpx.SyncByteStream):
+    """Response body stream that reports received bytes to the query metrics."""
+
+    def __init__(self, stream: httpx.SyncByteStream):
+        self._stream = stream
+
+    def __iter__(self):
+        for chunk in self._stream:
+            add_response_bytes(len(chunk))
+            yield chunk
+
+    def close(self) -> None:
+        self._stream.close()
+
+
+class _AsyncCountingStream(httpx.AsyncByteStream):
+    """Async counterpart of _CountingStream."""
+
+    def __init__(self, stream: httpx.AsyncByteStream):
+        self._stream = stream
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            add_response_bytes(len(chunk))
+            yield chunk
+
+    async def aclose(self) -> None:
+        await self._stream.aclose()
+
+
+class PooledTransport(httpx.HTTPTransport):
+    """HTTP/2 keep-alive transport that counts reuse and retries stale connections."""
+
+    def __init__(self):
+        super().__init__(http2=True, limits=pool_limits(), retries=CONNECT_RETRIES)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.extensions["trace"] = _stats.trace
+        _stats.add(requests=1)
+        try:
+            response = super().handle_request(request)
+        except STALE_CONNECTION_ERRORS:
+            # The pooled connection died while idle; the pool drops it, so
+            # the retry opens a fresh one
+            if request.method not in IDEMPOTENT_METHODS:
+                _stats.add(errors=1)
+                raise
+            _stats.add(stale_retries=1)
+            try:
+                response = super().handle_request(request)
+            except httpx.TransportError:
+                _stats.add(errors=1)
+                raise
+        except httpx.TransportError:
+            _stats.add(errors=1)
+            raise
+        _stats.last_response_at = time.monotonic()
+        response.stream = _CountingStream(response.stream)
+        return response
+
+
+class AsyncPooledTransport(httpx.AsyncHTTPTransport):
+    """Async counterpart of PooledTransport."""
+
+    def __init__(self):
+        super().__init__(http2=True, limits=pool_limits(), retries=CONNECT_RETRIES)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        # httpcore awaits async trace hooks
+        async def trace(event: str, info: Dict[str, Any]) -> None:
+            _stats.trace(event, info)
+
+        request.extensions["trace"] = trace
+        _stats.add(requests=1)
+        try:
+            response = await super().handle_async_request(request)
+        except STALE_CONNECTION_ERRORS:
+            if request.method not in IDEMPOTENT_METHODS:
+                _stats.add(errors=1)
+                raise
+            _stats.add(stale_retries=1)
+            try:
+                response = await super().handle_async_request(request)
+            except httpx.TransportError:
+                _stats.add(errors=1)
+                raise
+        except httpx.TransportError:
+            _stats.add(errors=1)
+            raise
+        _stats.last_response_at = time.monotonic()
+        response.stream = _AsyncCountingStream(response.stream)
+        return response
+
+
+# ============================================================================
+# POOLED CLIENTS
+# ============================================================================
+
+def _session_options(base_url: str, headers: Dict[str, str], verify: bool,
+                     proxy: Optional[str]) -> Dict[str, Any]:
+    """httpx client arguments used by postgrest, with the pool timeouts."""
+    return {
+        "base_url": base_url,
+        "headers": headers,
+        "timeout": pool_timeout(),
+        "verify": verify,
+        "proxy": proxy,
+        "follow_redirects": True,
+    }
+
+
+class PooledPostgrestClient(SyncPostgrestClient):
+    """PostgREST client whose session uses the shared PooledTransport settings."""
+
+    def create_session(self, base_url: str, headers: Dict[str, str],
+                       timeout: Union[int, float, httpx.Timeout], verify: bool = True,
+                       proxy: Optional[str] = None):
+        from postgrest.utils import SyncClient
+        return SyncClient(
+            **_session_options(base_url, headers, verify, proxy), transport=PooledTransport()
+        )
+
+
+class AsyncPooledPostgrestClient(AsyncPostgrestClient):
+    """Async PostgREST client whose session uses AsyncPooledTransport."""
+
+    def create_session(self, base_url: str, headers: Dict[str, str],
+                       timeout: Union[int, float, httpx.Timeout], verify: bool = True,
+                       proxy: Optional[str] = None):
+        return httpx.AsyncClient(
+            **_session_options(base_url, headers, verify, proxy), transport=AsyncPooledTransport()
+        )
+
+
+class PooledClient(Client):
+    """Supabase client that builds its PostgREST client on the tuned pool."""
+
+    @staticmethod
+    def _init_postgrest_client(rest_url: str, headers: Dict[str, str], schema: str,
+                               timeout=None, verify: bool = True,
+                               proxy: Optional[str] = None) -> SyncPostgrestClient:
+        return PooledPostgrestClient(
+            rest_url, headers=headers, schema=schema, verify=verify, proxy=proxy
+        )
+
+
+class AsyncPooledClient(AsyncClient):
+    """Async Supabase client that builds its PostgREST client on the tuned pool."""
+
+    @staticmethod
+    def _init_postgrest_client(rest_url: str, headers: Dict[str, str], schema: str,
+                               timeout=None, verify: bool = True,
+                               proxy: Optional[str] = None) -> AsyncPostgrestClient:
+        return AsyncPooledPostgrestClient(
+            rest_url, headers=headers, schema=schema, verify=verify, proxy=proxy
+        )
+
+
+def _get_credentials() -> tuple:
+    """Read SUPABASE_URL and SUPABASE_KEY, raising ValueError if missing."""
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_KEY")
+
+    if not url or not key:
+        raise ValueError(
+            "SUPABASE_URL and SUPABASE_KEY must be set in environment variables"
+        )
+    return url, key
+
 
 class SupabaseClient:
-    """Singleton wrapper for Supabase client."""
+    """Thread-safe singleton wrapper for Supabase client."""
 
     _instance: Optional[Client] = None
+    _lock = threading.Lock()
 
     @classmethod
     def get_client(cls) -> Client:
         """
         Get or create Supabase client instance.
 
+        After HEALTH_CHECK_INTERVAL seconds without a response the client is
+        health-checked first and rebuilt if the server cannot be reached.
+
         Returns:
             Client: Supabase client instance
 
@@ -33,19 +306,66 @@ class SupabaseClient:
             ValueError: If environment variables are not set
         """
         if cls._instance is None:
-            url = os.getenv("SUPABASE_URL")
-            key = os.getenv("SUPABASE_KEY")
+            with cls._lock:
+                if cls._instance is None:
+                    url, key = _get_credentials()
+                    logger.info(f"🔌 Connecting to Supabase: {url}")
+                    cls._instance = PooledClient.create(url, key)
+                    logger.info(
+                        f"✅ Supabase client initialized successfully "
+                        f"(pool: {MAX_CONNECTIONS} connections, HTTP/2)"
+                    )
+        elif (HEALTH_CHECK_INTERVAL > 0
+              and time.monotonic() - _stats.last_response_at > HEALTH_CHECK_INTERVAL):
+            cls.check_health()
 
-            if not url or not key:
-                raise ValueError(
-                    "SUPABASE_URL and SUPABASE_KEY must be set in environment variables"
-                )
+        return cls._instance
 
-            logger.info(f"🔌 Connecting to Supabase: {url}")
-            cls._instance = create_client(url, key)
-            logger.info("✅ Supabase client initialized successfully")
+    @classmethod
+    def check_health(cls) -> bool:
+        """
+        Send a lightweight request and rebuild the client if it fails.
 
-        return cls._instance
+        Returns:
+            bool: True if the server answered (on the current or a new connection)
+        """
+        with cls._lock:
+            client = cls._instance
+            if client is None:
+                return False
+            # Another thread may have checked while we waited for the lock
+            if time.monotonic() - _stats.last_response_at <= HEALTH_CHECK_INTERVAL:
+                return True
+            try:
+                client.postgrest.session.head("sensors", params={"limit": "1"})
+                return True
+            except httpx.TransportError as e:
+                logger.warning(f"⚠️ Supabase health check failed, reconnecting: {e}")
+
+            # Drop the pool and build a fresh client
+            try:
+                client.postgrest.session.close()
+            except Exception:
+                pass
+            url, key = _get_credentials()
+            cls._instance = PooledClient.create(url, key)
+            _stats.add(reconnects=1)
+
+            try:
+                cls._instance.postgrest.session.head("sensors", params={"limit": "1"})
+                logger.info("✅ Reconnected to Supabase")
+                return True
+            except httpx.TransportError as e:
+                logger.error(f"❌ Supabase is unreachable: {e}")
+                return False
+
+    @classmethod
+    def pool_occupancy(cls) -> Dict[str, int]:
+        """Count open, active and idle connections in the sync pool."""
+        client = cls._instance
+        if client is None or client._postgrest is None:
+            return {"open": 0, "idle": 0, "active": 0}
+        return _pool_occupancy(client._postgrest.session._transport)
 
 
 def get_supabase() -> Client:
@@ -56,3 +376,70 @@ def get_supabase() -> Client:
         Client: Supabase client instance
     """
     return SupabaseClient.get_client()
+
+
+class AsyncSupabaseClient:
+    """Singleton wrapper for the async Supabase client.
+
+    The client's connection pool is bound to the event loop it was created
+    on, so it must only be used from one loop (see database/async_queries.py).
+    That loop is the only caller, so no lock is needed.
+    """
+
+    _instance: Optional[AsyncClient] = None
+
+    @classmethod
+    async def get_client(cls) -> AsyncClient:
+        """
+        Get or create async Supabase client instance.
+
+        Returns:
+            AsyncClient: Async Supabase client instance
+
+        Raises:
+            ValueError: If environment variables are not set
+        """
+        if cls._instance is None:
+            url, key = _get_credentials()
+            logger.info(f"🔌 Connecting async client to Supabase: {url}")
+            cls._instance = await AsyncPooledClient.create(url, key)
+            logger.info("✅ Async Supabase client initialized successfully")
+
+        return cls._instance
+
+    @classmethod
+    def pool_occupancy(cls) -> Dict[str, int]:
+        """Count open, active and idle connections in the async pool."""
+        client = cls._instance
+        if client is None or client._postgrest is None:
+            return {"open": 0, "idle": 0, "active": 0}
+        return _pool_occupancy(client._postgrest.session._transport)
+
+
+async def get_async_supabase() -> AsyncClient:
+    """
+    Convenience function to get the async Supabase client.
+
+    Returns:
+        AsyncClient: Async Supabase client instance
+    """
+    return await AsyncSupabaseClient.get_client()
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """
+    Get HTTP pool configuration, occupancy and reuse counters.
+
+    Returns:
+        Dictionary with keys: max_connections, max_keepalive, requests,
+        connections_opened, reuse_ratio (share of requests served on an
+        existing connection), stale_retries, errors, reconnects, and the
+        open/active/idle connection counts of the sync and async pools
+    """
+    return {
+        "max_connections": MAX_CONNECTIONS,
+        "max_keepalive": MAX_KEEPALIVE_CONNECTIONS,
+        **_stats.snapshot(),
+        "sync_pool": SupabaseClient.pool_occupancy(),
+        "async_pool": AsyncSupabaseClient.pool_occupancy(),
+    }
@@ -0,0 +1,145 @@
+"""
+Per-rerun query coalescing.
+
+A Streamlit rerun renders both the Engineer and Analyst tabs, and several
+components issue the same read with the same arguments. Inside a
+request_scope() (one script run), reads decorated with @coalesced run once
+per distinct argument set and the result is shared; writes decorated with
+@invalidates_coalesced clear the scope so later reads see the change.
+Every caller gets its own shallow copy of the shared result (the list and
+its record dicts, or the DataFrame), so one component adding a key or a
+column does not change what the next one sees.
+
+Outside a scope the decorators do nothing, so the query functions behave
+exactly as before when called from scripts or background threads.
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, Optional
+
+import pandas as pd
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+# Process-wide totals across all scopes
+_totals = {"calls": 0, "saved": 0}
+_totals_lock = threading.Lock()
+
+
+class _Scope:
+    """Results and counters for one script run."""
+
+    def __init__(self):
+        self.results: Dict[Any, Any] = {}
+        self.calls = 0
+        self.saved = 0
+
+
+def _freeze(value: Any) -> Any:
+    """Turn call arguments into a hashable cache key."""
+    if isinstance(value, (str, int, float, bool, type(None), datetime, date)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    raise TypeError(f"Cannot coalesce argument of type {type(value).__name__}")
+
+
+def _copy(result: Any) -> Any:
+    """Shallow copy of a shared result for one caller."""
+    if isinstance(result, list):
+        return [dict(item) if isinstance(item, dict) else item for item in result]
+    if isinstance(result, dict):
+        return dict(result)
+    if isinstance(result, pd.DataFrame):
+        return result.copy(deep=False)
+    return result
+
+
+def _current_scope() -> Optional[_Scope]:
+    return getattr(_local, "scope", None)
+
+
+@contextmanager
+def request_scope() -> Iterator[_Scope]:
+    """
+    Coalesce duplicate reads for the duration of one script run.
+
+    Usage:
+        with request_scope():
+            render_engineer_interface()
+            render_analyst_interface()
+    """
+    previous = _current_scope()
+    scope = _Scope()
+    _local.scope = scope
+    try:
+        yield scope
+    finally:
+        _local.scope = previous
+        with _totals_lock:
+            _totals["calls"] += scope.calls
+            _totals["saved"] += scope.saved
+        if scope.saved:
+            logger.info(f"♻️ Coalesced {scope.saved} of {scope.calls} reads in this run")
+
+
+def coalesced(func: Callable) -> Callable:
+    """Share one result (copied per caller) between identical calls made inside the same request scope."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        scope = _current_scope()
+        if scope is None:
+            return func(*args, **kwargs)
+
+        try:
+            key = (func.__qualname__, _freeze(args), _freeze(kwargs))
+        except TypeError:
+            return func(*args, **kwargs)
+
+        scope.calls += 1
+        if key in scope.results:
+            scope.saved += 1
+            return _copy(scope.results[key])
+
+        result = func(*args, **kwargs)
+        scope.results[key] = result
+        return _copy(result)
+
+    return wrapper
+
+
+def invalidates_coalesced(func: Callable) -> Callable:
+    """Drop results shared in the current request scope after a write."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            scope = _current_scope()
+            if scope is not None:
+                scope.results.clear()
+
+    return wrapper
+
+
+def get_coalesce_stats() -> Dict[str, int]:
+    """
+    Get process-wide coalescing counters.
+
+    Returns:
+        Dictionary with keys: calls (coalescable reads issued inside a scope)
+        and saved (reads answered without a backend call)
+    """
+    with _totals_lock:
+        return dict(_totals)
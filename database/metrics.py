@@ -0,0 +1,420 @@
+"""
+Query instrumentation: latency, row, payload and error metrics.
+
+Every query function in database/queries.py and database/async_queries.py
+is wrapped with @instrumented. Each call is recorded under its query name
+and a filter label naming the arguments that were actually passed (for
+example "sensor_ids[3],start_date,end_date"), so a slow page can be traced
+to one query and one filter combination.
+
+Per (query, filters) series:
+- calls, errors, rows returned (or inserted, for batch writes) and response bytes (counters)
+- wall time (histogram with LATENCY_BUCKETS)
+
+Response bytes are counted on the wire by the Supabase HTTP transport
+(database/client.py); local backends report 0. Calls slower than
+SLOW_QUERY_SECONDS are logged with their filters.
+
+Export formats:
+- render_prometheus(): Prometheus text exposition format
+- get_query_metrics() / dump_metrics_json(path): JSON-friendly snapshot
+- start_exporters(): optional background exporters configured by
+  QUERY_METRICS_PORT (HTTP /metrics endpoint) and QUERY_METRICS_DUMP_PATH
+  (JSON file rewritten every QUERY_METRICS_DUMP_INTERVAL seconds)
+"""
+
+import os
+import json
+import time
+import asyncio
+import inspect
+import logging
+import threading
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds for query wall time, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Calls at least this slow are logged as warnings
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_SECONDS", "2"))
+
+METRICS_PORT = int(os.getenv("QUERY_METRICS_PORT", "0"))
+METRICS_DUMP_PATH = os.getenv("QUERY_METRICS_DUMP_PATH", "")
+METRICS_DUMP_INTERVAL = float(os.getenv("QUERY_METRICS_DUMP_INTERVAL", "60"))
+
+
+class _Series:
+    """Counters and latency histogram for one (query, filters) pair."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+    def observe(self, seconds: float, rows: int, size: int, failed: bool) -> None:
+        self.calls += 1
+        self.errors += int(failed)
+        self.rows += rows
+        self.bytes += size
+        self.seconds += seconds
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+
+
+_series: Dict[Tuple[str, str], _Series] = {}
+_series_lock = threading.Lock()
+
+
+class _Call:
+    """Bytes received during one instrumented call (and its nested calls)."""
+
+    def __init__(self, parent: Optional["_Call"]):
+        self.parent = parent
+        self.bytes = 0
+
+
+_current_call: ContextVar[Optional[_Call]] = ContextVar("current_query_call", default=None)
+
+
+def add_response_bytes(size: int) -> None:
+    """Attribute received bytes to the running query call(s), if any."""
+    call = _current_call.get()
+    while call is not None:
+        call.bytes += size
+        call = call.parent
+
+
+def _filter_label(signature: inspect.Signature, args: tuple, kwargs: dict) -> str:
+    """Name the arguments that were passed with a value (ID lists with their length)."""
+    try:
+        bound = signature.bind(*args, **kwargs)
+    except TypeError:
+        return "invalid"
+
+    parts = []
+    for name, value in bound.arguments.items():
+        if value is None:
+            continue
+        if name.endswith("_ids") and isinstance(value, (list, tuple, set)):
+            parts.append(f"{name}[{len(value)}]")
+        else:
+            parts.append(name)
+    return ",".join(parts) or "none"
+
+
+def _count_rows(result: Any) -> int:
+    """
+    Rows returned or written by a query result.
+
+    Lists and frames count their items, batch write summaries their
+    "inserted" count, and a single record (a dict with an "id") counts 1.
+    Anything else (counts, None, other summaries) is not a row set and
+    counts 0.
+    """
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    if isinstance(result, dict):
+        if "inserted" in result:
+            inserted = result["inserted"]
+            return len(inserted) if isinstance(inserted, (list, tuple)) else int(inserted)
+        return 1 if "id" in result else 0
+    if hasattr(result, "columns") and hasattr(result, "__len__"):
+        # pandas DataFrame
+        return len(result)
+    return 0
+
+
+def _record(name: str, filters: str, started: float, rows: int,
+            call: _Call, failed: bool) -> None:
+    elapsed = time.perf_counter() - started
+    with _series_lock:
+        series = _series.get((name, filters))
+        if series is None:
+            series = _series[(name, filters)] = _Series()
+        series.observe(elapsed, rows, call.bytes, failed)
+
+    if elapsed >= SLOW_QUERY_SECONDS:
+        logger.warning(
+            f"🐢 Slow query {name}({filters}) took {elapsed:.2f}s, "
+            f"{rows} rows, {call.bytes} bytes"
+        )
+
+
+def instrumented(func: Callable) -> Callable:
+    """
+    Record wall time, rows, response bytes and errors of a query function.
+
+    Works on plain functions, generator functions (rows and time are
+    summed over all yielded pages) and coroutine functions.
+    """
+    name = func.__name__
+    signature = inspect.signature(func)
+
+    if inspect.isgeneratorfunction(func):
+        @wraps(func)
+        def generator_wrapper(*args, **kwargs):
+            filters = _filter_label(signature, args, kwargs)
+            started = time.perf_counter()
+            call = _Call(_current_call.get())
+            rows = 0
+            failed = False
+            iterator = func(*args, **kwargs)
+            try:
+                while True:
+                    # Only count bytes while the generator runs, not while the caller does
+                    token = _current_call.set(call)
+                    try:
+                        page = next(iterator)
+                    except StopIteration:
+                        return
+                    finally:
+                        _current_call.reset(token)
+                    rows += _count_rows(page)
+                    yield page
+            except BaseException as e:
+                failed = not isinstance(e, GeneratorExit)
+                raise
+            finally:
+                iterator.close()
+                _record(name, filters, started, rows, call, failed)
+
+        return generator_wrapper
+
+    if asyncio.iscoroutinefunction(func):
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            filters = _filter_label(signature, args, kwargs)
+            started = time.perf_counter()
+            call = _Call(_current_call.get())
+            token = _current_call.set(call)
+            rows = 0
+            failed = True
+            try:
+                result = await func(*args, **kwargs)
+                rows = _count_rows(result)
+                failed = False
+                return result
+            finally:
+                _current_call.reset(token)
+                _record(name, filters, started, rows, call, failed)
+
+        return async_wrapper
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        filters = _filter_label(signature, args, kwargs)
+        started = time.perf_counter()
+        call = _Call(_current_call.get())
+        token = _current_call.set(call)
+        rows = 0
+        failed = True
+        try:
+            result = func(*args, **kwargs)
+            rows = _count_rows(result)
+            failed = False
+            return result
+        finally:
+            _current_call.reset(token)
+            _record(name, filters, started, rows, call, failed)
+
+    return wrapper
+
+
+# ============================================================================
+# EXPORT
+# ============================================================================
+
+def get_query_metrics() -> List[Dict[str, Any]]:
+    """
+    Get a snapshot of all query series.
+
+    Returns:
+        List of dictionaries with keys: query, filters, calls, errors, rows,
+        bytes, seconds_total, seconds_avg and latency_buckets
+        ({upper bound: cumulative count}), slowest average first
+    """
+    with _series_lock:
+        items = [(key, series) for key, series in _series.items()]
+        snapshot = []
+        for (name, filters), series in items:
+            cumulative = 0
+            buckets = {}
+            for bound, count in zip(LATENCY_BUCKETS, series.buckets):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            buckets["+Inf"] = series.calls
+            snapshot.append({
+                "query": name,
+                "filters": filters,
+                "calls": series.calls,
+                "errors": series.errors,
+                "rows": series.rows,
+                "bytes": series.bytes,
+                "seconds_total": round(series.seconds, 6),
+                "seconds_avg": round(series.seconds / series.calls, 6) if series.calls else 0.0,
+                "latency_buckets": buckets,
+            })
+
+    snapshot.sort(key=lambda item: item["seconds_avg"], reverse=True)
+    return snapshot
+
+
+def _pool_stats() -> Dict[str, Any]:
+    """HTTP pool stats of the Supabase client, or {} if it is not in use."""
+    try:
+        from database.client import get_pool_stats
+        return get_pool_stats()
+    except Exception:
+        return {}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus() -> str:
+    """
+    Render query and connection pool metrics in the Prometheus text format.
+
+    Returns:
+        Exposition text for a /metrics endpoint
+    """
+    lines = []
+    counters = [
+        ("biogas_query_calls_total", "calls", "Query calls"),
+        ("biogas_query_errors_total", "errors", "Query calls that raised"),
+        ("biogas_query_rows_total", "rows", "Rows returned (or inserted) by queries"),
+        ("biogas_query_response_bytes_total", "bytes", "HTTP response bytes received by queries"),
+    ]
+    snapshot = get_query_metrics()
+
+    for metric, key, help_text in counters:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        for item in snapshot:
+            labels = f'query="{_escape(item["query"])}",filters="{_escape(item["filters"])}"'
+            lines.append(f"{metric}{{{labels}}} {item[key]}")
+
+    metric = "biogas_query_duration_seconds"
+    lines.append(f"# HELP {metric} Query wall time")
+    lines.append(f"# TYPE {metric} histogram")
+    for item in snapshot:
+        labels = f'query="{_escape(item["query"])}",filters="{_escape(item["filters"])}"'
+        for bound, count in item["latency_buckets"].items():
+            lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f"{metric}_sum{{{labels}}} {item['seconds_total']}")
+        lines.append(f"{metric}_count{{{labels}}} {item['calls']}")
+
+    pool = _pool_stats()
+    if pool:
+        gauges = [
+            ("biogas_http_pool_max_connections", pool["max_connections"]),
+            ("biogas_http_pool_open_connections", pool["sync_pool"]["open"] + pool["async_pool"]["open"]),
+            ("biogas_http_pool_active_connections", pool["sync_pool"]["active"] + pool["async_pool"]["active"]),
+            ("biogas_http_pool_reuse_ratio", pool["reuse_ratio"]),
+        ]
+        for metric, value in gauges:
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value}")
+        for metric, key in [
+            ("biogas_http_requests_total", "requests"),
+            ("biogas_http_connections_opened_total", "connections_opened"),
+            ("biogas_http_stale_retries_total", "stale_retries"),
+            ("biogas_http_reconnects_total", "reconnects"),
+        ]:
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {pool[key]}")
+
+    return "\n".join(lines) + "\n"
+
+
+def dump_metrics_json(path: str) -> None:
+    """
+    Write query and pool metrics to a JSON file (atomically replaced).
+
+    Args:
+        path: Output file path
+    """
+    payload = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "queries": get_query_metrics(),
+        "http_pool": _pool_stats(),
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Serve render_prometheus() on /metrics."""
+
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def _dump_loop(path: str, interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        try:
+            dump_metrics_json(path)
+        except OSError as e:
+            logger.error(f"❌ Failed to write query metrics to {path}: {e}")
+
+
+def start_exporters() -> None:
+    """
+    Start the configured metrics exporters once per process.
+
+    QUERY_METRICS_PORT serves Prometheus text on http://0.0.0.0:<port>/metrics;
+    QUERY_METRICS_DUMP_PATH rewrites a JSON snapshot every
+    QUERY_METRICS_DUMP_INTERVAL seconds. Both are off when unset.
+    """
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+
+    if METRICS_PORT:
+        try:
+            server = ThreadingHTTPServer(("0.0.0.0", METRICS_PORT), _MetricsHandler)
+        except OSError as e:
+            logger.error(f"❌ Failed to start metrics endpoint on port {METRICS_PORT}: {e}")
+        else:
+            threading.Thread(target=server.serve_forever, name="query-metrics-http", daemon=True).start()
+            logger.info(f"📈 Serving query metrics on :{METRICS_PORT}/metrics")
+
+    if METRICS_DUMP_PATH:
+        threading.Thread(
+            target=_dump_loop, args=(METRICS_DUMP_PATH, METRICS_DUMP_INTERVAL),
+            name="query-metrics-dump", daemon=True,
+        ).start()
+        logger.info(f"📈 Writing query metrics to {METRICS_DUMP_PATH} every {METRICS_DUMP_INTERVAL:g}s")
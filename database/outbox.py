@@ -0,0 +1,271 @@
+"""
+Durable local outbox for manual record submissions.
+
+The engineer form commits each reading to a local SQLite file (WAL mode,
+synchronous=FULL) and returns at once; a background thread drains the
+file to the storage backend in batches. A reading leaves the outbox only
+after the backend has stored it, so a slow or dropped link delays
+readings but never loses them, and they survive an app restart.
+
+Each queued reading gets its record ID when it is queued. The ID doubles
+as an idempotency key: batches are inserted with duplicates ignored, so a
+batch whose response was lost can be resent without creating copies.
+
+Batches that fail in transport are retried with exponential backoff.
+Readings the database rejects (for example, their sensor was deleted in
+the meantime) are isolated by splitting the batch, marked as rejected and
+kept in the file with the error, so nothing is silently dropped.
+"""
+
+import os
+import time
+import uuid
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from database.backend import RejectedDataError
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Outbox file; set OUTBOX_PATH= to write submissions straight to the backend
+OUTBOX_PATH = os.getenv("OUTBOX_PATH", ".cache/outbox.db")
+
+# Readings per insert request, and seconds between drain attempts when idle
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "500"))
+OUTBOX_FLUSH_INTERVAL = float(os.getenv("OUTBOX_FLUSH_INTERVAL", "5"))
+
+# Backoff after a failed flush: doubles per failure up to the maximum
+RETRY_BACKOFF_SECONDS = 2.0
+RETRY_BACKOFF_MAX_SECONDS = 300.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    seq          INTEGER PRIMARY KEY AUTOINCREMENT,
+    id           TEXT NOT NULL UNIQUE,
+    sensor_id    TEXT NOT NULL,
+    recorded_at  TEXT NOT NULL,
+    value        REAL NOT NULL,
+    queued_at    TEXT NOT NULL,
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    last_error   TEXT,
+    rejected     INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class RecordOutbox:
+    """SQLite-backed queue of records waiting to be written to the backend."""
+
+    def __init__(self, path: str, writer: Callable[[List[Dict[str, Any]]], None],
+                 batch_size: int = OUTBOX_BATCH_SIZE,
+                 flush_interval: float = OUTBOX_FLUSH_INTERVAL):
+        """
+        Args:
+            path: Outbox database file
+            writer: Inserts payloads (id, sensor_id, recorded_at, value),
+                skipping IDs that are already stored; raises
+                RejectedDataError only if the database refuses the rows
+                themselves (any other exception keeps them queued)
+            batch_size: Readings per writer call
+            flush_interval: Seconds between drain attempts when idle
+        """
+        self.path = path
+        self._writer = writer
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._initialized = False
+        self._thread: Optional[threading.Thread] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection, creating the file and schema on first use."""
+        if not self._initialized:
+            with self._lock:
+                if not self._initialized:
+                    directory = os.path.dirname(self.path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    conn = sqlite3.connect(self.path, timeout=30)
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.executescript(SCHEMA)
+                    conn.close()
+                    self._initialized = True
+
+        conn = sqlite3.connect(self.path, timeout=30)
+        # Every committed submission reaches the disk before the form returns
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def enqueue(self, sensor_id: str, recorded_at: datetime, value: float) -> str:
+        """
+        Durably queue one record.
+
+        Args:
+            sensor_id: UUID of the sensor
+            recorded_at: Timestamp of the recording (naive is taken as UTC)
+            value: Measured value
+
+        Returns:
+            ID the record will be stored under
+        """
+        if recorded_at.tzinfo is None:
+            recorded_at = recorded_at.replace(tzinfo=timezone.utc)
+        record_id = str(uuid.uuid4())
+
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT INTO outbox (id, sensor_id, recorded_at, value, queued_at) VALUES (?, ?, ?, ?, ?)",
+                    (record_id, str(sensor_id), recorded_at.isoformat(), float(value),
+                     datetime.now(timezone.utc).isoformat()),
+                )
+        finally:
+            conn.close()
+
+        self._wakeup.set()
+        return record_id
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Outbox fill level.
+
+        Returns:
+            Dictionary with keys pending, rejected and last_error (of the
+            oldest pending reading that has failed, None if none has)
+        """
+        conn = self._connect()
+        try:
+            pending, rejected = conn.execute(
+                "SELECT COALESCE(SUM(rejected = 0), 0), COALESCE(SUM(rejected), 0) FROM outbox"
+            ).fetchone()
+            row = conn.execute(
+                "SELECT last_error FROM outbox WHERE rejected = 0 AND last_error IS NOT NULL "
+                "ORDER BY seq LIMIT 1"
+            ).fetchone()
+        finally:
+            conn.close()
+        return {"pending": pending, "rejected": rejected, "last_error": row[0] if row else None}
+
+    def rejected(self) -> List[Dict[str, Any]]:
+        """Readings the database refused, oldest first, with their errors."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT id, sensor_id, recorded_at, value, queued_at, last_error "
+                "FROM outbox WHERE rejected = 1 ORDER BY seq"
+            ).fetchall()
+        finally:
+            conn.close()
+        return [dict(row) for row in rows]
+
+    def discard(self, record_id: str) -> None:
+        """Remove a rejected reading after the user has dealt with it."""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM outbox WHERE id = ? AND rejected = 1", (record_id,))
+        finally:
+            conn.close()
+
+    def _write(self, conn: sqlite3.Connection, rows: List[sqlite3.Row]) -> None:
+        """
+        Write rows, splitting rejected batches to isolate the bad readings.
+
+        Raises:
+            Exception: Transport errors, for the caller to retry
+        """
+        payloads = [
+            {"id": row["id"], "sensor_id": row["sensor_id"],
+             "recorded_at": row["recorded_at"], "value": row["value"]}
+            for row in rows
+        ]
+        try:
+            self._writer(payloads)
+        except RejectedDataError as e:
+            if len(rows) == 1:
+                with conn:
+                    conn.execute(
+                        "UPDATE outbox SET rejected = 1, attempts = attempts + 1, last_error = ? WHERE seq = ?",
+                        (str(e), rows[0]["seq"]),
+                    )
+                logger.error(f"❌ Record {rows[0]['id']} rejected, kept in outbox: {e}")
+                return
+            middle = len(rows) // 2
+            self._write(conn, rows[:middle])
+            self._write(conn, rows[middle:])
+            return
+
+        with conn:
+            conn.executemany("DELETE FROM outbox WHERE seq = ?", [(row["seq"],) for row in rows])
+
+    def flush(self) -> int:
+        """
+        Send every pending reading to the backend, one batch at a time.
+
+        Returns:
+            Number of readings that left the outbox (stored or rejected)
+
+        Raises:
+            Exception: If a batch fails in transport; it stays queued
+        """
+        conn = self._connect()
+        done = 0
+        try:
+            while True:
+                rows = conn.execute(
+                    "SELECT seq, id, sensor_id, recorded_at, value FROM outbox "
+                    "WHERE rejected = 0 ORDER BY seq LIMIT ?",
+                    (self.batch_size,),
+                ).fetchall()
+                if not rows:
+                    return done
+
+                try:
+                    self._write(conn, rows)
+                except Exception as e:
+                    with conn:
+                        conn.executemany(
+                            "UPDATE outbox SET attempts = attempts + 1, last_error = ? WHERE seq = ?",
+                            [(str(e), row["seq"]) for row in rows],
+                        )
+                    raise
+                done += len(rows)
+        finally:
+            conn.close()
+
+    def _run(self) -> None:
+        """Drain on every enqueue and every flush_interval; back off while failing."""
+        backoff = RETRY_BACKOFF_SECONDS
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                written = self.flush()
+            except Exception as e:
+                logger.warning(f"⚠️ Outbox flush failed, retrying in {backoff:g}s: {e}")
+                # Enqueues during an outage do not cut the backoff short
+                time.sleep(backoff)
+                backoff = min(backoff * 2, RETRY_BACKOFF_MAX_SECONDS)
+                self._wakeup.set()
+                continue
+
+            if written:
+                logger.info(f"✅ Outbox flushed {written} records")
+            backoff = RETRY_BACKOFF_SECONDS
+
+    def start(self) -> None:
+        """Start the background flusher once per process (drains leftovers from earlier runs)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="record-outbox", daemon=True)
+        self._wakeup.set()
+        self._thread.start()
+        logger.info(f"📮 Record outbox flusher started: {self.path}")
@@ -0,0 +1,499 @@
+"""
+Persistent on-disk Parquet cache of sensor_records.
+
+Records are stored per sensor and calendar month (UTC):
+
+    <PARQUET_CACHE_DIR>/<sensor_id>/<YYYY-MM>.parquet
+
+Each file holds id, recorded_at and value sorted by (recorded_at, id).
+manifest.json records, per sensor, the updated_at high-water mark of the
+last sync and the months that are cached, with when each was last
+verified. The cache lives on disk, so a restarted process picks up where
+it left off and only asks the backend for rows changed since then.
+
+Reads prune partitions by month and binary-search the sorted timestamp
+column for the exact range, so no network round trip is needed once a
+sensor's months are cached. They return column arrays that the series
+cache merges as they are, without building a dictionary per row.
+
+Keeping partitions current:
+- A month is downloaded the first time a read needs it, one month per
+  request, and written to its file before the next one is fetched, so a
+  long history never sits in memory at once
+- Later syncs fetch rows with updated_at >= the high-water mark and
+  rewrite only the cached months those rows fall into
+- Deletes and moves to another month or sensor can't be seen by a
+  "changed since" query. A cached month is verified when a read needs it
+  and it was last verified more than PARQUET_VERIFY_INTERVAL seconds ago
+  (or a local edit touched it): its row count is compared with the
+  backend's count for that month (summed from the daily rollups, or one
+  count per month where sensor_record_rollups.sql is not applied), and the
+  month is re-downloaded if they differ.
+
+The store is shared by all sessions. Its lock guards the manifest and
+partition writes only; backend queries run without it, and partitions are
+replaced atomically, so reads never wait for another session's download.
+
+Requires pyarrow (already a Streamlit dependency). Set PARQUET_CACHE_DIR to
+an empty value to disable the cache.
+"""
+
+import os
+import json
+import logging
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from database.series_cache import SYNC_OVERLAP_SECONDS, RecordColumns
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow ships with streamlit
+    pa = None
+    pq = None
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+PARQUET_CACHE_DIR = os.getenv("PARQUET_CACHE_DIR", ".cache/sensor_records")
+
+# Seconds between count checks that catch deletes and moved records
+PARQUET_VERIFY_INTERVAL = float(os.getenv("PARQUET_VERIFY_INTERVAL", "3600"))
+
+RangeRequest = Tuple[str, Optional[datetime], Optional[datetime]]
+
+SCHEMA = pa.schema([
+    ("id", pa.string()),
+    ("recorded_at", pa.timestamp("us", tz="UTC")),
+    ("value", pa.float64()),
+]) if pa is not None else None
+
+
+def is_available() -> bool:
+    """True if pyarrow is installed and a cache directory is configured."""
+    return pa is not None and bool(PARQUET_CACHE_DIR)
+
+
+def _month(moment: datetime) -> str:
+    return moment.astimezone(timezone.utc).strftime("%Y-%m")
+
+
+def _month_bounds(month: str) -> Tuple[datetime, datetime]:
+    """First instant of the month and last microsecond of it, in UTC."""
+    start = datetime.strptime(month, "%Y-%m").replace(tzinfo=timezone.utc)
+    following = (start + timedelta(days=32)).replace(day=1)
+    return start, following - timedelta(microseconds=1)
+
+
+def _month_range(first: str, last: str) -> List[str]:
+    """Months from first to last inclusive, as YYYY-MM."""
+    months = []
+    moment = datetime.strptime(first, "%Y-%m")
+    while moment.strftime("%Y-%m") <= last:
+        months.append(moment.strftime("%Y-%m"))
+        moment = (moment + timedelta(days=32)).replace(day=1)
+    return months
+
+
+def _mark_after(mark: Optional[str], other: Optional[str]) -> bool:
+    """True if updated_at high-water mark `mark` is later than `other` (None is the earliest)."""
+    if mark is None:
+        return False
+    return other is None or datetime.fromisoformat(mark) > datetime.fromisoformat(other)
+
+
+def _rows_to_frame(rows: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Build a partition-shaped frame from record dictionaries."""
+    return pd.DataFrame({
+        "id": [row["id"] for row in rows],
+        "recorded_at": pd.to_datetime([row["recorded_at"] for row in rows], utc=True, format="ISO8601"),
+        "value": np.array([row["value"] for row in rows], dtype="float64"),
+    })
+
+
+class ParquetStore:
+    """Sensor/month partitioned Parquet copy of sensor_records."""
+
+    def __init__(self, root: str,
+                 fetch_ranges: Callable[[List[RangeRequest]], List[List[Dict[str, Any]]]],
+                 fetch_changes: Callable[[List[str], str], List[Dict[str, Any]]],
+                 latest_update: Callable[[List[str]], Optional[str]],
+                 fetch_monthly_counts: Callable[[str, Optional[datetime], Optional[datetime]], Dict[str, int]],
+                 verify_interval: float = PARQUET_VERIFY_INTERVAL):
+        """
+        Args:
+            root: Cache directory
+            fetch_ranges: Loads records for (sensor_id, start, end) windows from the backend
+            fetch_changes: Returns rows of the sensors with updated_at >= an ISO timestamp
+            latest_update: Returns the newest updated_at of the sensors
+            fetch_monthly_counts: Returns {YYYY-MM: record count} of one sensor
+                between two times (None for open bounds)
+            verify_interval: Seconds between partition count checks
+        """
+        self.root = root
+        self._fetch_ranges = fetch_ranges
+        self._fetch_changes = fetch_changes
+        self._latest_update = latest_update
+        self._fetch_monthly_counts = fetch_monthly_counts
+        self._verify_interval = verify_interval
+        self._lock = threading.RLock()
+        os.makedirs(root, exist_ok=True)
+        self._manifest = self._read_manifest()
+
+    # ------------------------------------------------------------------
+    # Manifest
+    # ------------------------------------------------------------------
+
+    def _manifest_path(self) -> str:
+        return os.path.join(self.root, "manifest.json")
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        """Load the manifest: {"sensors": {sensor_id: {"synced_to", "months": {YYYY-MM: verified_at}}}}."""
+        try:
+            with open(self._manifest_path(), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {"sensors": {}}
+        # Sensors without a month list were cached whole by an older version
+        for sensor_id, state in list(manifest.get("sensors", {}).items()):
+            if "months" not in state:
+                shutil.rmtree(self._sensor_dir(sensor_id), ignore_errors=True)
+                del manifest["sensors"][sensor_id]
+        return manifest
+
+    def _write_manifest(self) -> None:
+        tmp_path = f"{self._manifest_path()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._manifest, f, indent=2)
+        os.replace(tmp_path, self._manifest_path())
+
+    # ------------------------------------------------------------------
+    # Partitions
+    # ------------------------------------------------------------------
+
+    def _sensor_dir(self, sensor_id: str) -> str:
+        return os.path.join(self.root, sensor_id)
+
+    def _partition_path(self, sensor_id: str, month: str) -> str:
+        return os.path.join(self._sensor_dir(sensor_id), f"{month}.parquet")
+
+    def _months(self, sensor_id: str) -> List[str]:
+        """Months with a partition for the sensor, oldest first."""
+        try:
+            names = os.listdir(self._sensor_dir(sensor_id))
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-len(".parquet")] for name in names if name.endswith(".parquet"))
+
+    def _row_count(self, sensor_id: str, month: str) -> int:
+        """Rows in a partition (from the file footer), 0 if it has none."""
+        path = self._partition_path(sensor_id, month)
+        return pq.ParquetFile(path).metadata.num_rows if os.path.exists(path) else 0
+
+    def _read_partition(self, sensor_id: str, month: str) -> pd.DataFrame:
+        path = self._partition_path(sensor_id, month)
+        if not os.path.exists(path):
+            return _rows_to_frame([])
+        return pq.read_table(path).to_pandas()
+
+    def _write_partition(self, sensor_id: str, month: str, df: pd.DataFrame) -> None:
+        """Replace a partition with df (sorted here), or remove it if df is empty."""
+        path = self._partition_path(sensor_id, month)
+        if df.empty:
+            if os.path.exists(path):
+                os.remove(path)
+            return
+
+        df = df.sort_values(["recorded_at", "id"], ignore_index=True)
+        table = pa.Table.from_pandas(df[["id", "recorded_at", "value"]], schema=SCHEMA, preserve_index=False)
+        os.makedirs(self._sensor_dir(sensor_id), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+
+    def _write_months(self, sensor_id: str, df: pd.DataFrame, replace: bool) -> None:
+        """
+        Write records into their month partitions.
+
+        Args:
+            replace: Overwrite the months (True) or upsert into them by id (False)
+        """
+        if df.empty:
+            return
+        months = df["recorded_at"].dt.strftime("%Y-%m")
+        for month, group in df.groupby(months, sort=False):
+            if not replace:
+                existing = self._read_partition(sensor_id, month)
+                present = existing["id"].isin(group["id"])
+                if present.sum() == len(group) and self._unchanged(existing[present], group):
+                    # Re-read rows from the sync overlap window, nothing to write
+                    continue
+                group = pd.concat([existing[~present], group], ignore_index=True)
+            self._write_partition(sensor_id, month, group)
+
+    @staticmethod
+    def _unchanged(stored: pd.DataFrame, incoming: pd.DataFrame) -> bool:
+        """True if the incoming rows equal the stored rows with the same ids."""
+        stored = stored.set_index("id").sort_index()
+        incoming = incoming.set_index("id").sort_index()
+        as_ns = "datetime64[ns, UTC]"
+        return (stored["recorded_at"].astype(as_ns).equals(incoming["recorded_at"].astype(as_ns))
+                and stored["value"].equals(incoming["value"]))
+
+    # ------------------------------------------------------------------
+    # Sync
+    # ------------------------------------------------------------------
+
+    def sync(self, windows: List[RangeRequest]) -> None:
+        """
+        Bring the partitions the windows need up to date with the backend.
+
+        Cached months of the sensors get the rows changed since the last
+        sync, stale ones are verified, and months not cached yet are
+        downloaded. The lock only guards the manifest and partition writes:
+        change queries, counts and downloads run without it, so one
+        session's cache miss does not hold up other sessions' reads.
+
+        Args:
+            windows: (sensor_id, start, end) requests about to be read
+        """
+        with self._lock:
+            sensors = self._manifest["sensors"]
+            known = sorted({sensor_id for sensor_id, _, _ in windows if sensor_id in sensors})
+        if known:
+            self._apply_changes(known)
+
+        needed: Dict[str, set] = {}
+        for sensor_id, start, end in windows:
+            needed.setdefault(sensor_id, set()).update(self._window_months(sensor_id, start, end))
+
+        for sensor_id, months in needed.items():
+            self._register(sensor_id)
+            with self._lock:
+                state = self._manifest["sensors"].get(sensor_id)
+                if state is None:
+                    # Dropped while we were planning
+                    continue
+                cached = set(state["months"])
+                mark = state["synced_to"]
+            self._verify(sensor_id, sorted(month for month in months if month in cached))
+            self._download(sensor_id, sorted(month for month in months if month not in cached), mark)
+
+    def _register(self, sensor_id: str) -> None:
+        """Add a sensor to the manifest; changes from its current high-water mark on are picked up by syncs."""
+        with self._lock:
+            if sensor_id in self._manifest["sensors"]:
+                return
+        mark = self._latest_update([sensor_id])
+        with self._lock:
+            if sensor_id not in self._manifest["sensors"]:
+                self._manifest["sensors"][sensor_id] = {"synced_to": mark, "months": {}}
+                self._write_manifest()
+
+    def _window_months(self, sensor_id: str, start: Optional[datetime],
+                       end: Optional[datetime]) -> List[str]:
+        """Months a window reads; open bounds end at the sensor's first or last month with records."""
+        if start is not None and end is not None:
+            return _month_range(_month(start), _month(end))
+
+        counts = self._fetch_monthly_counts(sensor_id, start, end)
+        if not counts:
+            return []
+        first = _month(start) if start is not None else min(counts)
+        last = _month(end) if end is not None else max(counts)
+        return _month_range(first, last)
+
+    def _download(self, sensor_id: str, months: List[str], mark: Optional[str]) -> None:
+        """
+        Download months of a sensor, writing each one before fetching the next.
+
+        Args:
+            mark: The sensor's synced_to when the download was planned. Changes
+                applied while a month was in flight skipped it (not cached
+                yet) or were overwritten by it, so the mark is moved back
+                here and the next sync fetches them again.
+        """
+        rows_downloaded = 0
+        for month in months:
+            rows = self._fetch_ranges([(sensor_id, *_month_bounds(month))])[0]
+            with self._lock:
+                state = self._manifest["sensors"].get(sensor_id)
+                if state is None:
+                    return
+                self._write_partition(sensor_id, month, _rows_to_frame(rows))
+                state["months"][month] = time.time()
+                if _mark_after(state["synced_to"], mark):
+                    state["synced_to"] = mark
+                self._write_manifest()
+            rows_downloaded += len(rows)
+
+        if months:
+            logger.info(f"💾 Cached {rows_downloaded} records of sensor {sensor_id} "
+                        f"({len(months)} months) on disk")
+
+    def _apply_changes(self, sensor_ids: List[str]) -> None:
+        """Upsert rows changed since the high-water marks of the sensors."""
+        with self._lock:
+            sensors = self._manifest["sensors"]
+            # Sensors that had no records yet get everything they have now
+            empty = [sensor_id for sensor_id in sensor_ids if sensors[sensor_id]["synced_to"] is None]
+            marked = [sensor_id for sensor_id in sensor_ids if sensor_id not in empty]
+            since = min((datetime.fromisoformat(sensors[sensor_id]["synced_to"]) for sensor_id in marked),
+                        default=None)
+
+        if empty:
+            self._apply_changes_since(empty, datetime.min.replace(tzinfo=timezone.utc))
+        if marked:
+            self._apply_changes_since(marked, since - timedelta(seconds=SYNC_OVERLAP_SECONDS))
+
+    def _apply_changes_since(self, sensor_ids: List[str], since: datetime) -> None:
+        changes = self._fetch_changes(sensor_ids, since.isoformat())
+        if not changes:
+            return
+
+        newest = max(changes, key=lambda row: datetime.fromisoformat(row["updated_at"]))["updated_at"]
+        by_sensor: Dict[str, List[Dict[str, Any]]] = {}
+        for row in changes:
+            by_sensor.setdefault(str(row["sensor_id"]), []).append(row)
+
+        with self._lock:
+            sensors = self._manifest["sensors"]
+            for sensor_id, rows in by_sensor.items():
+                if sensor_id not in sensors:
+                    continue
+                df = _rows_to_frame(rows)
+                # Months that are not cached are downloaded whole when first read
+                df = df[df["recorded_at"].dt.strftime("%Y-%m").isin(list(sensors[sensor_id]["months"]))]
+                self._write_months(sensor_id, df, replace=False)
+            for sensor_id in sensor_ids:
+                # Another sync may have moved the mark further meanwhile
+                if sensor_id in sensors and not _mark_after(sensors[sensor_id]["synced_to"], newest):
+                    sensors[sensor_id]["synced_to"] = newest
+            self._write_manifest()
+        logger.info(f"💾 Applied {len(changes)} changed records to the disk cache")
+
+    def _verify(self, sensor_id: str, months: List[str]) -> None:
+        """Re-download cached months that are due for a check and whose row count differs from the backend's."""
+        with self._lock:
+            state = self._manifest["sensors"].get(sensor_id)
+            if state is None:
+                return
+            now = time.time()
+            due = [month for month in months
+                   if month in state["months"] and now - state["months"][month] > self._verify_interval]
+            mark = state["synced_to"]
+        if not due:
+            return
+
+        remote = self._fetch_monthly_counts(sensor_id, _month_bounds(due[0])[0], _month_bounds(due[-1])[1])
+
+        with self._lock:
+            state = self._manifest["sensors"].get(sensor_id)
+            if state is None:
+                return
+            stale = [month for month in due if remote.get(month, 0) != self._row_count(sensor_id, month)]
+            for month in due:
+                if month in state["months"]:
+                    state["months"][month] = now
+            self._write_manifest()
+
+        if stale:
+            self._download(sensor_id, stale, mark)
+            logger.info(f"💾 Re-downloaded {len(stale)} stale months of sensor {sensor_id}")
+
+    def request_verification(self, sensor_id: str, moments: List[Any]) -> None:
+        """
+        Verify the months holding these times on their next read (after a local edit or delete).
+
+        Args:
+            sensor_id: Sensor whose partitions changed
+            moments: recorded_at values (datetimes or ISO strings) of the
+                changed rows, before and after the change
+        """
+        with self._lock:
+            state = self._manifest["sensors"].get(str(sensor_id))
+            if state is None:
+                return
+            for moment in moments:
+                if isinstance(moment, str):
+                    moment = datetime.fromisoformat(moment)
+                month = _month(moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc))
+                if month in state["months"]:
+                    state["months"][month] = 0
+            self._write_manifest()
+
+    def drop_sensor(self, sensor_id: str) -> None:
+        """Remove a sensor's partitions."""
+        with self._lock:
+            shutil.rmtree(self._sensor_dir(sensor_id), ignore_errors=True)
+            self._manifest["sensors"].pop(sensor_id, None)
+            self._write_manifest()
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def read(self, sensor_id: str, start_date: Optional[datetime] = None,
+             end_date: Optional[datetime] = None) -> RecordColumns:
+        """
+        Read one sensor's records in a date range from disk.
+
+        Only partitions of the months overlapping the range are opened, and
+        the range bounds are found by binary search on recorded_at.
+
+        Returns:
+            recorded_at (int64 nanoseconds since the epoch), id and value
+            arrays, oldest first
+        """
+        first = _month(start_date) if start_date else None
+        last = _month(end_date) if end_date else None
+        months = [
+            month for month in self._months(sensor_id)
+            if (first is None or month >= first) and (last is None or month <= last)
+        ]
+
+        times, ids, values = [], [], []
+        for month in months:
+            try:
+                table = pq.read_table(self._partition_path(sensor_id, month))
+            except FileNotFoundError:
+                # Emptied by a sync since it was listed
+                continue
+            timestamps = table.column("recorded_at").to_numpy()
+
+            low, high = 0, len(timestamps)
+            if start_date is not None:
+                bound = np.datetime64(start_date.astimezone(timezone.utc).replace(tzinfo=None), "us")
+                low = int(np.searchsorted(timestamps, bound, side="left"))
+            if end_date is not None:
+                bound = np.datetime64(end_date.astimezone(timezone.utc).replace(tzinfo=None), "us")
+                high = int(np.searchsorted(timestamps, bound, side="right"))
+            if low >= high:
+                continue
+
+            times.append(timestamps[low:high].astype("datetime64[ns]").view(np.int64))
+            ids.append(table.column("id").slice(low, high - low).to_numpy(zero_copy_only=False))
+            values.append(table.column("value").slice(low, high - low).to_numpy())
+        if not times:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=object), np.empty(0, dtype=np.float64)
+        return np.concatenate(times), np.concatenate(ids), np.concatenate(values)
+
+    def read_windows(self, windows: List[RangeRequest]) -> List[RecordColumns]:
+        """
+        Sync the months the windows need, then serve every window from disk.
+
+        Args:
+            windows: (sensor_id, start, end) requests
+
+        Returns:
+            One set of record columns (see read) per window, in request order
+        """
+        self.sync(windows)
+        return [self.read(sensor_id, start, end) for sensor_id, start, end in windows]
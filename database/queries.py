@@ -2,36 +2,73 @@
 Database query functions for sensors and sensor_records tables.
 """
 
+import os
+import math
+import time
 import logging
-from typing import Dict, List, Optional, Any
-from datetime import datetime
-from functools import wraps
-from database.client import get_supabase
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Any
+from datetime import datetime, timedelta, timezone
+import pandas as pd
+from database.backend import ROLLUP_TIERS, RejectedDataError, StorageBackend, get_backend
+from database.catalog import SensorCatalog
+from database.parquet_cache import PARQUET_CACHE_DIR, ParquetStore, is_available as parquet_available
+from database.series_cache import RangeRequest, SeriesCache, WindowRecords
+from database.coalesce import coalesced, invalidates_coalesced
+from database.metrics import instrumented
+from database.outbox import OUTBOX_PATH, RecordOutbox
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Rows fetched per keyset page. Keep this at or below the PostgREST max-rows
+# setting (1000 on Supabase by default), otherwise pages get truncated.
+RECORDS_PAGE_SIZE = int(os.getenv("RECORDS_PAGE_SIZE", "1000"))
+
+# Rows per multi-row insert request, and how many requests may be in flight
+INSERT_CHUNK_SIZE = int(os.getenv("INSERT_CHUNK_SIZE", "500"))
+INSERT_MAX_WORKERS = int(os.getenv("INSERT_MAX_WORKERS", "4"))
+
+# Charts read the coarsest rollup tier that still gives every pixel a bucket
+# and at least this many points per sensor over the visible range
+ROLLUP_MIN_POINTS = int(os.getenv("ROLLUP_MIN_POINTS", "200"))
+
+# Seconds before a backend without the rollup tiers is checked again
+ROLLUP_PROBE_INTERVAL = 300
+
 # ============================================================================
 # SENSOR OPERATIONS
 # ============================================================================
 
+@instrumented
+def _load_sensors() -> List[Dict[str, Any]]:
+    """Load all sensors from the backend (the sensor catalog's loader)."""
+    logger.info("📊 Fetching all sensors from database...")
+    sensors = get_backend().list_sensors()
+    logger.info(f"✅ Retrieved {len(sensors)} sensors")
+    return sensors
+
+
+# Shared by all sessions; invalidated by create/update/delete_sensor below
+sensor_catalog = SensorCatalog(_load_sensors)
+
+
+@instrumented
 def get_all_sensors() -> List[Dict[str, Any]]:
     """
-    Fetch all sensors from the database.
+    Fetch all sensors, served from the in-memory sensor catalog.
 
     Returns:
         List of sensor dictionaries with keys: id, name, unit, comment
     """
-    logger.info("📊 Fetching all sensors from database...")
-    supabase = get_supabase()
-    response = supabase.table("sensors").select("*").order("name").execute()
-    logger.info(f"✅ Retrieved {len(response.data)} sensors")
-    return response.data
+    return sensor_catalog.all()
 
 
+@instrumented
 def get_sensor_by_id(sensor_id: str) -> Optional[Dict[str, Any]]:
     """
-    Fetch a single sensor by ID.
+    Fetch a single sensor by ID from the sensor catalog.
 
     Args:
         sensor_id: UUID of the sensor
@@ -39,11 +76,11 @@ def get_sensor_by_id(sensor_id: str) -> Optional[Dict[str, Any]]:
     Returns:
         Sensor dictionary or None if not found
     """
-    supabase = get_supabase()
-    response = supabase.table("sensors").select("*").eq("id", sensor_id).execute()
-    return response.data[0] if response.data else None
+    return sensor_catalog.get(sensor_id)
 
 
+@invalidates_coalesced
+@instrumented
 def create_sensor(name: str, unit: Optional[str] = None, comment: Optional[str] = None) -> Dict[str, Any]:
     """
     Create a new sensor.
@@ -60,18 +97,20 @@ def create_sensor(name: str, unit: Optional[str] = None, comment: Optional[str]
         Exception: If database operation fails
     """
     logger.info(f"➕ Creating sensor: {name} ({unit})")
-    supabase = get_supabase()
     data = {"name": name}
     if unit is not None:
         data["unit"] = unit
     if comment is not None:
         data["comment"] = comment
 
-    response = supabase.table("sensors").insert(data).execute()
+    sensor = get_backend().insert_sensor(data)
+    sensor_catalog.invalidate()
     logger.info(f"✅ Sensor created successfully: {name}")
-    return response.data[0]
+    return sensor
 
 
+@invalidates_coalesced
+@instrumented
 def update_sensor(sensor_id: str, name: Optional[str] = None,
                   unit: Optional[str] = None, comment: Optional[str] = None) -> Dict[str, Any]:
     """
@@ -89,7 +128,6 @@ def update_sensor(sensor_id: str, name: Optional[str] = None,
     Raises:
         Exception: If database operation fails
     """
-    supabase = get_supabase()
     data = {}
     if name is not None:
         data["name"] = name
@@ -98,10 +136,13 @@ def update_sensor(sensor_id: str, name: Optional[str] = None,
     if comment is not None:
         data["comment"] = comment
 
-    response = supabase.table("sensors").update(data).eq("id", sensor_id).execute()
-    return response.data[0]
+    sensor = get_backend().update_sensor(sensor_id, data)
+    sensor_catalog.invalidate()
+    return sensor
 
 
+@invalidates_coalesced
+@instrumented
 def delete_sensor(sensor_id: str) -> bool:
     """
     Delete a sensor and all associated records (CASCADE).
@@ -115,8 +156,11 @@ def delete_sensor(sensor_id: str) -> bool:
     Raises:
         Exception: If database operation fails
     """
-    supabase = get_supabase()
-    supabase.table("sensors").delete().eq("id", sensor_id).execute()
+    get_backend().delete_sensor(sensor_id)
+    series_cache.drop_sensor(sensor_id)
+    if parquet_store is not None:
+        parquet_store.drop_sensor(sensor_id)
+    sensor_catalog.invalidate()
     return True
 
 
@@ -124,6 +168,28 @@ def delete_sensor(sensor_id: str) -> bool:
 # SENSOR RECORD OPERATIONS
 # ============================================================================
 
+def join_sensors(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Attach sensor name and unit from the sensor catalog to records.
+
+    Record reads only fetch id, sensor_id, recorded_at and value; this adds
+    the embedded 'sensors' dictionary ({"name", "unit"}) the views expect.
+
+    Args:
+        records: Record dictionaries, modified in place
+
+    Returns:
+        The same list of records
+    """
+    by_id = sensor_catalog.index_for(record["sensor_id"] for record in records)
+    for record in records:
+        sensor = by_id.get(str(record["sensor_id"]), {})
+        record["sensors"] = {"name": sensor.get("name"), "unit": sensor.get("unit")}
+    return records
+
+
+@coalesced
+@instrumented
 def get_recent_records(limit: int = 100) -> List[Dict[str, Any]]:
     """
     Fetch recent sensor records with sensor information.
@@ -135,18 +201,13 @@ def get_recent_records(limit: int = 100) -> List[Dict[str, Any]]:
         List of record dictionaries with sensor details
     """
     logger.info(f"📊 Fetching recent {limit} records from database...")
-    supabase = get_supabase()
-    response = (
-        supabase.table("sensor_records")
-        .select("*, sensors(name, unit)")
-        .order("recorded_at", desc=True)
-        .limit(limit)
-        .execute()
-    )
-    logger.info(f"✅ Retrieved {len(response.data)} records")
-    return response.data
+    records = join_sensors(get_backend().list_recent_records(limit))
+    logger.info(f"✅ Retrieved {len(records)} records")
+    return records
 
 
+@coalesced
+@instrumented
 def get_record_by_id(record_id: str) -> Optional[Dict[str, Any]]:
     """
     Fetch a single sensor record by ID.
@@ -157,16 +218,12 @@ def get_record_by_id(record_id: str) -> Optional[Dict[str, Any]]:
     Returns:
         Record dictionary with sensor details or None if not found
     """
-    supabase = get_supabase()
-    response = (
-        supabase.table("sensor_records")
-        .select("*, sensors(name, unit)")
-        .eq("id", record_id)
-        .execute()
-    )
-    return response.data[0] if response.data else None
+    record = get_backend().get_record(record_id)
+    return join_sensors([record])[0] if record else None
 
 
+@invalidates_coalesced
+@instrumented
 def create_record(sensor_id: str, recorded_at: datetime, value: float) -> Dict[str, Any]:
     """
     Create a new sensor record.
@@ -182,16 +239,189 @@ def create_record(sensor_id: str, recorded_at: datetime, value: float) -> Dict[s
     Raises:
         Exception: If database operation fails
     """
-    supabase = get_supabase()
     data = {
         "sensor_id": sensor_id,
         "recorded_at": recorded_at.isoformat(),
         "value": value,
     }
-    response = supabase.table("sensor_records").insert(data).execute()
-    return response.data[0]
+    return get_backend().insert_records([data])[0]
+
+
+@invalidates_coalesced
+@instrumented
+def _write_outbox_batch(payloads: List[Dict[str, Any]]) -> None:
+    """Insert a batch from the record outbox; IDs already stored are skipped."""
+    get_backend().insert_records(payloads, returning=False, ignore_duplicates=True)
+
+
+# Shared by all sessions; drained by a background thread started in main()
+record_outbox = RecordOutbox(OUTBOX_PATH, _write_outbox_batch) if OUTBOX_PATH else None
+
+
+def submit_record(sensor_id: str, recorded_at: datetime, value: float) -> str:
+    """
+    Save a manually entered record without waiting for the database.
+
+    The record is committed to the local record outbox and written to the
+    backend in the background (see database/outbox.py). With OUTBOX_PATH
+    unset it is written directly, like create_record.
+
+    Args:
+        sensor_id: UUID of the sensor
+        recorded_at: Timestamp of the recording
+        value: Measured value
+
+    Returns:
+        ID of the record
+
+    Raises:
+        Exception: If the record could not be queued (or, without an
+            outbox, stored)
+    """
+    if record_outbox is None:
+        return create_record(sensor_id, recorded_at, value)["id"]
+    record_id = record_outbox.enqueue(sensor_id, recorded_at, value)
+    logger.info(f"📮 Record {record_id} queued in outbox")
+    return record_id
+
+
+def _serialize_record(sensor_id: Any, recorded_at: Any, value: Any) -> Dict[str, Any]:
+    """
+    Validate one (sensor_id, recorded_at, value) row and build its insert payload.
+
+    Naive timestamps are taken to be UTC, like everywhere else in storage.
+
+    Raises:
+        ValueError: If any field is missing or invalid
+    """
+    if not sensor_id:
+        raise ValueError("Sensor ID is required")
+    if not isinstance(recorded_at, datetime):
+        raise ValueError(f"'{recorded_at}' is not a datetime")
+    if recorded_at.tzinfo is None:
+        recorded_at = recorded_at.replace(tzinfo=timezone.utc)
+
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{value}' is not a valid number")
+    if not math.isfinite(value):
+        raise ValueError(f"'{value}' is not a finite number")
+
+    return {
+        "sensor_id": str(sensor_id),
+        "recorded_at": recorded_at.isoformat(),
+        "value": value,
+    }
+
 
+def _insert_chunk(backend: StorageBackend, chunk: List[Tuple[int, Tuple, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Insert one chunk of serialized rows in a single request.
+
+    A chunk the database rejects is split in half and retried, so a bad row
+    only takes down itself. Transport errors (network, 5xx, timeouts) fail
+    the whole chunk as retryable and stop any splitting in progress: the
+    remaining rows would hit the same outage.
+
+    Returns:
+        List of failure dictionaries with keys: index, row, error, retryable
+    """
+    try:
+        backend.insert_records([payload for _, _, payload in chunk], returning=False)
+        return []
+    except RejectedDataError as e:
+        if len(chunk) == 1:
+            index, row, _ = chunk[0]
+            return [{"index": index, "row": row, "error": str(e), "retryable": False}]
+    except Exception as e:
+        return _retryable(chunk, e)
+
+    middle = len(chunk) // 2
+    failures = _insert_chunk(backend, chunk[:middle])
+    transport_failures = [failure for failure in failures if failure["retryable"]]
+    if transport_failures:
+        return failures + _retryable(chunk[middle:], transport_failures[0]["error"])
+    return failures + _insert_chunk(backend, chunk[middle:])
+
+
+def _retryable(chunk: List[Tuple[int, Tuple, Dict[str, Any]]], error: Any) -> List[Dict[str, Any]]:
+    """Failure dictionaries marking every row of a chunk as safe to resend."""
+    return [{"index": index, "row": row, "error": str(error), "retryable": True} for index, row, _ in chunk]
+
+
+@invalidates_coalesced
+@instrumented
+def create_records_batch(records: Iterable[Tuple[str, datetime, float]],
+                         chunk_size: int = INSERT_CHUNK_SIZE,
+                         max_workers: int = INSERT_MAX_WORKERS) -> Dict[str, Any]:
+    """
+    Create many sensor records with chunked multi-row inserts.
+
+    Rows are validated and serialized as they are read, sent in chunks of
+    chunk_size rows, and up to max_workers chunks go out concurrently. The
+    input is consumed lazily, so generators of any length keep memory bounded.
 
+    Args:
+        records: Iterable of (sensor_id, recorded_at, value) tuples
+        chunk_size: Rows per insert request (default: INSERT_CHUNK_SIZE)
+        max_workers: Concurrent insert requests (default: INSERT_MAX_WORKERS)
+
+    Returns:
+        Dictionary with keys:
+        - inserted: Number of rows stored
+        - failed: List of {"index", "row", "error", "retryable"} for rows
+          that were not stored, where index is the row's position in the
+          input and retryable is True for transport errors (the row itself
+          was not rejected)
+    """
+    logger.info("➕ Creating records in batch...")
+    backend = get_backend()
+    rows = enumerate(records)
+    inserted = 0
+    failed = []
+    pending = {}
+
+    def collect(done):
+        nonlocal inserted
+        for future in done:
+            chunk_size_sent = pending.pop(future)
+            chunk_failures = future.result()
+            inserted += chunk_size_sent - len(chunk_failures)
+            failed.extend(chunk_failures)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            batch = list(islice(rows, chunk_size))
+            if not batch:
+                break
+
+            chunk = []
+            for index, row in batch:
+                try:
+                    chunk.append((index, row, _serialize_record(*row)))
+                except (TypeError, ValueError) as e:
+                    failed.append({"index": index, "row": row, "error": str(e), "retryable": False})
+
+            if not chunk:
+                continue
+
+            # Bound the number of chunks held in memory at once
+            if len(pending) >= max_workers * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+
+            pending[executor.submit(_insert_chunk, backend, chunk)] = len(chunk)
+
+        collect(list(pending))
+
+    failed.sort(key=lambda failure: failure["index"])
+    logger.info(f"✅ Batch insert finished: {inserted} created, {len(failed)} failed")
+    return {"inserted": inserted, "failed": failed}
+
+
+@invalidates_coalesced
+@instrumented
 def update_record(record_id: str, sensor_id: Optional[str] = None,
                   recorded_at: Optional[datetime] = None, value: Optional[float] = None) -> Dict[str, Any]:
     """
@@ -207,9 +437,9 @@ def update_record(record_id: str, sensor_id: Optional[str] = None,
         Updated record dictionary
 
     Raises:
+        RecordNotFoundError: If the record does not exist (e.g. deleted meanwhile)
         Exception: If database operation fails
     """
-    supabase = get_supabase()
     data = {}
     if sensor_id is not None:
         data["sensor_id"] = sensor_id
@@ -218,10 +448,20 @@ def update_record(record_id: str, sensor_id: Optional[str] = None,
     if value is not None:
         data["value"] = value
 
-    response = supabase.table("sensor_records").update(data).eq("id", record_id).execute()
-    return response.data[0]
+    backend = get_backend()
+    # The disk cache re-checks the months the record leaves and enters
+    previous = backend.get_record(record_id) if parquet_store is not None else None
+    record = backend.update_record(record_id, data)
+    series_cache.apply_update(record)
+    if parquet_store is not None:
+        if previous:
+            parquet_store.request_verification(previous["sensor_id"], [previous["recorded_at"]])
+        parquet_store.request_verification(record["sensor_id"], [record["recorded_at"]])
+    return record
 
 
+@invalidates_coalesced
+@instrumented
 def delete_record(record_id: str) -> bool:
     """
     Delete a sensor record.
@@ -235,8 +475,12 @@ def delete_record(record_id: str) -> bool:
     Raises:
         Exception: If database operation fails
     """
-    supabase = get_supabase()
-    supabase.table("sensor_records").delete().eq("id", record_id).execute()
+    backend = get_backend()
+    previous = backend.get_record(record_id) if parquet_store is not None else None
+    backend.delete_record(record_id)
+    series_cache.discard(record_id)
+    if previous:
+        parquet_store.request_verification(previous["sensor_id"], [previous["recorded_at"]])
     return True
 
 
@@ -244,50 +488,411 @@ def delete_record(record_id: str) -> bool:
 # ANALYST QUERY OPERATIONS
 # ============================================================================
 
+@instrumented
+def iter_records(sensor_ids: Optional[List[str]] = None,
+                 start_date: Optional[datetime] = None,
+                 end_date: Optional[datetime] = None,
+                 page_size: int = RECORDS_PAGE_SIZE,
+                 descending: bool = False) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Stream sensor records in keyset-paginated chunks.
+
+    Pages are walked on the (recorded_at, id) key, so every matching row is
+    returned exactly once no matter how many rows the range holds, and only
+    one page is held in memory at a time.
+
+    Args:
+        sensor_ids: List of sensor IDs to filter by (optional)
+        start_date: Start of date range (optional)
+        end_date: End of date range (optional)
+        page_size: Number of rows per page (default: RECORDS_PAGE_SIZE)
+        descending: Walk newest records first (default: False)
+
+    Yields:
+        Lists of record dictionaries with keys id, sensor_id, recorded_at
+        and value (join sensor metadata from sensor_catalog)
+    """
+    backend = get_backend()
+    last_key = None
+    page_count = 0
+    row_count = 0
+
+    while True:
+        rows = backend.fetch_records_page(
+            sensor_ids, start_date, end_date, last_key, page_size, descending
+        )
+        if not rows:
+            break
+
+        page_count += 1
+        row_count += len(rows)
+        yield rows
+
+        if len(rows) < page_size:
+            break
+        last_key = (rows[-1]["recorded_at"], rows[-1]["id"])
+
+    logger.info(f"✅ Streamed {row_count} records in {page_count} pages")
+
+
+@coalesced
+@instrumented
 def get_records_for_chart(sensor_ids: Optional[List[str]] = None,
                           start_date: Optional[datetime] = None,
                           end_date: Optional[datetime] = None) -> List[Dict[str, Any]]:
     """
     Fetch sensor records for charting with optional filters.
 
+    Bounded ranges are fetched as concurrent time partitions sized from the
+    estimated row count (see async_queries.get_records_partitioned).
+
     Args:
         sensor_ids: List of sensor IDs to filter by (optional)
         start_date: Start of date range (optional)
         end_date: End of date range (optional)
 
     Returns:
-        List of record dictionaries with sensor details
+        List of record dictionaries (id, sensor_id, recorded_at, value), oldest first
+    """
+    if start_date is not None and end_date is not None:
+        from database import async_queries
+        return async_queries.run(
+            async_queries.get_records_partitioned(sensor_ids, start_date, end_date)
+        )
+
+    return [
+        record
+        for chunk in iter_records(sensor_ids=sensor_ids, start_date=start_date, end_date=end_date)
+        for record in chunk
+    ]
+
+
+def _fetch_remote_ranges(windows: List[RangeRequest]) -> List[List[Dict[str, Any]]]:
+    """Load (sensor_id, start, end) windows from the backend, each split into concurrent partitions."""
+    from database import async_queries
+    return async_queries.gather(*(
+        async_queries.get_records_partitioned([sensor_id], start_date, end_date)
+        for sensor_id, start_date, end_date in windows
+    ))
+
+
+@instrumented
+def _fetch_changes(sensor_ids: List[str], since: str) -> List[Dict[str, Any]]:
+    """Fetch records inserted or updated since an ISO timestamp, walking keyset pages."""
+    backend = get_backend()
+    changes = []
+    last_key = None
+
+    while True:
+        page = backend.fetch_changes_page(sensor_ids, since, last_key, RECORDS_PAGE_SIZE)
+        changes.extend(page)
+        if len(page) < RECORDS_PAGE_SIZE:
+            return changes
+        last_key = (page[-1]["updated_at"], page[-1]["id"])
+
+
+@instrumented
+def _latest_update(sensor_ids: List[str]) -> Optional[str]:
+    """Newest updated_at of the sensors' records."""
+    return get_backend().latest_update(sensor_ids)
+
+
+_rollup_probe = {"available": False, "checked_at": None}
+
+
+def rollups_available() -> bool:
+    """
+    Check whether the backend has the rollup tiers.
+
+    On Supabase they exist once database/sql/sensor_record_rollups.sql has
+    been applied. A positive answer is kept for the life of the process; a
+    negative one is re-checked after ROLLUP_PROBE_INTERVAL seconds, so
+    applying the script takes effect without a restart.
+
+    Returns:
+        True if get_rollup_records can be used
+    """
+    if _rollup_probe["available"]:
+        return True
+    checked_at = _rollup_probe["checked_at"]
+    if checked_at is None or time.monotonic() - checked_at > ROLLUP_PROBE_INTERVAL:
+        _rollup_probe["available"] = get_backend().has_rollups()
+        _rollup_probe["checked_at"] = time.monotonic()
+        if not _rollup_probe["available"]:
+            logger.warning("⚠️ sensor_record_rollups is not installed, counting months from raw records")
+    return _rollup_probe["available"]
+
+
+def _count_months(sensor_id: str, start_date: Optional[datetime],
+                  end_date: Optional[datetime]) -> Dict[str, int]:
+    """Record counts of one sensor per UTC month, one exact count per month (no rollups needed)."""
+    backend = get_backend()
+    if start_date is None or end_date is None:
+        # Open bounds end at the sensor's first or last record
+        first = backend.fetch_records_page([sensor_id], start_date, end_date, None, 1)
+        if not first:
+            return {}
+        last = backend.fetch_records_page([sensor_id], start_date, end_date, None, 1, descending=True)
+        start_date = start_date or datetime.fromisoformat(first[0]["recorded_at"])
+        end_date = end_date or datetime.fromisoformat(last[0]["recorded_at"])
+    start_date = start_date.astimezone(timezone.utc)
+    end_date = end_date.astimezone(timezone.utc)
+
+    months = []
+    windows = []
+    month_start = start_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    while month_start <= end_date:
+        following = (month_start + timedelta(days=32)).replace(day=1)
+        months.append(month_start.strftime("%Y-%m"))
+        windows.append((max(month_start, start_date), min(following - timedelta(microseconds=1), end_date)))
+        month_start = following
+
+    from database import async_queries
+    counts = async_queries.run(async_queries.count_records_by_window([sensor_id], windows))
+    return {month: count for month, count in zip(months, counts) if count}
+
+
+def _fetch_monthly_counts(sensor_id: str, start_date: Optional[datetime],
+                          end_date: Optional[datetime]) -> Dict[str, int]:
+    """
+    Record counts of one sensor per UTC month in a range (None for open bounds).
+
+    Summed from the 1d rollups when the backend has them, otherwise counted
+    month by month in sensor_records.
+    """
+    if not rollups_available():
+        return _count_months(sensor_id, start_date, end_date)
+
+    counts: Dict[str, int] = {}
+    buckets = get_rollup_records(
+        [sensor_id], start_date or datetime(1970, 1, 1, tzinfo=timezone.utc),
+        end_date or datetime(2100, 1, 1, tzinfo=timezone.utc), "1d"
+    )
+    for bucket in buckets:
+        month = datetime.fromisoformat(bucket["bucket_start"]).astimezone(timezone.utc).strftime("%Y-%m")
+        counts[month] = counts.get(month, 0) + bucket["sample_count"]
+    return counts
+
+
+# On-disk copy of sensor_records that range loads are served from (None if disabled)
+parquet_store = ParquetStore(
+    PARQUET_CACHE_DIR, _fetch_remote_ranges, _fetch_changes, _latest_update, _fetch_monthly_counts
+) if parquet_available() else None
+
+
+@instrumented
+def _fetch_ranges(windows: List[RangeRequest]) -> List[WindowRecords]:
+    """Load windows for the series cache, from the disk cache when it is enabled."""
+    if parquet_store is not None:
+        return parquet_store.read_windows(windows)
+    return _fetch_remote_ranges(windows)
+
+
+series_cache = SeriesCache(_fetch_ranges, _fetch_changes, _latest_update)
+
+
+@coalesced
+@instrumented
+def get_series_records(sensor_ids: List[str],
+                       start_date: Optional[datetime] = None,
+                       end_date: Optional[datetime] = None) -> pd.DataFrame:
+    """
+    Fetch records of the given sensors through the incremental series cache.
+
+    The first view of a range loads it; later views only fetch rows inserted
+    or changed since the previous one (see database/series_cache.py).
+
+    Args:
+        sensor_ids: List of sensor IDs
+        start_date: Start of date range (optional)
+        end_date: End of date range (optional)
+
+    Returns:
+        Frame with columns id, sensor_id (categorical), recorded_at
+        (datetime64 UTC) and value, grouped by sensor and oldest first
+    """
+    return series_cache.get(sensor_ids, start_date, end_date)
+
+
+@coalesced
+@instrumented
+def count_records(sensor_ids: Optional[List[str]] = None,
+                  start_date: Optional[datetime] = None,
+                  end_date: Optional[datetime] = None,
+                  estimated: bool = False) -> int:
     """
-    supabase = get_supabase()
-    query = supabase.table("sensor_records").select("*, sensors(name, unit)")
+    Count sensor records matching the filters.
 
-    # Apply filters
-    if sensor_ids:
-        query = query.in_("sensor_id", sensor_ids)
-    if start_date:
-        query = query.gte("recorded_at", start_date.isoformat())
-    if end_date:
-        query = query.lte("recorded_at", end_date.isoformat())
+    Args:
+        sensor_ids: List of sensor IDs to filter by (optional)
+        start_date: Start of date range (optional)
+        end_date: End of date range (optional)
+        estimated: Allow a planner estimate for large counts (default: False).
+            Counts up to RECORDS_PAGE_SIZE are always exact.
+
+    Returns:
+        Number of matching records
+    """
+    return get_backend().count_records(sensor_ids, start_date, end_date, estimated)
+
+
+@coalesced
+@instrumented
+def get_records_page(sensor_ids: Optional[List[str]] = None,
+                     start_date: Optional[datetime] = None,
+                     end_date: Optional[datetime] = None,
+                     after: Optional[Tuple[str, str]] = None,
+                     before: Optional[Tuple[str, str]] = None,
+                     from_end: bool = False,
+                     page_size: int = 50,
+                     descending: bool = False) -> List[Dict[str, Any]]:
+    """
+    Fetch one page of sensor records in (recorded_at, id) order.
+
+    Pages are addressed by keyset, so every page costs one indexed range
+    query regardless of how deep into the result it is:
+    - after: the page that follows this (recorded_at, id) key
+    - before: the page that ends just before this key (walked backwards)
+    - from_end: the last page of the result
+    - none of them: the first page
+
+    Args:
+        sensor_ids: List of sensor IDs to filter by (optional)
+        start_date: Start of date range (optional)
+        end_date: End of date range (optional)
+        after: Key of the last row of the previous page
+        before: Key of the first row of the next page
+        from_end: Fetch the last page_size rows
+        page_size: Number of rows on the page (default: 50)
+        descending: Newest records first (default: False)
+
+    Returns:
+        Record dictionaries (id, sensor_id, recorded_at, value) in display
+        order (join sensor metadata from sensor_catalog)
+    """
+    backend = get_backend()
+    backwards = before is not None or from_end
+
+    rows = backend.fetch_records_page(
+        sensor_ids, start_date, end_date,
+        before if backwards else after,
+        page_size,
+        descending != backwards
+    )
+    if backwards:
+        rows.reverse()
+    return rows
+
+
+@coalesced
+@instrumented
+def get_record_stats(sensor_ids: Optional[List[str]] = None,
+                     start_date: Optional[datetime] = None,
+                     end_date: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """
+    Fetch per-sensor summary statistics for a date range in one query.
+
+    Aggregation runs in the database (on Supabase, the sensor_record_stats
+    function in database/sql/sensor_record_stats.sql), so the cost does not
+    depend on how many records the range holds.
+
+    Args:
+        sensor_ids: List of sensor IDs to filter by (None for all sensors)
+        start_date: Start of date range (optional)
+        end_date: End of date range (optional)
+
+    Returns:
+        List of dictionaries with keys: sensor_id, sensor_name, sensor_unit,
+        sample_count, min_value, max_value, avg_value, stddev_value,
+        first_at, first_value, last_at, last_value
+    """
+    stats = get_backend().fetch_record_stats(sensor_ids, start_date, end_date)
+
+    sensors = sensor_catalog.index_for(row["sensor_id"] for row in stats)
+    for row in stats:
+        sensor = sensors.get(str(row["sensor_id"]), {})
+        row["sensor_name"] = sensor.get("name")
+        row["sensor_unit"] = sensor.get("unit")
+    return stats
 
-    # Order by timestamp
-    query = query.order("recorded_at", desc=False)
 
-    response = query.execute()
-    return response.data
+def plan_chart_query(start_date: datetime, end_date: datetime,
+                     pixel_width: Optional[int] = None,
+                     min_points: int = ROLLUP_MIN_POINTS) -> Optional[str]:
+    """
+    Pick the rollup tier a chart over the given range should read.
+
+    The coarsest tier that still yields about one bucket per pixel of the
+    chart, and at least min_points buckets per sensor, is chosen: on a
+    1200 px chart a year reads ~8.8k hourly rows and a week ~10k minute
+    rows instead of every raw reading.
 
+    Args:
+        start_date: Start of date range
+        end_date: End of date range
+        pixel_width: Chart width in pixels (optional)
+        min_points: Minimum buckets per sensor across the range
 
-def get_all_records_for_export() -> List[Dict[str, Any]]:
+    Returns:
+        Tier key of ROLLUP_TIERS, or None if the range is short enough to
+        plot raw records
+    """
+    span_seconds = (end_date - start_date).total_seconds()
+    needed = max(min_points, pixel_width or 0)
+    for tier, width in sorted(ROLLUP_TIERS.items(), key=lambda item: -item[1]):
+        if span_seconds / width >= needed:
+            return tier
+    return None
+
+
+@coalesced
+@instrumented
+def get_rollup_records(sensor_ids: Optional[List[str]], start_date: datetime,
+                       end_date: datetime, tier: str) -> List[Dict[str, Any]]:
     """
-    Fetch all sensor records with sensor information for CSV export.
+    Fetch pre-aggregated rollup buckets for charting.
+
+    Rollups are maintained as records are written (on Supabase, the
+    triggers in database/sql/sensor_record_rollups.sql), so this reads one
+    stored row per sensor and bucket without scanning raw records.
+
+    Args:
+        sensor_ids: List of sensor IDs to filter by (None for all sensors)
+        start_date: Start of date range (floored to the tier's bucket)
+        end_date: End of date range
+        tier: Key of ROLLUP_TIERS
 
     Returns:
-        List of all records with sensor details
-    """
-    supabase = get_supabase()
-    response = (
-        supabase.table("sensor_records")
-        .select("*, sensors(name, unit)")
-        .order("recorded_at", desc=False)
-        .execute()
+        List of bucket dictionaries with keys: sensor_id, sensor_name,
+        sensor_unit, bucket_start, min_value, max_value, avg_value,
+        sample_count
+    """
+    logger.info(f"📊 Fetching {tier} rollups for chart...")
+    backend = get_backend()
+    width = ROLLUP_TIERS[tier]
+    # Tiers are aligned to UTC, so the bucket holding start_date starts here
+    bucket_start = datetime.fromtimestamp(
+        math.floor(start_date.timestamp() / width) * width, tz=timezone.utc
     )
-    return response.data
+
+    buckets = []
+    last_key = None
+    while True:
+        page = backend.fetch_rollup_page(
+            tier, sensor_ids, bucket_start, end_date, last_key, RECORDS_PAGE_SIZE
+        )
+        buckets.extend(page)
+
+        if len(page) < RECORDS_PAGE_SIZE:
+            break
+        last_key = (page[-1]["sensor_id"], page[-1]["bucket_start"])
+
+    sensors = sensor_catalog.index_for(row["sensor_id"] for row in buckets)
+    for row in buckets:
+        sensor = sensors.get(str(row["sensor_id"]), {})
+        row["sensor_name"] = sensor.get("name")
+        row["sensor_unit"] = sensor.get("unit")
+        row["avg_value"] = row.pop("sum_value") / row["sample_count"]
+
+    logger.info(f"✅ Retrieved {len(buckets)} {tier} rollups")
+    return buckets
@@ -0,0 +1,427 @@
+"""
+Per-sensor series cache with incremental (delta) sync.
+
+Analyst reruns ask for the same sensors and nearly the same date range over
+and over. The cache keeps each sensor's records for the range it has loaded as
+column arrays sorted by recorded_at (int64 nanoseconds, object ids and
+float64 values, about 100 bytes per row instead of a dict per row), and
+remembers two high-water marks:
+- the covered recorded_at range (open-ended when it reached "now", because
+  newly arriving readings are picked up by the delta sync)
+- the newest updated_at seen, so a refresh only asks for rows inserted or
+  edited since then
+
+A repeat view therefore costs one small "changed since" query for all
+requested sensors. Ranges outside the covered one are fetched for the gap
+only. Edits and deletes made through database.queries are applied to the
+cache directly; deletes made by other processes are not visible to a delta
+query, so every series is reloaded in full after SERIES_CACHE_FULL_REFRESH
+seconds.
+
+The cache is shared by all sessions. Its lock only guards the in-memory
+state: windows are planned under the lock, fetched without it, and merged
+under it again, so one session's multi-month load does not block another
+session's cache hit. Because the state may change while a fetch is in
+flight, coverage is re-checked after every merge.
+"""
+
+import os
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Re-read this much before the updated_at high-water mark, so rows committed
+# late by a slow transaction are not missed (duplicates merge by id)
+SYNC_OVERLAP_SECONDS = float(os.getenv("SYNC_OVERLAP_SECONDS", "10"))
+
+# Seconds after which a series is reloaded in full (catches foreign deletes)
+SERIES_CACHE_FULL_REFRESH = float(os.getenv("SERIES_CACHE_FULL_REFRESH", "900"))
+
+# Total cached rows; least recently used sensors are evicted beyond this
+SERIES_CACHE_MAX_ROWS = int(os.getenv("SERIES_CACHE_MAX_ROWS", "500000"))
+
+# Plan/fetch/merge rounds per read before the missing ranges are served
+# uncached (only reached when other sessions keep evicting the same sensors)
+LOAD_ATTEMPTS = 3
+
+RangeRequest = Tuple[str, Optional[datetime], Optional[datetime]]
+
+# One window's records as recorded_at (int64 ns), id (object) and value
+# (float64) arrays, as read from the Parquet disk cache
+RecordColumns = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+# What fetch_ranges may return per window: record dictionaries or columns
+WindowRecords = Union[List[Dict[str, Any]], RecordColumns]
+
+# Columns of the frames returned by SeriesCache.get
+RECORD_COLUMNS = ['id', 'sensor_id', 'recorded_at', 'value']
+
+
+def _parse(value: Any) -> datetime:
+    """Parse an ISO timestamp (or pass a datetime through) as an aware UTC datetime."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _to_ns(moment: datetime) -> int:
+    """Nanoseconds since the epoch of an aware datetime."""
+    return pd.Timestamp(moment).value
+
+
+def _columns(rows: WindowRecords) -> RecordColumns:
+    """recorded_at (ns), id and value arrays of rows; the last row of a repeated id wins."""
+    if isinstance(rows, tuple):
+        times, ids, values = rows
+        repeated = pd.Index(ids).duplicated(keep="last")
+        if repeated.any():
+            keep = ~repeated
+            times, ids, values = times[keep], ids[keep], values[keep]
+        return times, ids, values
+    latest = {row["id"]: row for row in rows}
+    if len(latest) < len(rows):
+        rows = list(latest.values())
+    times = pd.to_datetime([row["recorded_at"] for row in rows], utc=True, format="ISO8601").asi8
+    ids = np.array([row["id"] for row in rows], dtype=object)
+    values = np.array([row["value"] for row in rows], dtype=np.float64)
+    return times, ids, values
+
+
+class _Series:
+    """Records of one sensor over a covered time range, as sorted column arrays."""
+
+    def __init__(self, start: Optional[datetime], end: Optional[datetime],
+                 synced_to: Optional[datetime] = None):
+        self.start = start
+        self.end = end
+        # Newest updated_at reflected in this series (delta sync high-water mark)
+        self.synced_to = synced_to
+        self.times = np.empty(0, dtype=np.int64)
+        self.ids = np.empty(0, dtype=object)
+        self.values = np.empty(0, dtype=np.float64)
+        self.loaded_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def contains(self, moment: datetime) -> bool:
+        return (self.start is None or moment >= self.start) and (self.end is None or moment <= self.end)
+
+    def covers(self, start: Optional[datetime], end: Optional[datetime]) -> bool:
+        starts_in = self.start is None or (start is not None and start >= self.start)
+        ends_in = self.end is None or (end is not None and end <= self.end)
+        return starts_in and ends_in
+
+    def overlaps(self, start: Optional[datetime], end: Optional[datetime]) -> bool:
+        return ((self.end is None or start is None or start <= self.end)
+                and (self.start is None or end is None or end >= self.start))
+
+    def discard(self, record_ids: Iterable[str]) -> int:
+        """Remove records by ID; returns how many were present."""
+        record_ids = set(record_ids)
+        if not record_ids or not len(self):
+            return 0
+        keep = np.fromiter((record_id not in record_ids for record_id in self.ids),
+                           dtype=bool, count=len(self.ids))
+        removed = len(keep) - int(keep.sum())
+        if removed:
+            self.times, self.ids, self.values = self.times[keep], self.ids[keep], self.values[keep]
+        return removed
+
+    def merge(self, rows: WindowRecords) -> int:
+        """Insert or replace records (one stable sort for the whole batch); returns how many."""
+        times, ids, values = _columns(rows)
+        count = len(times)
+        if not count:
+            return 0
+        self.discard(ids)
+        times = np.concatenate([self.times, times])
+        order = np.argsort(times, kind="stable")
+        self.times = times[order]
+        self.ids = np.concatenate([self.ids, ids])[order]
+        self.values = np.concatenate([self.values, values])[order]
+        return count
+
+    def slice(self, start: Optional[datetime],
+              end: Optional[datetime]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Views of the columns with start <= recorded_at <= end."""
+        low = 0 if start is None else int(np.searchsorted(self.times, _to_ns(start), side="left"))
+        high = len(self) if end is None else int(np.searchsorted(self.times, _to_ns(end), side="right"))
+        return self.times[low:high], self.ids[low:high], self.values[low:high]
+
+
+def _frame(parts: List[Tuple[str, Tuple[np.ndarray, np.ndarray, np.ndarray]]]) -> pd.DataFrame:
+    """Concatenate per-sensor column slices into one record frame."""
+    sensor_ids = [sensor_id for sensor_id, _ in parts]
+    codes = np.repeat(np.arange(len(parts)), [len(columns[0]) for _, columns in parts])
+
+    def column(position: int, dtype: Any) -> np.ndarray:
+        arrays = [columns[position] for _, columns in parts]
+        return np.concatenate(arrays) if arrays else np.empty(0, dtype=dtype)
+
+    return pd.DataFrame({
+        "id": column(1, object),
+        "sensor_id": pd.Categorical.from_codes(codes, categories=sensor_ids),
+        "recorded_at": pd.to_datetime(column(0, np.int64), unit="ns", utc=True),
+        "value": column(2, np.float64),
+    })
+
+
+class SeriesCache:
+    """Process-wide per-sensor record cache kept current with delta queries."""
+
+    def __init__(self, fetch_ranges: Callable[[List[RangeRequest]], List[WindowRecords]],
+                 fetch_changes: Callable[[List[str], str], List[Dict[str, Any]]],
+                 latest_update: Callable[[List[str]], Optional[str]],
+                 max_rows: int = SERIES_CACHE_MAX_ROWS,
+                 full_refresh: float = SERIES_CACHE_FULL_REFRESH):
+        """
+        Args:
+            fetch_ranges: Loads records for (sensor_id, start, end) windows,
+                one list of records (or RecordColumns) per window in
+                request order
+            fetch_changes: Returns rows (with updated_at) of the given sensors
+                whose updated_at >= the given ISO timestamp
+            latest_update: Returns the newest updated_at of the given sensors
+            max_rows: Row budget across all sensors
+            full_refresh: Seconds before a series is reloaded in full
+        """
+        self._fetch_ranges = fetch_ranges
+        self._fetch_changes = fetch_changes
+        self._latest_update = latest_update
+        self._max_rows = max_rows
+        self._full_refresh = full_refresh
+        self._series: "OrderedDict[str, _Series]" = OrderedDict()
+        # Guards the in-memory state only; never held across a fetch
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def get(self, sensor_ids: List[str], start_date: Optional[datetime] = None,
+            end_date: Optional[datetime] = None) -> pd.DataFrame:
+        """
+        Get records of the sensors in a date range, syncing only what changed.
+
+        Args:
+            sensor_ids: Sensors to read
+            start_date: Start of date range (optional)
+            end_date: End of date range (optional)
+
+        Returns:
+            Frame with columns id, sensor_id (categorical), recorded_at
+            (datetime64 UTC) and value, grouped in sensor_ids order and
+            oldest first within a sensor
+        """
+        sensor_ids = list(dict.fromkeys(str(sensor_id) for sensor_id in sensor_ids))
+        start = _parse(start_date) if start_date else None
+        end = _parse(end_date) if end_date else None
+
+        with self._lock:
+            now = time.monotonic()
+            for sensor_id in sensor_ids:
+                series = self._series.get(sensor_id)
+                expired = series is not None and now - series.loaded_at > self._full_refresh
+                if expired or (series is not None and not series.overlaps(start, end)):
+                    self._drop(sensor_id)
+            cached = [sensor_id for sensor_id in sensor_ids if sensor_id in self._series]
+
+        if cached:
+            self._sync(cached)
+
+        for _ in range(LOAD_ATTEMPTS):
+            with self._lock:
+                windows = self._missing_windows(sensor_ids, start, end)
+            if not windows:
+                break
+            self._load(windows, start, end)
+
+        with self._lock:
+            # Another session may have evicted or replaced a series since the
+            # last merge; whatever is still missing is served uncached
+            uncovered = [
+                sensor_id for sensor_id in sensor_ids
+                if sensor_id not in self._series or not self._series[sensor_id].covers(start, end)
+            ]
+            # Views stay valid after the lock is released: merges and
+            # discards replace a series' arrays instead of modifying them
+            result = {
+                sensor_id: self._series[sensor_id].slice(start, end)
+                for sensor_id in sensor_ids if sensor_id not in uncovered
+            }
+            for sensor_id in result:
+                self._series.move_to_end(sensor_id)
+            self._evict(keep=set(sensor_ids))
+
+        if uncovered:
+            logger.warning(f"⚠️ Series cache contention, reading {len(uncovered)} sensors uncached")
+            windows = [(sensor_id, start, end) for sensor_id in uncovered]
+            for (sensor_id, _, _), rows in zip(windows, self._fetch_ranges(windows)):
+                series = _Series(start, end)
+                series.merge(rows)
+                result[sensor_id] = series.slice(start, end)
+
+        return _frame([(sensor_id, result[sensor_id]) for sensor_id in sensor_ids])
+
+    def _sync(self, sensor_ids: List[str]) -> None:
+        """Apply rows inserted or changed since the sensors' updated_at high-water marks."""
+        with self._lock:
+            marks = [self._series[s].synced_to for s in sensor_ids if s in self._series]
+        if not marks:
+            return
+        if any(mark is None for mark in marks):
+            # Nothing was stored when some series were loaded
+            since = datetime.min.replace(tzinfo=timezone.utc)
+        else:
+            since = min(marks) - timedelta(seconds=SYNC_OVERLAP_SECONDS)
+
+        changes = self._fetch_changes(sensor_ids, since.isoformat())
+
+        with self._lock:
+            self._apply(changes)
+            newest = max((_parse(row["updated_at"]) for row in changes if row.get("updated_at")),
+                         default=None)
+            if newest is not None:
+                # The query covered all these sensors up to newest
+                for sensor_id in sensor_ids:
+                    series = self._series.get(sensor_id)
+                    if series is not None and (series.synced_to is None or newest > series.synced_to):
+                        series.synced_to = newest
+        if changes:
+            logger.info(f"🔄 Synced {len(changes)} changed records for {len(sensor_ids)} sensors")
+
+    def _missing_windows(self, sensor_ids: List[str], start: Optional[datetime],
+                         end: Optional[datetime]) -> List[RangeRequest]:
+        """Parts of the range the cached series do not cover (call with the lock held)."""
+        windows: List[RangeRequest] = []
+        for sensor_id in sensor_ids:
+            series = self._series.get(sensor_id)
+            if series is None:
+                windows.append((sensor_id, start, end))
+                continue
+            if series.covers(start, end):
+                continue
+            if series.start is not None and (start is None or start < series.start):
+                windows.append((sensor_id, start, series.start))
+            if series.end is not None and (end is None or end > series.end):
+                windows.append((sensor_id, series.end, end))
+        return windows
+
+    def _load(self, windows: List[RangeRequest], start: Optional[datetime],
+              end: Optional[datetime]) -> None:
+        """Fetch windows without the lock, then merge them into the series."""
+        # A range reaching the present stays open: new readings arrive by delta sync
+        now = datetime.now(timezone.utc)
+        open_end = None if end is None or end >= now else end
+
+        # Take the high-water mark before loading, so changes made during
+        # the load are picked up by the next sync
+        latest_update = self._latest_update(sorted({sensor_id for sensor_id, _, _ in windows}))
+        latest = _parse(latest_update) if latest_update else None
+        loaded = self._fetch_ranges(windows)
+
+        rows_loaded = 0
+        with self._lock:
+            for (sensor_id, window_start, window_end), rows in zip(windows, loaded):
+                series = self._series.get(sensor_id)
+                if series is None:
+                    # New, or dropped by another session while fetching: the
+                    # window alone is what this series now covers
+                    series = self._series[sensor_id] = _Series(
+                        window_start, None if window_end is None or window_end >= now else window_end, latest
+                    )
+                elif not series.overlaps(window_start, window_end):
+                    # Replaced by another session with a disjoint range
+                    continue
+                else:
+                    if series.start is not None and (window_start is None or window_start < series.start):
+                        series.start = window_start
+                    if series.end is not None and (window_end is None or window_end > series.end):
+                        series.end = open_end
+                    # Rows changed during the load are re-read by the next sync
+                    if series.synced_to is not None and latest is not None and latest < series.synced_to:
+                        series.synced_to = latest
+                rows_loaded += series.merge(rows)
+
+        logger.info(f"✅ Loaded {rows_loaded} records in {len(windows)} windows into the series cache")
+
+    # ------------------------------------------------------------------
+    # Writes (reconcile local edits)
+    # ------------------------------------------------------------------
+
+    def apply_update(self, row: Dict[str, Any]) -> None:
+        """Reflect an updated (or inserted) record in the cache."""
+        with self._lock:
+            self._apply([row])
+
+    def discard(self, record_id: str) -> None:
+        """Remove a deleted record from the cache."""
+        with self._lock:
+            for series in self._series.values():
+                if series.discard([record_id]):
+                    break
+
+    def drop_sensor(self, sensor_id: str) -> None:
+        """Forget a sensor's series (e.g. after the sensor was deleted)."""
+        with self._lock:
+            self._drop(sensor_id)
+
+    def clear(self) -> None:
+        """Forget everything."""
+        with self._lock:
+            self._series.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dictionary with keys: sensors, rows
+        """
+        with self._lock:
+            rows = sum(len(series) for series in self._series.values())
+            return {"sensors": len(self._series), "rows": rows}
+
+    # ------------------------------------------------------------------
+    # Internals (call with the lock held)
+    # ------------------------------------------------------------------
+
+    def _apply(self, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        # A changed row may have moved to another sensor or out of the range
+        changed = {row["id"] for row in rows}
+        for series in self._series.values():
+            series.discard(changed)
+
+        by_sensor: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            by_sensor.setdefault(str(row["sensor_id"]), []).append(row)
+        for sensor_id, sensor_rows in by_sensor.items():
+            series = self._series.get(sensor_id)
+            if series is not None:
+                series.merge([row for row in sensor_rows if series.contains(_parse(row["recorded_at"]))])
+
+    def _drop(self, sensor_id: str) -> None:
+        self._series.pop(sensor_id, None)
+
+    def _evict(self, keep: set) -> None:
+        total = sum(len(series) for series in self._series.values())
+        for sensor_id in list(self._series):
+            if total <= self._max_rows:
+                break
+            if sensor_id in keep:
+                continue
+            total -= len(self._series[sensor_id])
+            self._drop(sensor_id)
+            logger.info(f"🧹 Evicted sensor {sensor_id} from the series cache")
@@ -0,0 +1,237 @@
+-- Multi-resolution rollups of sensor_records for the analyst chart.
+--
+-- sensor_record_rollups holds count/min/max/sum per sensor at three tiers:
+-- '1m' (built from raw readings), '1h' (from '1m') and '1d' (from '1h').
+-- Statement-level triggers on sensor_records re-aggregate only the buckets
+-- touched by each insert, update or delete, so single edits from the app
+-- and bulk imports keep the tiers current in the same transaction.
+-- Concurrent writers to one bucket are serialized with advisory locks.
+-- Read by database.queries.get_rollup_records via SupabaseBackend.fetch_rollup_page().
+--
+-- Apply in the Supabase SQL editor (or psql) once per project. The last
+-- statement backfills the tiers from existing records.
+
+create table if not exists public.sensor_record_rollups (
+    tier text not null check (tier in ('1m', '1h', '1d')),
+    sensor_id uuid not null references public.sensors(id) on delete cascade,
+    bucket_start timestamptz not null,
+    sample_count bigint not null,
+    min_value double precision not null,
+    max_value double precision not null,
+    sum_value double precision not null,
+    primary key (tier, sensor_id, bucket_start)
+);
+
+-- Supports the per-bucket range scans of the 1-minute refresh; a no-op if it already exists
+create index if not exists sensor_records_sensor_id_recorded_at_idx
+    on public.sensor_records (sensor_id, recorded_at);
+
+-- Replaced by the rollup tiers
+drop function if exists public.sensor_record_buckets(uuid[], timestamptz, timestamptz, integer);
+
+-- Re-aggregate the buckets containing the given (sensor, timestamp) pairs.
+--
+-- Parallel batch chunks, the outbox flusher and the ingest service can write
+-- to the same buckets at once. Each recompute below reads from its own
+-- statement snapshot, so without serialization the writer that commits last
+-- would overwrite the others' counts. Every touched bucket is therefore
+-- locked first with a transaction-level advisory lock per (sensor, UTC day
+-- of the bucket start): a 1m, 1h or 1d bucket always falls under the lock of
+-- the day it starts in. Waiting on the lock lets the other writer commit,
+-- and the recompute statements that follow take a fresh snapshot (READ
+-- COMMITTED, as used by PostgREST) that includes its rows. Locks are taken
+-- in key order so two writers cannot deadlock on each other.
+create or replace function public.refresh_sensor_record_rollups(
+    p_sensor_ids uuid[],
+    p_recorded_at timestamptz[]
+)
+returns void
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_lock_key integer;
+begin
+    for v_lock_key in
+        select distinct hashtext(k.sensor_id::text || ':' || extract(epoch from d.day_start)::bigint)
+        from unnest(p_sensor_ids, p_recorded_at) as k(sensor_id, recorded_at)
+        cross join lateral (values
+            (date_trunc('day', k.recorded_at, 'UTC')),
+            (date_trunc('day', date_trunc('hour', k.recorded_at), 'UTC'))
+        ) as d(day_start)
+        order by 1
+    loop
+        perform pg_advisory_xact_lock(hashtext('sensor_record_rollups'), v_lock_key);
+    end loop;
+
+    -- 1-minute tier from raw readings
+    with keys as (
+        select distinct k.sensor_id, date_trunc('minute', k.recorded_at) as bucket_start
+        from unnest(p_sensor_ids, p_recorded_at) as k(sensor_id, recorded_at)
+    ),
+    fresh as (
+        select k.sensor_id, k.bucket_start,
+               count(r.id) as sample_count,
+               min(r.value)::double precision as min_value,
+               max(r.value)::double precision as max_value,
+               sum(r.value)::double precision as sum_value
+        from keys k
+        left join sensor_records r
+               on r.sensor_id = k.sensor_id
+              and r.recorded_at >= k.bucket_start
+              and r.recorded_at < k.bucket_start + interval '1 minute'
+        group by k.sensor_id, k.bucket_start
+    ),
+    emptied as (
+        delete from sensor_record_rollups t
+        using fresh f
+        where t.tier = '1m' and t.sensor_id = f.sensor_id
+          and t.bucket_start = f.bucket_start and f.sample_count = 0
+    )
+    insert into sensor_record_rollups
+    select '1m', sensor_id, bucket_start, sample_count, min_value, max_value, sum_value
+    from fresh where sample_count > 0
+    on conflict (tier, sensor_id, bucket_start) do update
+        set sample_count = excluded.sample_count, min_value = excluded.min_value,
+            max_value = excluded.max_value, sum_value = excluded.sum_value;
+
+    -- 1-hour tier from the 1-minute tier
+    with keys as (
+        select distinct k.sensor_id, date_trunc('hour', k.recorded_at) as bucket_start
+        from unnest(p_sensor_ids, p_recorded_at) as k(sensor_id, recorded_at)
+    ),
+    fresh as (
+        select k.sensor_id, k.bucket_start,
+               coalesce(sum(m.sample_count), 0) as sample_count,
+               min(m.min_value) as min_value,
+               max(m.max_value) as max_value,
+               sum(m.sum_value) as sum_value
+        from keys k
+        left join sensor_record_rollups m
+               on m.tier = '1m' and m.sensor_id = k.sensor_id
+              and m.bucket_start >= k.bucket_start
+              and m.bucket_start < k.bucket_start + interval '1 hour'
+        group by k.sensor_id, k.bucket_start
+    ),
+    emptied as (
+        delete from sensor_record_rollups t
+        using fresh f
+        where t.tier = '1h' and t.sensor_id = f.sensor_id
+          and t.bucket_start = f.bucket_start and f.sample_count = 0
+    )
+    insert into sensor_record_rollups
+    select '1h', sensor_id, bucket_start, sample_count, min_value, max_value, sum_value
+    from fresh where sample_count > 0
+    on conflict (tier, sensor_id, bucket_start) do update
+        set sample_count = excluded.sample_count, min_value = excluded.min_value,
+            max_value = excluded.max_value, sum_value = excluded.sum_value;
+
+    -- 1-day tier (UTC days) from the 1-hour tier
+    with keys as (
+        select distinct k.sensor_id, date_trunc('day', k.recorded_at, 'UTC') as bucket_start
+        from unnest(p_sensor_ids, p_recorded_at) as k(sensor_id, recorded_at)
+    ),
+    fresh as (
+        select k.sensor_id, k.bucket_start,
+               coalesce(sum(h.sample_count), 0) as sample_count,
+               min(h.min_value) as min_value,
+               max(h.max_value) as max_value,
+               sum(h.sum_value) as sum_value
+        from keys k
+        left join sensor_record_rollups h
+               on h.tier = '1h' and h.sensor_id = k.sensor_id
+              and h.bucket_start >= k.bucket_start
+              and h.bucket_start < k.bucket_start + interval '1 day'
+        group by k.sensor_id, k.bucket_start
+    ),
+    emptied as (
+        delete from sensor_record_rollups t
+        using fresh f
+        where t.tier = '1d' and t.sensor_id = f.sensor_id
+          and t.bucket_start = f.bucket_start and f.sample_count = 0
+    )
+    insert into sensor_record_rollups
+    select '1d', sensor_id, bucket_start, sample_count, min_value, max_value, sum_value
+    from fresh where sample_count > 0
+    on conflict (tier, sensor_id, bucket_start) do update
+        set sample_count = excluded.sample_count, min_value = excluded.min_value,
+            max_value = excluded.max_value, sum_value = excluded.sum_value;
+end;
+$$;
+
+-- Transition tables need one trigger per event; the function checks TG_OP
+create or replace function public.sensor_records_refresh_rollups()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    v_sensor_ids uuid[];
+    v_recorded_at timestamptz[];
+begin
+    if tg_op = 'INSERT' then
+        select array_agg(sensor_id), array_agg(recorded_at)
+          into v_sensor_ids, v_recorded_at
+          from (select distinct sensor_id, date_trunc('minute', recorded_at) as recorded_at
+                from new_rows) k;
+    elsif tg_op = 'UPDATE' then
+        select array_agg(sensor_id), array_agg(recorded_at)
+          into v_sensor_ids, v_recorded_at
+          from (select sensor_id, date_trunc('minute', recorded_at) as recorded_at from new_rows
+                union
+                select sensor_id, date_trunc('minute', recorded_at) from old_rows) k;
+    else
+        select array_agg(sensor_id), array_agg(recorded_at)
+          into v_sensor_ids, v_recorded_at
+          from (select distinct sensor_id, date_trunc('minute', recorded_at) as recorded_at
+                from old_rows) k;
+    end if;
+
+    if v_sensor_ids is not null then
+        perform refresh_sensor_record_rollups(v_sensor_ids, v_recorded_at);
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists sensor_records_rollups_insert on public.sensor_records;
+create trigger sensor_records_rollups_insert
+    after insert on public.sensor_records
+    referencing new table as new_rows
+    for each statement execute function public.sensor_records_refresh_rollups();
+
+drop trigger if exists sensor_records_rollups_update on public.sensor_records;
+create trigger sensor_records_rollups_update
+    after update on public.sensor_records
+    referencing old table as old_rows new table as new_rows
+    for each statement execute function public.sensor_records_refresh_rollups();
+
+drop trigger if exists sensor_records_rollups_delete on public.sensor_records;
+create trigger sensor_records_rollups_delete
+    after delete on public.sensor_records
+    referencing old table as old_rows
+    for each statement execute function public.sensor_records_refresh_rollups();
+
+-- Backfill (no-op for buckets that already exist)
+insert into public.sensor_record_rollups
+select '1m', sensor_id, date_trunc('minute', recorded_at), count(*),
+       min(value), max(value), sum(value)
+from public.sensor_records
+group by sensor_id, date_trunc('minute', recorded_at)
+on conflict do nothing;
+
+insert into public.sensor_record_rollups
+select '1h', sensor_id, date_trunc('hour', bucket_start), sum(sample_count),
+       min(min_value), max(max_value), sum(sum_value)
+from public.sensor_record_rollups where tier = '1m'
+group by sensor_id, date_trunc('hour', bucket_start)
+on conflict do nothing;
+
+insert into public.sensor_record_rollups
+select '1d', sensor_id, date_trunc('day', bucket_start, 'UTC'), sum(sample_count),
+       min(min_value), max(max_value), sum(sum_value)
+from public.sensor_record_rollups where tier = '1h'
+group by sensor_id, date_trunc('day', bucket_start, 'UTC')
+on conflict do nothing;
@@ -0,0 +1,76 @@
+-- Per-sensor summary statistics for the analyst chart.
+--
+-- Returns one row per sensor with count/min/max/avg/stddev and the first and
+-- last reading of the range, so the summary table costs one round trip and
+-- no raw rows, however long the range is.
+-- Called from database.queries.get_record_stats via supabase.rpc().
+--
+-- Apply in the Supabase SQL editor (or psql) once per project.
+
+create or replace function public.sensor_record_stats(
+    p_sensor_ids uuid[],
+    p_start timestamptz,
+    p_end timestamptz
+)
+returns table (
+    sensor_id uuid,
+    sample_count bigint,
+    min_value double precision,
+    max_value double precision,
+    avg_value double precision,
+    stddev_value double precision,
+    first_at timestamptz,
+    first_value double precision,
+    last_at timestamptz,
+    last_value double precision
+)
+language sql
+stable
+as $$
+    with stats as (
+        select
+            r.sensor_id,
+            count(*) as sample_count,
+            min(r.value)::double precision as min_value,
+            max(r.value)::double precision as max_value,
+            avg(r.value)::double precision as avg_value,
+            stddev_samp(r.value)::double precision as stddev_value
+        from public.sensor_records r
+        where (p_sensor_ids is null or r.sensor_id = any(p_sensor_ids))
+          and (p_start is null or r.recorded_at >= p_start)
+          and (p_end is null or r.recorded_at <= p_end)
+        group by r.sensor_id
+    )
+    select
+        st.sensor_id,
+        st.sample_count,
+        st.min_value,
+        st.max_value,
+        st.avg_value,
+        st.stddev_value,
+        f.recorded_at as first_at,
+        f.value::double precision as first_value,
+        l.recorded_at as last_at,
+        l.value::double precision as last_value
+    from stats st
+    -- First and last readings are single index probes, not a sort of the range
+    cross join lateral (
+        select r.recorded_at, r.value
+        from public.sensor_records r
+        where r.sensor_id = st.sensor_id
+          and (p_start is null or r.recorded_at >= p_start)
+          and (p_end is null or r.recorded_at <= p_end)
+        order by r.recorded_at, r.id
+        limit 1
+    ) f
+    cross join lateral (
+        select r.recorded_at, r.value
+        from public.sensor_records r
+        where r.sensor_id = st.sensor_id
+          and (p_start is null or r.recorded_at >= p_start)
+          and (p_end is null or r.recorded_at <= p_end)
+        order by r.recorded_at desc, r.id desc
+        limit 1
+    ) l
+    order by st.sensor_id;
+$$;
@@ -0,0 +1,29 @@
+-- Change tracking for incremental sync of the analyst series cache.
+--
+-- Every insert and update stamps sensor_records.updated_at, so clients can
+-- ask for "rows changed since T" instead of re-downloading a whole range.
+-- Used by database.series_cache via SupabaseBackend.fetch_changes_page().
+--
+-- Apply in the Supabase SQL editor (or psql) once per project.
+
+alter table public.sensor_records
+    add column if not exists updated_at timestamptz not null default now();
+
+create or replace function public.sensor_records_touch_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at := clock_timestamp();
+    return new;
+end;
+$$;
+
+drop trigger if exists sensor_records_touch_updated_at on public.sensor_records;
+create trigger sensor_records_touch_updated_at
+    before insert or update on public.sensor_records
+    for each row execute function public.sensor_records_touch_updated_at();
+
+-- Supports "changed since" scans per sensor
+create index if not exists sensor_records_sensor_id_updated_at_idx
+    on public.sensor_records (sensor_id, updated_at, id);
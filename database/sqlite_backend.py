@@ -0,0 +1,484 @@
+"""
+Embedded SQLite storage backend for offline, local and benchmark runs.
+
+Timestamps are stored as UTC ISO-8601 text with a fixed layout
+(YYYY-MM-DDTHH:MM:SS.ffffff+00:00), so text order equals time order and
+range filters and keyset pagination work directly on the column.
+"""
+
+import logging
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from database.backend import ROLLUP_TIERS, PageKey, RecordNotFoundError, RejectedDataError, StorageBackend
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sensors (
+    id          TEXT PRIMARY KEY,
+    name        TEXT NOT NULL UNIQUE,
+    unit        TEXT,
+    comment     TEXT,
+    created_at  TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS sensor_records (
+    id          TEXT PRIMARY KEY,
+    sensor_id   TEXT NOT NULL REFERENCES sensors(id) ON DELETE CASCADE,
+    recorded_at TEXT NOT NULL,
+    value       REAL NOT NULL,
+    created_at  TEXT NOT NULL,
+    updated_at  TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS sensor_records_recorded_at_id_idx
+    ON sensor_records (recorded_at, id);
+CREATE INDEX IF NOT EXISTS sensor_records_sensor_id_recorded_at_idx
+    ON sensor_records (sensor_id, recorded_at);
+"""
+
+# Applied after SCHEMA; brings databases created before updated_at existed up to date
+MIGRATIONS = [
+    ("sensor_records", "updated_at",
+     "ALTER TABLE sensor_records ADD COLUMN updated_at TEXT NOT NULL DEFAULT ''; "
+     "UPDATE sensor_records SET updated_at = created_at;"),
+]
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS sensor_records_sensor_id_updated_at_idx
+    ON sensor_records (sensor_id, updated_at, id);
+
+CREATE TABLE IF NOT EXISTS sensor_record_rollups (
+    tier         TEXT NOT NULL,
+    sensor_id    TEXT NOT NULL REFERENCES sensors(id) ON DELETE CASCADE,
+    bucket_start TEXT NOT NULL,
+    sample_count INTEGER NOT NULL,
+    min_value    REAL NOT NULL,
+    max_value    REAL NOT NULL,
+    sum_value    REAL NOT NULL,
+    PRIMARY KEY (tier, sensor_id, bucket_start)
+);
+"""
+
+# Rollup tiers in build order: (tier, timestamp prefix length, suffix that
+# completes the bucket start, source table, source time column, aggregates,
+# source filter).
+# With the fixed UTC text layout a bucket start is a prefix of the timestamp.
+ROLLUP_LEVELS = [
+    ("1m", 16, ":00.000000+00:00", "sensor_records", "recorded_at",
+     "COUNT(*), MIN(value), MAX(value), SUM(value)", ""),
+    ("1h", 13, ":00:00.000000+00:00", "sensor_record_rollups", "bucket_start",
+     "SUM(sample_count), MIN(min_value), MAX(max_value), SUM(sum_value)", "AND s.tier = '1m'"),
+    ("1d", 10, "T00:00:00.000000+00:00", "sensor_record_rollups", "bucket_start",
+     "SUM(sample_count), MIN(min_value), MAX(max_value), SUM(sum_value)", "AND s.tier = '1h'"),
+]
+
+# Record columns returned by reads; sensor name and unit are joined by the
+# caller from the sensor catalog
+RECORD_COLUMNS = "r.id, r.sensor_id, r.recorded_at, r.value"
+
+
+def to_utc_text(value: Union[datetime, str]) -> str:
+    """
+    Normalize a datetime or ISO string to the stored UTC text layout.
+
+    Naive values are taken to be UTC.
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+
+def _now_text() -> str:
+    return to_utc_text(datetime.now(timezone.utc))
+
+
+def _refresh_rollups(conn: sqlite3.Connection, keys: Iterable[Tuple[str, str]]) -> None:
+    """
+    Re-aggregate the rollup buckets containing the given readings.
+
+    Each tier is rebuilt for the touched buckets only, from raw records for
+    '1m' and from the tier below for the others, so deletes and moved
+    readings leave correct min/max values. Runs inside the caller's
+    transaction.
+
+    Args:
+        conn: Connection with an open write transaction
+        keys: (sensor_id, recorded_at UTC text) of inserted, changed or
+            deleted readings (old and new position for updates)
+    """
+    keys = set(keys)
+    if not keys:
+        return
+
+    conn.execute(
+        "CREATE TEMP TABLE IF NOT EXISTS rollup_keys "
+        "(sensor_id TEXT, bucket_start TEXT, bucket_end TEXT, PRIMARY KEY (sensor_id, bucket_start))"
+    )
+    for tier, prefix, suffix, source, column, aggregates, source_filter in ROLLUP_LEVELS:
+        buckets = {(sensor_id, recorded_at[:prefix] + suffix) for sensor_id, recorded_at in keys}
+        width = timedelta(seconds=ROLLUP_TIERS[tier])
+        conn.execute("DELETE FROM temp.rollup_keys")
+        conn.executemany(
+            "INSERT INTO temp.rollup_keys VALUES (?, ?, ?)",
+            [(sensor_id, start, to_utc_text(datetime.fromisoformat(start) + width))
+             for sensor_id, start in buckets],
+        )
+        conn.executemany(
+            "DELETE FROM sensor_record_rollups WHERE tier = ? AND sensor_id = ? AND bucket_start = ?",
+            [(tier, sensor_id, start) for sensor_id, start in buckets],
+        )
+        # CROSS JOIN keeps the key table as the outer loop (index range scans)
+        conn.execute(
+            f"""
+            INSERT INTO sensor_record_rollups
+            SELECT ?, s.sensor_id, substr(s.{column}, 1, {prefix}) || '{suffix}', {aggregates}
+            FROM temp.rollup_keys k
+            CROSS JOIN {source} s
+              ON s.sensor_id = k.sensor_id
+             AND s.{column} >= k.bucket_start AND s.{column} < k.bucket_end
+            WHERE 1 = 1 {source_filter}
+            GROUP BY s.sensor_id, k.bucket_start
+            """,
+            (tier,),
+        )
+
+
+def _rebuild_rollups(conn: sqlite3.Connection) -> None:
+    """Build every rollup tier from scratch (databases created before rollups existed)."""
+    conn.execute("DELETE FROM sensor_record_rollups")
+    for tier, prefix, suffix, source, column, aggregates, source_filter in ROLLUP_LEVELS:
+        conn.execute(
+            f"""
+            INSERT INTO sensor_record_rollups
+            SELECT ?, s.sensor_id, substr(s.{column}, 1, {prefix}) || '{suffix}', {aggregates}
+            FROM {source} s
+            WHERE 1 = 1 {source_filter}
+            GROUP BY s.sensor_id, substr(s.{column}, 1, {prefix})
+            """,
+            (tier,),
+        )
+
+
+def _record_filters(sensor_ids: Optional[List[str]], start_date: Optional[datetime],
+                    end_date: Optional[datetime]):
+    """Build the WHERE clauses and parameters shared by record range queries."""
+    clauses = []
+    params: List[Any] = []
+
+    if sensor_ids:
+        clauses.append(f"r.sensor_id IN ({', '.join('?' * len(sensor_ids))})")
+        params.extend(sensor_ids)
+    if start_date:
+        clauses.append("r.recorded_at >= ?")
+        params.append(to_utc_text(start_date))
+    if end_date:
+        clauses.append("r.recorded_at <= ?")
+        params.append(to_utc_text(end_date))
+
+    return clauses, params
+
+
+class SQLiteBackend(StorageBackend):
+    """StorageBackend backed by a local SQLite file (one connection per thread)."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            for table, column, script in MIGRATIONS:
+                columns = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+                if column not in columns:
+                    conn.executescript(script)
+                    logger.info(f"🔧 Added {table}.{column}")
+            conn.executescript(INDEXES)
+            has_rollups = conn.execute("SELECT 1 FROM sensor_record_rollups LIMIT 1").fetchone()
+            has_records = conn.execute("SELECT 1 FROM sensor_records LIMIT 1").fetchone()
+            if has_records and not has_rollups:
+                _rebuild_rollups(conn)
+                logger.info("🔧 Built sensor_record_rollups from existing records")
+        logger.info(f"🗄️ SQLite database ready: {path}")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("PRAGMA foreign_keys = ON")
+            self._local.conn = conn
+        return conn
+
+    # ------------------------------------------------------------------
+    # Sensors
+    # ------------------------------------------------------------------
+
+    def list_sensors(self) -> List[Dict[str, Any]]:
+        rows = self._connect().execute("SELECT * FROM sensors ORDER BY name").fetchall()
+        return [dict(row) for row in rows]
+
+    def get_sensor(self, sensor_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT * FROM sensors WHERE id = ?", (sensor_id,)).fetchone()
+        return dict(row) if row else None
+
+    def insert_sensor(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        sensor_id = str(uuid.uuid4())
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO sensors (id, name, unit, comment, created_at) VALUES (?, ?, ?, ?, ?)",
+                (sensor_id, data["name"], data.get("unit"), data.get("comment"), _now_text()),
+            )
+        return self.get_sensor(sensor_id)
+
+    def update_sensor(self, sensor_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        if data:
+            assignments = ", ".join(f"{column} = ?" for column in data)
+            with self._connect() as conn:
+                conn.execute(
+                    f"UPDATE sensors SET {assignments} WHERE id = ?",
+                    (*data.values(), sensor_id),
+                )
+        return self.get_sensor(sensor_id)
+
+    def delete_sensor(self, sensor_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM sensors WHERE id = ?", (sensor_id,))
+
+    # ------------------------------------------------------------------
+    # Records
+    # ------------------------------------------------------------------
+
+    def list_recent_records(self, limit: int) -> List[Dict[str, Any]]:
+        rows = self._connect().execute(
+            f"""
+            SELECT {RECORD_COLUMNS}
+            FROM sensor_records r
+            ORDER BY r.recorded_at DESC, r.id DESC
+            LIMIT ?
+            """,
+            (limit,),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_record(self, record_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            f"""
+            SELECT {RECORD_COLUMNS}
+            FROM sensor_records r
+            WHERE r.id = ?
+            """,
+            (record_id,),
+        ).fetchone()
+        return dict(row) if row else None
+
+    def insert_records(self, payloads: List[Dict[str, Any]],
+                       returning: bool = True,
+                       ignore_duplicates: bool = False) -> List[Dict[str, Any]]:
+        created_at = _now_text()
+        rows = [
+            (p.get("id") or str(uuid.uuid4()), p["sensor_id"], to_utc_text(p["recorded_at"]), p["value"],
+             created_at, created_at)
+            for p in payloads
+        ]
+        on_conflict = " ON CONFLICT (id) DO NOTHING" if ignore_duplicates else ""
+        try:
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT INTO sensor_records (id, sensor_id, recorded_at, value, created_at, updated_at) "
+                    f"VALUES (?, ?, ?, ?, ?, ?){on_conflict}",
+                    rows,
+                )
+                _refresh_rollups(conn, ((row[1], row[2]) for row in rows))
+        except sqlite3.IntegrityError as e:
+            raise RejectedDataError(str(e)) from e
+
+        if not returning:
+            return []
+        columns = ("id", "sensor_id", "recorded_at", "value", "created_at", "updated_at")
+        return [dict(zip(columns, row)) for row in rows]
+
+    def update_record(self, record_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        data = dict(data)
+        if "recorded_at" in data:
+            data["recorded_at"] = to_utc_text(data["recorded_at"])
+        if data:
+            data["updated_at"] = _now_text()
+            assignments = ", ".join(f"{column} = ?" for column in data)
+            with self._connect() as conn:
+                old = conn.execute(
+                    "SELECT sensor_id, recorded_at FROM sensor_records WHERE id = ?", (record_id,)
+                ).fetchone()
+                if old is None:
+                    raise RecordNotFoundError(f"Record {record_id} not found")
+                conn.execute(
+                    f"UPDATE sensor_records SET {assignments} WHERE id = ?",
+                    (*data.values(), record_id),
+                )
+                new = conn.execute(
+                    "SELECT sensor_id, recorded_at FROM sensor_records WHERE id = ?", (record_id,)
+                ).fetchone()
+                _refresh_rollups(conn, [tuple(row) for row in (old, new) if row])
+        row = self._connect().execute(
+            "SELECT * FROM sensor_records WHERE id = ?", (record_id,)
+        ).fetchone()
+        if row is None:
+            raise RecordNotFoundError(f"Record {record_id} not found")
+        return dict(row)
+
+    def delete_record(self, record_id: str) -> None:
+        with self._connect() as conn:
+            old = conn.execute(
+                "SELECT sensor_id, recorded_at FROM sensor_records WHERE id = ?", (record_id,)
+            ).fetchone()
+            conn.execute("DELETE FROM sensor_records WHERE id = ?", (record_id,))
+            if old:
+                _refresh_rollups(conn, [tuple(old)])
+
+    def fetch_records_page(self, sensor_ids: Optional[List[str]],
+                           start_date: Optional[datetime], end_date: Optional[datetime],
+                           after: Optional[PageKey], page_size: int,
+                           descending: bool = False) -> List[Dict[str, Any]]:
+        clauses, params = _record_filters(sensor_ids, start_date, end_date)
+        direction = "DESC" if descending else "ASC"
+
+        # Continue after the last row of the previous page
+        if after is not None:
+            clauses.append(f"(r.recorded_at, r.id) {'<' if descending else '>'} (?, ?)")
+            params.extend([to_utc_text(after[0]), after[1]])
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connect().execute(
+            f"""
+            SELECT {RECORD_COLUMNS}
+            FROM sensor_records r
+            {where}
+            ORDER BY r.recorded_at {direction}, r.id {direction}
+            LIMIT ?
+            """,
+            (*params, page_size),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def fetch_changes_page(self, sensor_ids: List[str], since: str,
+                           after: Optional[PageKey], page_size: int) -> List[Dict[str, Any]]:
+        placeholders = ", ".join("?" * len(sensor_ids))
+        if after is None:
+            position, params = "updated_at >= ?", [to_utc_text(since)]
+        else:
+            position, params = "(updated_at, id) > (?, ?)", [to_utc_text(after[0]), after[1]]
+
+        rows = self._connect().execute(
+            f"""
+            SELECT id, sensor_id, recorded_at, value, updated_at
+            FROM sensor_records
+            WHERE sensor_id IN ({placeholders}) AND {position}
+            ORDER BY updated_at, id
+            LIMIT ?
+            """,
+            (*sensor_ids, *params, page_size),
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def latest_update(self, sensor_ids: List[str]) -> Optional[str]:
+        row = self._connect().execute(
+            f"SELECT MAX(updated_at) FROM sensor_records "
+            f"WHERE sensor_id IN ({', '.join('?' * len(sensor_ids))})",
+            sensor_ids,
+        ).fetchone()
+        return row[0]
+
+    def count_records(self, sensor_ids: Optional[List[str]],
+                      start_date: Optional[datetime], end_date: Optional[datetime],
+                      estimated: bool = False) -> int:
+        # Indexed COUNT(*) is cheap enough locally; always exact
+        clauses, params = _record_filters(sensor_ids, start_date, end_date)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        row = self._connect().execute(
+            f"SELECT COUNT(*) FROM sensor_records r {where}", params
+        ).fetchone()
+        return row[0]
+
+    def fetch_record_stats(self, sensor_ids: Optional[List[str]],
+                           start_date: Optional[datetime],
+                           end_date: Optional[datetime]) -> List[Dict[str, Any]]:
+        clauses, params = _record_filters(sensor_ids, start_date, end_date)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        connection = self._connect()
+
+        rows = connection.execute(
+            f"""
+            SELECT
+                r.sensor_id,
+                COUNT(*) AS sample_count,
+                MIN(r.value) AS min_value,
+                MAX(r.value) AS max_value,
+                AVG(r.value) AS avg_value,
+                SUM((r.value - m.mean) * (r.value - m.mean)) AS squares,
+                MIN(r.recorded_at) AS first_at,
+                MAX(r.recorded_at) AS last_at
+            FROM sensor_records r
+            JOIN (
+                SELECT r.sensor_id, AVG(r.value) AS mean
+                FROM sensor_records r {where} GROUP BY r.sensor_id
+            ) m ON m.sensor_id = r.sensor_id
+            {where}
+            GROUP BY r.sensor_id
+            ORDER BY r.sensor_id
+            """,
+            (*params, *params),
+        ).fetchall()
+
+        stats = []
+        for row in rows:
+            item = dict(row)
+            squares = item.pop("squares")
+            count = item["sample_count"]
+            # Sample standard deviation, as stddev_samp() in Postgres
+            item["stddev_value"] = (squares / (count - 1)) ** 0.5 if count > 1 else None
+            for edge, order in (("first", "ASC"), ("last", "DESC")):
+                item[f"{edge}_value"] = connection.execute(
+                    f"SELECT value FROM sensor_records WHERE sensor_id = ? AND recorded_at = ? "
+                    f"ORDER BY id {order} LIMIT 1",
+                    (item["sensor_id"], item[f"{edge}_at"]),
+                ).fetchone()[0]
+            stats.append(item)
+        return stats
+
+    def has_rollups(self) -> bool:
+        # Created with the schema and maintained on every write
+        return True
+
+    def fetch_rollup_page(self, tier: str, sensor_ids: Optional[List[str]],
+                          start_date: datetime, end_date: datetime,
+                          after: Optional[PageKey], page_size: int) -> List[Dict[str, Any]]:
+        clauses = ["tier = ?", "bucket_start >= ?", "bucket_start <= ?"]
+        params: List[Any] = [tier, to_utc_text(start_date), to_utc_text(end_date)]
+        if sensor_ids:
+            clauses.append(f"sensor_id IN ({', '.join('?' * len(sensor_ids))})")
+            params.extend(sensor_ids)
+        if after is not None:
+            clauses.append("(sensor_id, bucket_start) > (?, ?)")
+            params.extend([after[0], to_utc_text(after[1])])
+
+        rows = self._connect().execute(
+            f"""
+            SELECT sensor_id, bucket_start, sample_count, min_value, max_value, sum_value
+            FROM sensor_record_rollups
+            WHERE {' AND '.join(clauses)}
+            ORDER BY sensor_id, bucket_start
+            LIMIT ?
+            """,
+            (*params, page_size),
+        ).fetchall()
+        return [dict(row) for row in rows]
@@ -0,0 +1,284 @@
+"""
+Storage backend for the hosted Supabase (PostgREST) project.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from postgrest.exceptions import APIError
+from postgrest.types import CountMethod, ReturnMethod
+from database.backend import PageKey, RecordNotFoundError, RejectedDataError, StorageBackend
+from database.client import get_async_supabase, get_supabase
+
+# Record columns fetched by reads; sensor name and unit are joined locally
+# from the sensor catalog instead of being embedded in every row
+RECORD_COLUMNS = "id, sensor_id, recorded_at, value"
+
+# SQLSTATE classes of errors caused by the submitted rows themselves:
+# 22 data exception (bad value/format), 23 integrity constraint violation
+DATA_ERROR_SQLSTATE_CLASSES = ("22", "23")
+
+# PostgREST errors caused by the request payload (invalid body, unknown column)
+DATA_ERROR_PGRST_CODES = {"PGRST102", "PGRST204"}
+
+# Errors for a table that does not exist: SQLSTATE undefined_table, and the
+# PostgREST 12+ "not in the schema cache" code
+MISSING_TABLE_CODES = {"42P01", "PGRST205"}
+
+
+def is_data_error(error: APIError) -> bool:
+    """
+    Check whether a PostgREST error rejects the data rather than the request.
+
+    Gateway pages (502/503/504, code is the HTTP status), rate limits,
+    expired JWTs and statement timeouts are not data errors: resending the
+    same rows later can succeed.
+
+    Args:
+        error: Error raised by a postgrest request
+
+    Returns:
+        True for SQLSTATE class 22/23 and payload-related PostgREST codes
+    """
+    code = error.code
+    if not isinstance(code, str):
+        return False
+    if code in DATA_ERROR_PGRST_CODES:
+        return True
+    return len(code) == 5 and code[:2] in DATA_ERROR_SQLSTATE_CLASSES
+
+
+def _apply_keyset(query, key_columns: Tuple[str, str], after: Optional[PageKey],
+                  page_size: int, descending: bool = False):
+    """
+    Order a query on a two-column keyset and continue after a previous page.
+
+    Args:
+        query: Filtered query builder
+        key_columns: Unique sort key as (primary column, tie-breaker column)
+        after: Key of the last row of the previous page, or None for the first page
+        page_size: Number of rows per page
+        descending: Walk the key in descending order (default: False)
+    """
+    primary, tiebreak = key_columns
+    direction = "lt" if descending else "gt"
+
+    if after is not None:
+        last_primary, last_tiebreak = after
+        query = query.or_(
+            f'{primary}.{direction}."{last_primary}",'
+            f'and({primary}.eq."{last_primary}",{tiebreak}.{direction}."{last_tiebreak}")'
+        )
+
+    return (
+        query.order(primary, desc=descending)
+        .order(tiebreak, desc=descending)
+        .limit(page_size)
+    )
+
+
+def _filter_records(query, sensor_ids: Optional[List[str]],
+                    start_date: Optional[datetime], end_date: Optional[datetime]):
+    """Apply the shared sensor and date range filters to a record query."""
+    if sensor_ids:
+        query = query.in_("sensor_id", sensor_ids)
+    if start_date:
+        query = query.gte("recorded_at", start_date.isoformat())
+    if end_date:
+        query = query.lte("recorded_at", end_date.isoformat())
+    return query
+
+
+class SupabaseBackend(StorageBackend):
+    """StorageBackend backed by the Supabase REST API."""
+
+    name = "supabase"
+
+    # ------------------------------------------------------------------
+    # Sensors
+    # ------------------------------------------------------------------
+
+    def list_sensors(self) -> List[Dict[str, Any]]:
+        supabase = get_supabase()
+        return supabase.table("sensors").select("*").order("name").execute().data
+
+    def get_sensor(self, sensor_id: str) -> Optional[Dict[str, Any]]:
+        supabase = get_supabase()
+        response = supabase.table("sensors").select("*").eq("id", sensor_id).execute()
+        return response.data[0] if response.data else None
+
+    def insert_sensor(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        supabase = get_supabase()
+        return supabase.table("sensors").insert(data).execute().data[0]
+
+    def update_sensor(self, sensor_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        supabase = get_supabase()
+        return supabase.table("sensors").update(data).eq("id", sensor_id).execute().data[0]
+
+    def delete_sensor(self, sensor_id: str) -> None:
+        supabase = get_supabase()
+        supabase.table("sensors").delete().eq("id", sensor_id).execute()
+
+    # ------------------------------------------------------------------
+    # Records
+    # ------------------------------------------------------------------
+
+    def list_recent_records(self, limit: int) -> List[Dict[str, Any]]:
+        supabase = get_supabase()
+        response = (
+            supabase.table("sensor_records")
+            .select(RECORD_COLUMNS)
+            .order("recorded_at", desc=True)
+            .order("id", desc=True)
+            .limit(limit)
+            .execute()
+        )
+        return response.data
+
+    def get_record(self, record_id: str) -> Optional[Dict[str, Any]]:
+        supabase = get_supabase()
+        response = (
+            supabase.table("sensor_records")
+            .select(RECORD_COLUMNS)
+            .eq("id", record_id)
+            .execute()
+        )
+        return response.data[0] if response.data else None
+
+    def insert_records(self, payloads: List[Dict[str, Any]],
+                       returning: bool = True,
+                       ignore_duplicates: bool = False) -> List[Dict[str, Any]]:
+        supabase = get_supabase()
+        returning_method = ReturnMethod.representation if returning else ReturnMethod.minimal
+        table = supabase.table("sensor_records")
+        if ignore_duplicates:
+            # INSERT ... ON CONFLICT (id) DO NOTHING
+            query = table.upsert(payloads, returning=returning_method,
+                                 ignore_duplicates=True, on_conflict="id")
+        else:
+            query = table.insert(payloads, returning=returning_method)
+        try:
+            response = query.execute()
+        except APIError as e:
+            if is_data_error(e):
+                raise RejectedDataError(e.message or str(e)) from e
+            # Transient or request-level failure: the caller may resend the rows
+            raise
+        return response.data if returning else []
+
+    def update_record(self, record_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        supabase = get_supabase()
+        rows = supabase.table("sensor_records").update(data).eq("id", record_id).execute().data
+        if not rows:
+            raise RecordNotFoundError(f"Record {record_id} not found")
+        return rows[0]
+
+    def delete_record(self, record_id: str) -> None:
+        supabase = get_supabase()
+        supabase.table("sensor_records").delete().eq("id", record_id).execute()
+
+    def fetch_records_page(self, sensor_ids: Optional[List[str]],
+                           start_date: Optional[datetime], end_date: Optional[datetime],
+                           after: Optional[PageKey], page_size: int,
+                           descending: bool = False) -> List[Dict[str, Any]]:
+        supabase = get_supabase()
+        query = supabase.table("sensor_records").select(RECORD_COLUMNS)
+        query = _filter_records(query, sensor_ids, start_date, end_date)
+        query = _apply_keyset(query, ("recorded_at", "id"), after, page_size, descending)
+        return query.execute().data
+
+    def fetch_record_stats(self, sensor_ids: Optional[List[str]],
+                           start_date: Optional[datetime],
+                           end_date: Optional[datetime]) -> List[Dict[str, Any]]:
+        # See database/sql/sensor_record_stats.sql
+        supabase = get_supabase()
+        return supabase.rpc("sensor_record_stats", {
+            "p_sensor_ids": sensor_ids or None,
+            "p_start": start_date.isoformat() if start_date else None,
+            "p_end": end_date.isoformat() if end_date else None,
+        }).execute().data
+
+    def has_rollups(self) -> bool:
+        supabase = get_supabase()
+        try:
+            supabase.table("sensor_record_rollups").select("tier").limit(1).execute()
+        except APIError as e:
+            if e.code in MISSING_TABLE_CODES:
+                return False
+            raise
+        return True
+
+    def fetch_rollup_page(self, tier: str, sensor_ids: Optional[List[str]],
+                          start_date: datetime, end_date: datetime,
+                          after: Optional[PageKey], page_size: int) -> List[Dict[str, Any]]:
+        # Needs database/sql/sensor_record_rollups.sql (maintained by triggers)
+        supabase = get_supabase()
+        query = (
+            supabase.table("sensor_record_rollups")
+            .select("sensor_id, bucket_start, sample_count, min_value, max_value, sum_value")
+            .eq("tier", tier)
+            .gte("bucket_start", start_date.isoformat())
+            .lte("bucket_start", end_date.isoformat())
+        )
+        if sensor_ids:
+            query = query.in_("sensor_id", sensor_ids)
+        query = _apply_keyset(query, ("sensor_id", "bucket_start"), after, page_size)
+        return query.execute().data
+
+    def fetch_changes_page(self, sensor_ids: List[str], since: str,
+                           after: Optional[PageKey], page_size: int) -> List[Dict[str, Any]]:
+        # Needs database/sql/sensor_records_updated_at.sql
+        supabase = get_supabase()
+        query = (
+            supabase.table("sensor_records")
+            .select(f"{RECORD_COLUMNS}, updated_at")
+            .in_("sensor_id", sensor_ids)
+        )
+        if after is None:
+            query = query.gte("updated_at", since)
+        query = _apply_keyset(query, ("updated_at", "id"), after, page_size)
+        return query.execute().data
+
+    def latest_update(self, sensor_ids: List[str]) -> Optional[str]:
+        supabase = get_supabase()
+        response = (
+            supabase.table("sensor_records")
+            .select("updated_at")
+            .in_("sensor_id", sensor_ids)
+            .order("updated_at", desc=True)
+            .limit(1)
+            .execute()
+        )
+        return response.data[0]["updated_at"] if response.data else None
+
+    def count_records(self, sensor_ids: Optional[List[str]],
+                      start_date: Optional[datetime], end_date: Optional[datetime],
+                      estimated: bool = False) -> int:
+        # PostgREST counts exactly up to max-rows and uses the planner estimate above
+        method = CountMethod.estimated if estimated else CountMethod.exact
+        supabase = get_supabase()
+        query = supabase.table("sensor_records").select("id", count=method, head=True)
+        query = _filter_records(query, sensor_ids, start_date, end_date)
+        return query.execute().count or 0
+
+    # ------------------------------------------------------------------
+    # Async variants (native async client)
+    # ------------------------------------------------------------------
+
+    async def fetch_records_page_async(self, sensor_ids: Optional[List[str]],
+                                       start_date: Optional[datetime], end_date: Optional[datetime],
+                                       after: Optional[PageKey], page_size: int,
+                                       descending: bool = False) -> List[Dict[str, Any]]:
+        supabase = await get_async_supabase()
+        query = supabase.table("sensor_records").select(RECORD_COLUMNS)
+        query = _filter_records(query, sensor_ids, start_date, end_date)
+        query = _apply_keyset(query, ("recorded_at", "id"), after, page_size, descending)
+        return (await query.execute()).data
+
+    async def count_records_async(self, sensor_ids: Optional[List[str]],
+                                  start_date: Optional[datetime], end_date: Optional[datetime],
+                                  estimated: bool = False) -> int:
+        method = CountMethod.estimated if estimated else CountMethod.exact
+        supabase = await get_async_supabase()
+        query = supabase.table("sensor_records").select("id", count=method, head=True)
+        query = _filter_records(query, sensor_ids, start_date, end_date)
+        return (await query.execute()).count or 0
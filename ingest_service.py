@@ -0,0 +1,439 @@
+"""
+HTTP ingestion service for automated readings (PLC gateway).
+
+Standalone aiohttp app, run next to the Streamlit app:
+
+    python ingest_service.py
+
+Endpoints:
+- POST /readings: one reading object, a list of them, or {"readings": [...]}.
+  Each reading is {"sensor_id": "<uuid>", "recorded_at": "<ISO 8601>",
+  "value": <number>}. Timestamps without an offset are local time, as on
+  the engineer form. A request is accepted whole or rejected whole.
+- GET /health: buffer size and flush counters.
+- GET /export?token=...: streams a data export described by a token the
+  analyst interface signed (see utils/export.py). Only registered when
+  EXPORT_LINK_SECRET is set.
+
+Readings are validated with the utils.validation rules, acknowledged with
+202 once buffered, and written behind in bulk via
+queries.create_records_batch. A flush starts when INGEST_FLUSH_SIZE
+readings are waiting or the oldest has waited INGEST_FLUSH_INTERVAL
+seconds. The buffer holds at most INGEST_BUFFER_CAPACITY readings
+(including the batch being written); beyond that requests get 429 with a
+Retry-After header, so a slow database pushes back on the gateway instead
+of growing memory. Readings that fail for any reason other than a
+confirmed data rejection are re-queued and retried with backoff; rows the
+database rejects (constraint or type errors) are logged and dropped.
+
+Exports are written to the response one keyset page at a time, so the
+service holds one page per download and the browser receives the file
+while it is being built.
+"""
+
+import os
+import math
+import time
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+from database import queries
+from utils.export import EXPORT_FORMATS, export_filename, export_frames, iter_export, verify_export_link
+from utils.timezone import local_to_utc, utc_to_local
+from utils.validation import (
+    parse_timestamp, validate_numeric_value, validate_required_field, validate_timestamp
+)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+INGEST_HOST = os.getenv("INGEST_HOST", "0.0.0.0")
+INGEST_PORT = int(os.getenv("INGEST_PORT", "8502"))
+
+# Buffered readings (queued plus being written) before requests get 429
+INGEST_BUFFER_CAPACITY = int(os.getenv("INGEST_BUFFER_CAPACITY", "50000"))
+
+# Flush when this many readings wait, or the oldest has waited this long
+INGEST_FLUSH_SIZE = int(os.getenv("INGEST_FLUSH_SIZE", "1000"))
+INGEST_FLUSH_INTERVAL = float(os.getenv("INGEST_FLUSH_INTERVAL", "2"))
+
+# Largest accepted request, in readings
+INGEST_MAX_REQUEST_READINGS = int(os.getenv("INGEST_MAX_REQUEST_READINGS", "5000"))
+
+# Secret shared with the Streamlit app for signed export links (empty: /export disabled)
+EXPORT_LINK_SECRET = os.getenv("EXPORT_LINK_SECRET", "")
+
+# Backoff after a failed flush: doubles per failure up to the maximum
+RETRY_BACKOFF_SECONDS = 1.0
+RETRY_BACKOFF_MAX_SECONDS = 60.0
+
+# (sensor_id, recorded_at UTC, value), as taken by queries.create_records_batch
+Reading = Tuple[str, datetime, float]
+
+
+# ============================================================================
+# VALIDATION
+# ============================================================================
+
+def parse_reading(item: Any) -> Tuple[Optional[Reading], Optional[str]]:
+    """
+    Validate one JSON reading with the same rules as the engineer form.
+
+    Args:
+        item: Decoded JSON object
+
+    Returns:
+        Tuple of (reading, error_message); reading is None if invalid
+    """
+    if not isinstance(item, dict):
+        return None, "Reading must be a JSON object"
+
+    sensor_id = item.get("sensor_id")
+    is_valid, error_msg = validate_required_field(
+        sensor_id if isinstance(sensor_id, str) else "", "sensor_id"
+    )
+    if not is_valid:
+        return None, error_msg
+
+    value = item.get("value")
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        return None, f"'{value}' is not a valid number"
+    is_valid, value, error_msg = validate_numeric_value(str(value))
+    if not is_valid:
+        return None, error_msg
+    if not math.isfinite(value):
+        return None, f"'{value}' is not a finite number"
+
+    recorded_at = item.get("recorded_at")
+    if not isinstance(recorded_at, str):
+        return None, "recorded_at must be an ISO 8601 string"
+    try:
+        recorded_at = parse_timestamp(recorded_at)
+    except ValueError as e:
+        return None, str(e)
+
+    # validate_timestamp compares naive local wall-clock times
+    recorded_at_local = utc_to_local(recorded_at) if recorded_at.tzinfo else recorded_at
+    is_valid, error_msg = validate_timestamp(recorded_at_local)
+    if not is_valid:
+        return None, error_msg
+
+    recorded_at_utc = local_to_utc(recorded_at_local.replace(tzinfo=None))
+    return (sensor_id.strip(), recorded_at_utc, value), None
+
+
+def request_items(body: Any) -> List[Any]:
+    """Readings of a request body: one object, a list, or {"readings": [...]}."""
+    if isinstance(body, dict) and "readings" in body:
+        body = body["readings"]
+    return body if isinstance(body, list) else [body]
+
+
+def parse_request(items: List[Any]) -> Tuple[List[Reading], List[Dict[str, Any]]]:
+    """
+    Validate the readings of one request.
+
+    Args:
+        items: Decoded JSON readings (see request_items)
+
+    Returns:
+        Tuple of (readings, errors); errors are {"index", "error"} dictionaries
+    """
+    parsed = []
+    errors = []
+    for index, item in enumerate(items):
+        reading, error_msg = parse_reading(item)
+        if error_msg:
+            errors.append({"index": index, "error": error_msg})
+        else:
+            parsed.append((index, reading))
+
+    if parsed:
+        known = queries.sensor_catalog.index_for(reading[0] for _, reading in parsed)
+        for index, reading in parsed:
+            if reading[0] not in known:
+                errors.append({"index": index, "error": f"Unknown sensor '{reading[0]}'"})
+        errors.sort(key=lambda error: error["index"])
+
+    return [reading for _, reading in parsed], errors
+
+
+# ============================================================================
+# WRITE-BEHIND BUFFER
+# ============================================================================
+
+class WriteBehindBuffer:
+    """Bounded in-memory queue of readings, flushed to storage in bulk."""
+
+    def __init__(self, capacity: int = INGEST_BUFFER_CAPACITY,
+                 flush_size: int = INGEST_FLUSH_SIZE,
+                 flush_interval: float = INGEST_FLUSH_INTERVAL):
+        """
+        Args:
+            capacity: Maximum readings held, including the batch being written
+            flush_size: Readings waiting that trigger an immediate flush
+            flush_interval: Maximum seconds a reading waits before a flush
+        """
+        self.capacity = capacity
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+
+        # (enqueued at monotonic time, reading), oldest first
+        self._queue: Deque[Tuple[float, Reading]] = deque()
+        self._in_flight = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        self.stats = {"accepted": 0, "rejected_full": 0, "written": 0,
+                      "dropped": 0, "flushes": 0, "failed_flushes": 0}
+
+    def __len__(self) -> int:
+        return len(self._queue) + self._in_flight
+
+    def offer(self, readings: List[Reading]) -> bool:
+        """
+        Buffer a request's readings, all or none.
+
+        Returns:
+            False if they do not fit (the caller answers 429)
+        """
+        if self._closing or len(self) + len(readings) > self.capacity:
+            self.stats["rejected_full"] += 1
+            return False
+
+        was_empty = not self._queue
+        now = time.monotonic()
+        self._queue.extend((now, reading) for reading in readings)
+        self.stats["accepted"] += len(readings)
+        # Wake the flusher to start the age timer or to flush a full batch
+        if was_empty or len(self._queue) >= self.flush_size:
+            self._wakeup.set()
+        return True
+
+    def retry_after(self) -> int:
+        """Seconds a rejected client should wait: about one flush cycle."""
+        return max(1, math.ceil(self.flush_interval))
+
+    def start(self) -> None:
+        """Start the background flusher on the running loop."""
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop accepting readings and write out everything buffered."""
+        self._closing = True
+        self._wakeup.set()
+        if self._task:
+            await self._task
+
+    async def _run(self) -> None:
+        """Flush on size or age; back off while storage is failing."""
+        backoff = RETRY_BACKOFF_SECONDS
+        while True:
+            if not self._queue:
+                if self._closing:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            # Wait until the batch is full or its oldest reading is due
+            age = time.monotonic() - self._queue[0][0]
+            if len(self._queue) < self.flush_size and age < self.flush_interval and not self._closing:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.flush_interval - age)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            if await self._flush():
+                backoff = RETRY_BACKOFF_SECONDS
+            elif self._closing:
+                logger.error(f"❌ Shutting down with {len(self._queue)} unwritten readings")
+                return
+            else:
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, RETRY_BACKOFF_MAX_SECONDS)
+
+    async def _flush(self) -> bool:
+        """
+        Write one batch of up to flush_size readings.
+
+        Returns:
+            False if part of the batch was not stored and was re-queued
+        """
+        batch = [self._queue.popleft() for _ in range(min(self.flush_size, len(self._queue)))]
+        self._in_flight = len(batch)
+        try:
+            result = await asyncio.to_thread(
+                queries.create_records_batch, [reading for _, reading in batch]
+            )
+        except Exception as e:
+            result = {"inserted": 0, "failed": [
+                {"index": index, "error": str(e), "retryable": True} for index in range(len(batch))
+            ]}
+        finally:
+            self._in_flight = 0
+
+        self.stats["flushes"] += 1
+        self.stats["written"] += result["inserted"]
+
+        # Only confirmed data rejections are dropped; anything else (transport,
+        # 5xx, timeouts, unclassified) was acknowledged with 202 and is resent
+        retry = []
+        for failure in result["failed"]:
+            if failure.get("retryable", True):
+                retry.append(batch[failure["index"]])
+            else:
+                self.stats["dropped"] += 1
+                logger.warning(f"⚠️ Dropped reading {batch[failure['index']][1]}: {failure['error']}")
+
+        if retry:
+            # Back to the front, keeping their original enqueue times
+            self._queue.extendleft(reversed(retry))
+            self.stats["failed_flushes"] += 1
+            logger.error(f"❌ Flush failed for {len(retry)} readings, retrying: {result['failed'][0]['error']}")
+            return False
+
+        logger.info(f"✅ Flushed {result['inserted']} readings ({len(self._queue)} waiting)")
+        return True
+
+
+# ============================================================================
+# HTTP APP
+# ============================================================================
+
+BUFFER_KEY = web.AppKey("buffer", WriteBehindBuffer)
+EXPORT_SECRET_KEY = web.AppKey("export_secret", str)
+
+
+async def post_readings(request: web.Request) -> web.Response:
+    """Validate and buffer readings; 202 when buffered, 429 when full."""
+    buffer = request.app[BUFFER_KEY]
+    try:
+        body = await request.json()
+    except ValueError:
+        return web.json_response({"error": "Body must be JSON"}, status=400)
+
+    items = request_items(body)
+    if len(items) > INGEST_MAX_REQUEST_READINGS:
+        return web.json_response(
+            {"error": f"At most {INGEST_MAX_REQUEST_READINGS} readings per request"}, status=413
+        )
+
+    # The sensor catalog may reload from the database, so validate off the loop
+    readings, errors = await asyncio.to_thread(parse_request, items)
+    if errors:
+        return web.json_response({"error": "Invalid readings", "details": errors}, status=400)
+
+    if not buffer.offer(readings):
+        return web.json_response(
+            {"error": "Ingestion buffer is full, retry later"},
+            status=429,
+            headers={"Retry-After": str(buffer.retry_after())},
+        )
+
+    return web.json_response({"accepted": len(readings), "buffered": len(buffer)}, status=202)
+
+
+async def get_health(request: web.Request) -> web.Response:
+    """Buffer fill level and flush counters."""
+    buffer = request.app[BUFFER_KEY]
+    return web.json_response({
+        "buffered": len(buffer),
+        "capacity": buffer.capacity,
+        **buffer.stats,
+    })
+
+
+async def get_export(request: web.Request) -> web.StreamResponse:
+    """Stream the export described by a signed token, one page at a time."""
+    try:
+        export = verify_export_link(request.query.get("token", ""), request.app[EXPORT_SECRET_KEY])
+    except ValueError as e:
+        return web.json_response({"error": str(e)}, status=403)
+
+    fmt = export["format"]
+    chunks = iter_export(export_frames(
+        queries.iter_records(
+            sensor_ids=export["sensor_ids"],
+            start_date=export["start_date"],
+            end_date=export["end_date"],
+            descending=export["newest_first"],
+        ),
+        queries.sensor_catalog.index_for,
+    ), fmt)
+
+    response = web.StreamResponse(headers={
+        "Content-Type": EXPORT_FORMATS[fmt][2],
+        "Content-Disposition": f'attachment; filename="{export_filename(fmt)}"',
+    })
+    await response.prepare(request)
+
+    written = 0
+    try:
+        while True:
+            # Pages are read and encoded off the loop; write() waits for the client
+            data = await asyncio.to_thread(next, chunks, None)
+            if data is None:
+                break
+            if data:
+                await response.write(data)
+                written += len(data)
+    except Exception as e:
+        # Headers are sent: the client sees a truncated download
+        logger.error(f"❌ Export failed after {written} bytes: {str(e)}")
+        raise
+    finally:
+        # A cancelled download may leave a page read running in its thread
+        if not chunks.gi_running:
+            chunks.close()
+
+    await response.write_eof()
+    logger.info(f"✅ Streamed {written / 1_000_000:.1f} MB {fmt} export")
+    return response
+
+
+async def _start_buffer(app: web.Application) -> None:
+    app[BUFFER_KEY].start()
+
+
+async def _close_buffer(app: web.Application) -> None:
+    await app[BUFFER_KEY].close()
+
+
+def create_app(buffer: Optional[WriteBehindBuffer] = None,
+               export_secret: str = EXPORT_LINK_SECRET) -> web.Application:
+    """
+    Build the ingestion app.
+
+    Args:
+        buffer: Write-behind buffer (default: one with the INGEST_* settings)
+        export_secret: Secret for signed export links; /export is only
+            served when it is set
+
+    Returns:
+        aiohttp application; the buffer is flushed on shutdown
+    """
+    app = web.Application()
+    app[BUFFER_KEY] = buffer if buffer is not None else WriteBehindBuffer()
+    app.router.add_post("/readings", post_readings)
+    app.router.add_get("/health", get_health)
+    if export_secret:
+        app[EXPORT_SECRET_KEY] = export_secret
+        app.router.add_get("/export", get_export)
+    app.on_startup.append(_start_buffer)
+    app.on_cleanup.append(_close_buffer)
+    return app
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    logger.info(f"📡 Ingestion service listening on {INGEST_HOST}:{INGEST_PORT}")
+    web.run_app(create_app(), host=INGEST_HOST, port=INGEST_PORT)
@@ -9,6 +9,9 @@ import streamlit as st
 from components.engineer import render_engineer_interface
 from components.analyst import render_analyst_interface
 from utils.i18n import t, render_language_selector
+from database.coalesce import request_scope
+from database.metrics import start_exporters
+from database import queries
 
 
 # ============================================================================
@@ -352,6 +355,20 @@ def get_app_version() -> str:
 
 def main():
     """Main application entry point."""
+    # Metrics endpoint / JSON dump, if configured (started once per process)
+    start_exporters()
+
+    # Drain manually entered records queued in the local outbox
+    if queries.record_outbox:
+        queries.record_outbox.start()
+
+    # Duplicate reads within this rerun share one backend call
+    with request_scope():
+        render_app()
+
+
+def render_app():
+    """Render header, language selector and the Engineer/Analyst tabs."""
 
     # Header with title and language selector
     header_col1, header_col2 = st.columns([3, 1])
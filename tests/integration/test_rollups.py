@@ -0,0 +1,79 @@
+"""
+Integration tests for the sensor_record_rollups tiers under concurrent writers.
+
+Runs against an embedded SQLite database, and against the Supabase project
+from .env when SUPABASE_URL and SUPABASE_KEY are set and
+database/sql/sensor_record_rollups.sql has been applied. The Supabase run
+creates a temporary sensor and deletes it (with its records and rollups)
+afterwards.
+"""
+
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from dotenv import load_dotenv
+
+from database.backend import ROLLUP_TIERS, create_backend
+from database.sqlite_backend import SQLiteBackend
+
+load_dotenv()
+
+# Every reading lands in the same 1m, 1h and 1d bucket
+BUCKET = datetime(2001, 1, 1, 12, 30, tzinfo=timezone.utc)
+WRITERS = 8
+READINGS_PER_WRITER = 50
+
+
+@pytest.fixture(params=["sqlite", "supabase"])
+def backend(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteBackend(str(tmp_path / "rollups.db"))
+
+    if not (os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_KEY")):
+        pytest.skip("SUPABASE_URL and SUPABASE_KEY are not set")
+    backend = create_backend("supabase")
+    try:
+        backend.fetch_rollup_page("1d", None, BUCKET, BUCKET, None, 1)
+    except Exception as e:
+        pytest.skip(f"sensor_record_rollups is not installed: {e}")
+    return backend
+
+
+@pytest.fixture
+def sensor(backend):
+    sensor = backend.insert_sensor({"name": f"rollup-test-{uuid.uuid4().hex[:8]}", "unit": "test"})
+    yield sensor
+    backend.delete_sensor(sensor["id"])
+
+
+class TestConcurrentRollupWrites:
+    """Writers inserting into one bucket at the same time all get counted."""
+
+    def test_concurrent_inserts_into_one_bucket(self, backend, sensor):
+        def write(writer):
+            backend.insert_records([
+                {
+                    "sensor_id": sensor["id"],
+                    "recorded_at": (BUCKET + timedelta(milliseconds=writer * 1000 + reading)).isoformat(),
+                    "value": float(writer * READINGS_PER_WRITER + reading),
+                }
+                for reading in range(READINGS_PER_WRITER)
+            ], returning=False)
+
+        with ThreadPoolExecutor(max_workers=WRITERS) as pool:
+            list(pool.map(write, range(WRITERS)))
+
+        total = WRITERS * READINGS_PER_WRITER
+        assert backend.count_records([sensor["id"]], None, None) == total
+        for tier in ROLLUP_TIERS:
+            buckets = backend.fetch_rollup_page(
+                tier, [sensor["id"]], BUCKET - timedelta(days=1), BUCKET + timedelta(days=1), None, 10
+            )
+            assert len(buckets) == 1, tier
+            assert buckets[0]["sample_count"] == total, tier
+            assert buckets[0]["min_value"] == 0.0, tier
+            assert buckets[0]["max_value"] == float(total - 1), tier
+            assert buckets[0]["sum_value"] == pytest.approx(total * (total - 1) / 2), tier
@@ -0,0 +1,38 @@
+"""
+Unit tests for the analyst table pagination helpers.
+"""
+
+import pytest
+
+from components.analyst import _page_label, _step_page
+
+
+class TestStepPage:
+    """Page numbers never reach 0 in either direction."""
+
+    @pytest.mark.parametrize("number, step, expected", [
+        (1, 1, 2),
+        (3, -1, 2),
+        (-3, 1, -2),
+        (-1, -1, -2),
+        # Rows arrived after the last page was fetched
+        (-1, 1, -1),
+        (1, -1, 1),
+    ])
+    def test_step(self, number, step, expected):
+        assert _step_page(number, step) == expected
+
+
+class TestPageLabel:
+    """Pages from the start show the page count, pages from the end count back."""
+
+    def test_page_from_start(self):
+        assert _page_label(2, 1200, approximate=False) == "Page 2 of 1,200"
+        assert _page_label(2, 1200, approximate=True) == "Page 2 of about 1,200"
+
+    def test_pages_from_end(self):
+        assert _page_label(-1, 10, approximate=False) == "Last page"
+        assert _page_label(-3, 10, approximate=False) == "Page 3 from the end"
+
+    def test_zero_is_never_shown(self):
+        assert "0" not in _page_label(0, 10, approximate=False)
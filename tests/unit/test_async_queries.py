@@ -0,0 +1,106 @@
+"""
+Unit tests for partitioned and keyset-paged range reads.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from database import async_queries
+from database.async_queries import choose_partition_count, split_time_range
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+
+
+class FakeBackend:
+    """One reading every minute; async page reads honour the keyset and the page size."""
+
+    def __init__(self, minutes=600):
+        self.rows = [
+            {"id": f"r{minute:05d}", "sensor_id": "s",
+             "recorded_at": START + timedelta(minutes=minute), "value": float(minute)}
+            for minute in range(minutes)
+        ]
+        self.pages = 0
+
+    def _in(self, row, start_date, end_date):
+        return ((start_date is None or row["recorded_at"] >= start_date)
+                and (end_date is None or row["recorded_at"] <= end_date))
+
+    async def fetch_records_page_async(self, sensor_ids, start_date, end_date, after, page_size,
+                                       descending=False):
+        self.pages += 1
+        rows = [row for row in self.rows if self._in(row, start_date, end_date)
+                and (after is None or (row["recorded_at"], row["id"]) > after)]
+        return rows[:page_size]
+
+    async def count_records_async(self, sensor_ids, start_date, end_date, estimated=False):
+        return sum(1 for row in self.rows if self._in(row, start_date, end_date))
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    fake = FakeBackend()
+    monkeypatch.setattr(async_queries, "get_backend", lambda: fake)
+    return fake
+
+
+class TestSplitTimeRange:
+    """Windows are disjoint, ordered and cover the range exactly."""
+
+    @pytest.mark.parametrize("partitions", [2, 3, 7, 16])
+    def test_windows_partition_the_range(self, partitions):
+        end = START + timedelta(days=30, microseconds=17)
+
+        windows = split_time_range(START, end, partitions)
+
+        assert len(windows) == partitions
+        assert windows[0][0] == START
+        assert windows[-1][1] == end
+        for (_, previous_end), (next_start, _) in zip(windows, windows[1:]):
+            assert next_start - previous_end == MICROSECOND
+        assert all(window_start <= window_end for window_start, window_end in windows)
+
+    def test_single_partition_is_the_range(self):
+        end = START + timedelta(days=1)
+        assert split_time_range(START, end, 1) == [(START, end)]
+
+    def test_range_too_short_to_split(self):
+        end = START + MICROSECOND
+        assert split_time_range(START, end, 4) == [(START, end)]
+
+
+class TestChoosePartitionCount:
+    """One partition per PARTITION_TARGET_ROWS rows, within bounds."""
+
+    def test_bounds(self):
+        target = async_queries.PARTITION_TARGET_ROWS
+        assert choose_partition_count(0) == 1
+        assert choose_partition_count(target) == 1
+        assert choose_partition_count(target + 1) == 2
+        assert choose_partition_count(target * 1000) == async_queries.PARTITION_MAX_COUNT
+
+
+class TestPartitionedReads:
+    """Partitions and keyset pages reassemble the range in order, once each."""
+
+    def test_keyset_pages_walk_the_range(self, backend):
+        rows = async_queries.run(async_queries.get_records_for_chart(["s"], None, None, page_size=7))
+
+        assert [row["id"] for row in rows] == [row["id"] for row in backend.rows]
+        assert backend.pages == len(backend.rows) // 7 + 1
+
+    @pytest.mark.parametrize("partitions", [1, 4, 9])
+    def test_partitions_return_each_row_once_in_order(self, backend, partitions):
+        start, end = START + timedelta(minutes=10), START + timedelta(minutes=500)
+
+        rows = async_queries.run(async_queries.get_records_partitioned(["s"], start, end, partitions))
+
+        expected = [row["id"] for row in backend.rows if start <= row["recorded_at"] <= end]
+        assert [row["id"] for row in rows] == expected
+
+    def test_open_range_is_not_split(self, backend):
+        rows = async_queries.run(async_queries.get_records_partitioned(["s"], START, None))
+
+        assert len(rows) == len(backend.rows)
@@ -0,0 +1,94 @@
+"""
+Unit tests for bulk import parsing.
+"""
+
+from datetime import datetime
+
+import pandas as pd
+
+from utils.bulk_import import RejectionReport, parse_timestamp_column, prepare_import_chunk
+
+
+class TestParseTimestampColumn:
+    """Timestamps are parsed with the declared format only."""
+
+    def test_iso_rejects_day_month_layouts(self):
+        timestamps, errors = parse_timestamp_column(pd.Series(["2026-03-04 10:00", "03/04/2026 10:00"]))
+
+        assert timestamps[0] == pd.Timestamp("2026-03-04 10:00")
+        assert pd.isna(timestamps[1])
+        assert errors[0] is None
+        assert "ISO 8601" in errors[1]
+
+    def test_explicit_format(self):
+        timestamps, errors = parse_timestamp_column(
+            pd.Series(["03.04.2026 10:00", "2026-04-03 10:00"]), "%d.%m.%Y %H:%M"
+        )
+
+        assert timestamps[0] == pd.Timestamp("2026-04-03 10:00")
+        assert pd.isna(timestamps[1])
+        assert "DD.MM.YYYY HH:MM" in errors[1]
+
+    def test_missing_cells_are_reported(self):
+        _, errors = parse_timestamp_column(pd.Series(["", None, " "], dtype=object))
+
+        assert errors.tolist() == ["Missing timestamp"] * 3
+
+    def test_offsets_and_local_cells_can_mix(self):
+        timestamps, errors = parse_timestamp_column(pd.Series([
+            "2026-01-02T10:00:00", "2026-01-02T10:00:00Z", "2026-01-02T10:00:00+01:00",
+        ]))
+
+        assert errors.isna().all()
+        # Offset cells are instants: one hour apart, whatever the local zone
+        assert timestamps[1] - timestamps[2] == pd.Timedelta(hours=1)
+        assert timestamps[0] == pd.Timestamp("2026-01-02 10:00")
+
+    def test_excel_datetimes_pass_through(self):
+        timestamps, errors = parse_timestamp_column(
+            pd.Series([datetime(2026, 1, 2, 10, 0)], dtype=object), "%d.%m.%Y %H:%M"
+        )
+
+        assert errors[0] is None
+        assert timestamps[0] == pd.Timestamp("2026-01-02 10:00")
+
+
+class TestPrepareImportChunk:
+    """Unparseable rows are rejected with their row number."""
+
+    def test_rejected_rows_are_reported_not_imported(self):
+        chunk = pd.DataFrame({
+            "timestamp": ["2026-01-02 10:00", "02/01/2026 10:00"],
+            "Temp": ["1.5", "2.5"],
+        })
+
+        records, origins, rejections = prepare_import_chunk(chunk, "timestamp", {"Temp": "sensor-1"})
+
+        assert [record[2] for record in records] == [1.5]
+        assert origins == [{"row": 1, "column": "Temp"}]
+        assert len(rejections) == 1
+        assert rejections[0]["row"] == 2
+        assert rejections[0]["column"] == "timestamp"
+        assert rejections[0]["value"] == "02/01/2026 10:00"
+
+
+class TestRejectionReport:
+    """Every rejection is counted, only the first max_rows are kept."""
+
+    def test_rows_beyond_the_limit_are_only_counted(self):
+        report = RejectionReport(max_rows=3)
+
+        report.add({"row": row, "column": "Temp", "value": "x", "error": "not a number"} for row in range(1, 3))
+        report.add([{"row": row, "column": "Temp", "value": "x", "error": "not a number"} for row in range(3, 6)])
+
+        assert report.total == 5
+        assert report.truncated
+        assert report.to_frame()["Row"].tolist() == [1, 2, 3]
+        assert report.to_frame().columns.tolist() == ["Row", "Column", "Value", "Reason"]
+
+    def test_empty_report(self):
+        report = RejectionReport()
+
+        assert report.total == 0
+        assert not report.truncated
+        assert report.to_frame().empty
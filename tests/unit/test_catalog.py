@@ -0,0 +1,120 @@
+"""
+Unit tests for the process-wide sensor catalog.
+"""
+
+import threading
+import time
+
+from database import catalog
+from database.catalog import SensorCatalog
+
+
+class Loader:
+    """Sensors table stand-in that counts how often it was read."""
+
+    def __init__(self, *names, delay=0.0):
+        self.sensors = [{"id": f"id-{name}", "name": name} for name in names]
+        self.loads = 0
+        self.delay = delay
+
+    def __call__(self):
+        self.loads += 1
+        time.sleep(self.delay)
+        return list(self.sensors)
+
+
+class Clock:
+    """Replacement for time.monotonic that only moves when told to."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _catalog(monkeypatch, loader, ttl=60):
+    clock = Clock()
+    monkeypatch.setattr(catalog.time, "monotonic", clock)
+    return SensorCatalog(loader, ttl=ttl), clock
+
+
+class TestTTL:
+    """The catalog is loaded once and reloaded only after the TTL."""
+
+    def test_reads_within_ttl_share_one_load(self, monkeypatch):
+        loader = Loader("Humidity", "Temperature")
+        sensors, clock = _catalog(monkeypatch, loader)
+
+        sensors.all()
+        clock.now += 59
+        assert sensors.get("id-Humidity")["name"] == "Humidity"
+        assert loader.loads == 1
+
+    def test_expired_catalog_is_reloaded(self, monkeypatch):
+        loader = Loader("Temperature")
+        sensors, clock = _catalog(monkeypatch, loader)
+        sensors.all()
+
+        loader.sensors.append({"id": "id-Pressure", "name": "Pressure"})
+        clock.now += 60
+
+        assert [sensor["name"] for sensor in sensors.all()] == ["Temperature", "Pressure"]
+        assert loader.loads == 2
+
+    def test_concurrent_first_reads_load_once(self, monkeypatch):
+        loader = Loader("Temperature", delay=0.05)
+        sensors, _ = _catalog(monkeypatch, loader)
+
+        threads = [threading.Thread(target=sensors.all) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert loader.loads == 1
+
+
+class TestInvalidation:
+    """Local writes and unknown IDs reload the catalog early."""
+
+    def test_invalidate_reloads_on_next_read(self, monkeypatch):
+        loader = Loader("Temperature")
+        sensors, _ = _catalog(monkeypatch, loader)
+        sensors.all()
+
+        loader.sensors[0]["name"] = "Air temperature"
+        sensors.invalidate()
+
+        assert sensors.get("id-Temperature")["name"] == "Air temperature"
+        assert loader.loads == 2
+
+    def test_index_for_reloads_once_for_an_unknown_id(self, monkeypatch):
+        loader = Loader("Temperature")
+        sensors, _ = _catalog(monkeypatch, loader)
+        sensors.all()
+
+        # Created by another process after the catalog was loaded
+        loader.sensors.append({"id": "id-Pressure", "name": "Pressure"})
+        index = sensors.index_for(["id-Temperature", "id-Pressure"])
+
+        assert set(index) == {"id-Temperature", "id-Pressure"}
+        assert loader.loads == 2
+
+    def test_index_for_known_ids_does_not_reload(self, monkeypatch):
+        loader = Loader("Temperature")
+        sensors, _ = _catalog(monkeypatch, loader)
+        sensors.all()
+
+        sensors.index_for(["id-Temperature"])
+
+        assert loader.loads == 1
+
+    def test_deleted_sensor_id_reloads_once_per_lookup(self, monkeypatch):
+        loader = Loader("Temperature")
+        sensors, _ = _catalog(monkeypatch, loader)
+
+        index = sensors.index_for(["id-Deleted"])
+
+        assert "id-Deleted" not in index
+        assert loader.loads == 2
@@ -0,0 +1,123 @@
+"""
+Unit tests for per-rerun query coalescing.
+"""
+
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from database.coalesce import coalesced, get_coalesce_stats, invalidates_coalesced, request_scope
+
+
+class Counter:
+    """Query stand-ins that count how often they really ran."""
+
+    def __init__(self):
+        self.reads = 0
+
+    def make(self):
+        @coalesced
+        def read(sensor_ids, start_date=None):
+            self.reads += 1
+            return [{"reads": self.reads}]
+
+        @invalidates_coalesced
+        def write():
+            return True
+
+        return read, write
+
+
+class TestCoalesced:
+    """Identical reads inside one scope run once."""
+
+    def test_identical_calls_share_one_result(self):
+        counter = Counter()
+        read, _ = counter.make()
+        moment = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+        with request_scope() as scope:
+            first = read(["a", "b"], start_date=moment)
+            second = read(["a", "b"], start_date=moment)
+            read(["a"], start_date=moment)
+
+        assert first == second
+        assert counter.reads == 2
+        assert (scope.calls, scope.saved) == (3, 1)
+
+    def test_callers_get_their_own_copy(self):
+        counter = Counter()
+        read, _ = counter.make()
+
+        with request_scope():
+            first = read(["a"])
+            first[0]["sensors"] = {"name": "Temperature"}
+            first.append({"reads": 99})
+            second = read(["a"])
+
+        assert second == [{"reads": 1}]
+        assert first[0] is not second[0]
+
+    def test_frames_are_copied_per_caller(self):
+        @coalesced
+        def read_frame(sensor_ids):
+            return pd.DataFrame({"value": [1.0, 2.0]})
+
+        with request_scope():
+            first = read_frame(["a"])
+            first["doubled"] = first["value"] * 2
+            second = read_frame(["a"])
+
+        assert second.columns.tolist() == ["value"]
+
+    def test_no_scope_means_no_sharing(self):
+        counter = Counter()
+        read, _ = counter.make()
+
+        read(["a"])
+        read(["a"])
+
+        assert counter.reads == 2
+
+    def test_scopes_do_not_share(self):
+        counter = Counter()
+        read, _ = counter.make()
+
+        with request_scope():
+            read(["a"])
+        with request_scope():
+            read(["a"])
+
+        assert counter.reads == 2
+
+    def test_write_invalidates_the_scope(self):
+        counter = Counter()
+        read, write = counter.make()
+
+        with request_scope():
+            read(["a"])
+            write()
+            assert read(["a"]) == [{"reads": 2}]
+
+    def test_unhashable_arguments_bypass_coalescing(self):
+        counter = Counter()
+        read, _ = counter.make()
+
+        with request_scope():
+            read(object())
+            read(object())
+
+        assert counter.reads == 2
+
+    def test_totals_accumulate_across_scopes(self):
+        counter = Counter()
+        read, _ = counter.make()
+        before = get_coalesce_stats()
+
+        with request_scope():
+            read(["a"])
+            read(["a"])
+
+        after = get_coalesce_stats()
+        assert after["calls"] - before["calls"] == 2
+        assert after["saved"] - before["saved"] == 1
@@ -0,0 +1,66 @@
+"""
+Unit tests for visual downsampling.
+"""
+
+import numpy as np
+import pytest
+
+from utils.downsample import lttb, minmax_lttb
+
+
+def _noisy_series(n, seed=7):
+    rng = np.random.default_rng(seed)
+    return np.arange(n, dtype=np.float64), np.cumsum(rng.normal(size=n))
+
+
+class TestLttb:
+    """LTTB returns n_out sorted, unique indices including both endpoints."""
+
+    @pytest.mark.parametrize("n, n_out", [(1000, 100), (1000, 3), (101, 100), (5000, 777)])
+    def test_indices_shape(self, n, n_out):
+        x, y = _noisy_series(n)
+
+        indices = lttb(x, y, n_out)
+
+        assert len(indices) == n_out
+        assert indices[0] == 0
+        assert indices[-1] == n - 1
+        assert np.all(np.diff(indices) > 0)
+
+    def test_short_series_is_kept_whole(self):
+        x, y = _noisy_series(50)
+
+        assert np.array_equal(lttb(x, y, 50), np.arange(50))
+        assert np.array_equal(lttb(x, y, 500), np.arange(50))
+
+    def test_datetime_x(self):
+        x = np.datetime64("2026-01-01T00:00") + np.arange(1000) * np.timedelta64(10, "s")
+        _, y = _noisy_series(1000)
+
+        indices = lttb(x, y, 100)
+
+        assert len(indices) == 100
+        assert np.all(np.diff(indices) > 0)
+
+
+class TestMinmaxLttb:
+    """MinMaxLTTB never drops a lone spike."""
+
+    @pytest.mark.parametrize("spike", [1000.0, -1000.0])
+    def test_single_spike_is_kept(self, spike):
+        n = 100_000
+        x = np.arange(n, dtype=np.float64)
+        y = np.sin(x / 500.0)
+        y[61_337] = spike
+
+        indices = minmax_lttb(x, y, 200)
+
+        assert 61_337 in indices
+        assert len(indices) == 200
+        assert indices[0] == 0 and indices[-1] == n - 1
+        assert np.all(np.diff(indices) > 0)
+
+    def test_small_input_falls_back_to_lttb(self):
+        x, y = _noisy_series(300)
+
+        assert np.array_equal(minmax_lttb(x, y, 100), lttb(x, y, 100))
@@ -0,0 +1,152 @@
+"""
+Unit tests for streaming exports and signed export links.
+"""
+
+import gzip
+import io
+from datetime import datetime, timezone
+
+import pandas as pd
+import pytest
+
+from utils import export
+from utils.export import (
+    EXPORT_COLUMNS, EXPORT_FORMATS, export_frames, iter_export, sign_export_link, verify_export_link,
+    write_export
+)
+
+SECRET = "test-secret"
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+END = datetime(2026, 2, 1, tzinfo=timezone.utc)
+
+SENSORS = {"s1": {"name": "Temperature", "unit": "°C"}, "s2": {"name": "Pressure", "unit": "bar"}}
+
+
+def _lookup(sensor_ids):
+    return {str(sensor_id): SENSORS[str(sensor_id)] for sensor_id in sensor_ids}
+
+
+def _pages():
+    """Two record pages as returned by queries.iter_records."""
+    return [
+        [{"id": "r1", "sensor_id": "s1", "recorded_at": "2026-01-01T10:00:00+00:00", "value": 20.5},
+         {"id": "r2", "sensor_id": "s2", "recorded_at": "2026-01-01T10:00:00+00:00", "value": 1.25}],
+        [{"id": "r3", "sensor_id": "s1", "recorded_at": "2026-01-01T10:01:00+00:00", "value": 21.0}],
+    ]
+
+
+def _read(fmt, data):
+    if fmt == "parquet":
+        return pd.read_parquet(io.BytesIO(data))
+    return export.pa.ipc.open_file(data).read_pandas()
+
+
+class TestIterExport:
+    """Every format streams the same rows with one header and typed columns."""
+
+    def test_csv_has_one_header_and_local_timestamps(self):
+        data = b"".join(iter_export(export_frames(_pages(), _lookup), "csv")).decode("utf-8")
+
+        assert data.splitlines() == [
+            "Sensor,Unit,Timestamp,Value",
+            "Temperature,°C,2026-01-01 12:00:00,20.5",
+            "Pressure,bar,2026-01-01 12:00:00,1.25",
+            "Temperature,°C,2026-01-01 12:01:00,21.0",
+        ]
+
+    def test_empty_csv_still_has_the_header(self):
+        data = b"".join(iter_export(iter([]), "csv"))
+
+        assert data.decode("utf-8").splitlines() == [",".join(EXPORT_COLUMNS)]
+
+    def test_gzip_wraps_the_csv(self):
+        plain = b"".join(iter_export(export_frames(_pages(), _lookup), "csv"))
+
+        compressed = b"".join(iter_export(export_frames(_pages(), _lookup), "csv.gz"))
+
+        assert gzip.decompress(compressed) == plain
+
+    @pytest.mark.skipif(export.pa is None, reason="pyarrow is not installed")
+    @pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+    def test_columnar_formats_keep_types(self, fmt):
+        data = b"".join(iter_export(export_frames(_pages(), _lookup), fmt))
+
+        frame = _read(fmt, data)
+
+        assert frame.columns.tolist() == EXPORT_COLUMNS
+        assert frame["Sensor"].tolist() == ["Temperature", "Pressure", "Temperature"]
+        assert frame["Value"].tolist() == [20.5, 1.25, 21.0]
+        assert str(frame["Timestamp"].dt.tz) == "Europe/Kiev"
+        assert frame["Timestamp"].iloc[2] == pd.Timestamp("2026-01-01 10:01", tz="UTC")
+
+    @pytest.mark.skipif(export.pa is None, reason="pyarrow is not installed")
+    @pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+    def test_empty_columnar_export_is_readable(self, fmt):
+        data = b"".join(iter_export(iter([]), fmt))
+
+        assert _read(fmt, data).columns.tolist() == EXPORT_COLUMNS
+
+    def test_unknown_format_is_refused(self):
+        with pytest.raises(ValueError):
+            iter_export(iter([]), "xlsx")
+
+    def test_write_export_reports_the_file_size(self, tmp_path):
+        path = tmp_path / "export.csv.gz"
+        progress = []
+
+        written = write_export(export_frames(_pages(), _lookup), str(path), "csv.gz", progress.append)
+
+        assert written == path.stat().st_size
+        assert progress == sorted(progress) and progress[-1] == written
+
+
+class TestExportLinks:
+    """Export tokens round-trip and refuse forged or expired links."""
+
+    def test_round_trip(self):
+        token = sign_export_link(["s1", "s2"], START, END, False, "parquet", SECRET, 60)
+
+        export = verify_export_link(token, SECRET)
+
+        assert export == {
+            "sensor_ids": ["s1", "s2"], "start_date": START, "end_date": END,
+            "newest_first": False, "format": "parquet",
+        }
+
+    def test_open_filters(self):
+        export = verify_export_link(sign_export_link(None, None, None, True, "csv", SECRET, 60), SECRET)
+
+        assert export["sensor_ids"] is None
+        assert export["start_date"] is None and export["end_date"] is None
+
+    def test_token_is_url_safe(self):
+        token = sign_export_link(["s1"], START, END, True, "csv.gz", SECRET, 60)
+        assert set(token) <= set("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_=.")
+
+    def test_wrong_secret_is_refused(self):
+        token = sign_export_link(["s1"], START, END, True, "csv", SECRET, 60)
+        with pytest.raises(ValueError, match="Invalid"):
+            verify_export_link(token, "other-secret")
+
+    def test_changed_parameters_are_refused(self):
+        token = sign_export_link(["s1"], START, END, True, "csv", SECRET, 60)
+        other, _, _ = sign_export_link(["s1", "s2"], START, END, True, "csv", SECRET, 60).partition(".")
+        _, _, signature = token.partition(".")
+
+        with pytest.raises(ValueError, match="Invalid"):
+            verify_export_link(f"{other}.{signature}", SECRET)
+
+    def test_expired_link_is_refused(self):
+        token = sign_export_link(["s1"], START, END, True, "csv", SECRET, -1)
+        with pytest.raises(ValueError, match="expired"):
+            verify_export_link(token, SECRET)
+
+    @pytest.mark.parametrize("token", ["", "garbage", "!!!.abc"])
+    def test_malformed_tokens_are_refused(self, token):
+        with pytest.raises(ValueError):
+            verify_export_link(token, SECRET)
+
+    def test_every_format_can_be_signed(self):
+        for fmt in EXPORT_FORMATS:
+            token = sign_export_link(None, None, None, True, fmt, SECRET, 60)
+            assert verify_export_link(token, SECRET)["format"] == fmt
@@ -0,0 +1,119 @@
+"""
+Unit tests for record and bucket frame conversion.
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils import frames
+from utils.timezone import DEFAULT_TIMEZONE
+
+SENSORS = {
+    "s1": {"name": "Temperature", "unit": "°C"},
+    "s2": {"name": "Pressure", "unit": None},
+}
+
+
+def lookup(sensor_ids):
+    return {str(sensor_id): SENSORS[str(sensor_id)] for sensor_id in sensor_ids if str(sensor_id) in SENSORS}
+
+
+RECORDS = [
+    {"id": "a", "sensor_id": "s1", "recorded_at": "2026-01-01T00:00:00+00:00", "value": 1.25},
+    {"id": "b", "sensor_id": "s2", "recorded_at": "2026-01-01T00:00:10.5+00:00", "value": 2.0},
+    {"id": "c", "sensor_id": "s1", "recorded_at": "2026-01-01T00:00:20Z", "value": 3.5},
+]
+
+
+class TestParseUtcTimestamps:
+    """Mixed ISO layouts parse to UTC."""
+
+    def test_mixed_layouts(self):
+        parsed = frames.parse_utc_timestamps([
+            "2026-01-01T00:00:00+00:00", "2026-01-01T02:00:00+02:00", "2026-01-01T00:00:00.250Z",
+        ])
+
+        assert str(parsed.dt.tz) == "UTC"
+        assert parsed[0] == parsed[1]
+        assert parsed[2] - parsed[0] == pd.Timedelta(milliseconds=250)
+
+    def test_naive_values_are_utc(self):
+        parsed = frames.parse_utc_timestamps(["2026-01-01 00:00:00"])
+        assert parsed[0] == pd.Timestamp("2026-01-01", tz="UTC")
+
+
+class TestRecordsToFrame:
+    """Records become a typed frame with local timestamps and sensor columns."""
+
+    def test_columns_and_types(self):
+        df = frames.records_to_frame(RECORDS, lookup)
+
+        assert list(df.columns) == frames.RECORD_COLUMNS + ["sensor_name", "sensor_unit"]
+        assert str(df["recorded_at"].dt.tz) == str(DEFAULT_TIMEZONE)
+        assert df["value"].dtype == np.float64
+        for column in frames.CATEGORY_COLUMNS:
+            assert isinstance(df[column].dtype, pd.CategoricalDtype)
+        assert df["sensor_name"].tolist() == ["Temperature", "Pressure", "Temperature"]
+        assert df["sensor_unit"].tolist() == ["°C", "", "°C"]
+
+    def test_empty(self):
+        df = frames.records_to_frame([], lookup)
+        assert df.empty
+        assert "sensor_name" in df.columns
+
+    def test_columns_to_frame_matches_records_to_frame(self):
+        columns = pd.DataFrame({
+            "id": [record["id"] for record in RECORDS],
+            "sensor_id": pd.Categorical([record["sensor_id"] for record in RECORDS]),
+            "recorded_at": frames.parse_utc_timestamps([record["recorded_at"] for record in RECORDS]),
+            "value": [record["value"] for record in RECORDS],
+        })
+
+        converted = frames.columns_to_frame(columns, lookup)
+
+        expected = frames.records_to_frame(RECORDS, lookup)
+        for column in expected.columns:
+            assert converted[column].astype(object).tolist() == expected[column].astype(object).tolist()
+        # The cached columns are not modified
+        assert str(columns["recorded_at"].dt.tz) == "UTC"
+
+
+class TestCompactFrame:
+    """Values narrow to float32 only when no reading changes."""
+
+    def test_lossless_values_narrow(self):
+        df = frames.compact_frame(frames.records_to_frame(RECORDS, lookup))
+
+        assert df["value"].dtype == np.float32
+        assert df["id"].dtype == "string[pyarrow]"
+
+    def test_precise_values_stay_float64(self):
+        records = [dict(RECORDS[0], value=1234567.891)]
+
+        df = frames.compact_frame(frames.records_to_frame(records, lookup), decimals=3)
+
+        assert df["value"].dtype == np.float64
+
+    def test_input_is_not_modified(self):
+        df = frames.records_to_frame(RECORDS, lookup)
+        df["sensors"] = [{}] * len(df)
+
+        compact = frames.compact_frame(df)
+
+        assert "sensors" in df.columns and "sensors" not in compact.columns
+        assert df["value"].dtype == np.float64
+
+
+class TestBucketsToFrame:
+    """Bucket rows are renamed for charting."""
+
+    def test_rename_and_localize(self):
+        df = frames.buckets_to_frame([{
+            "sensor_id": "s1", "sensor_name": "Temperature", "sensor_unit": None,
+            "bucket_start": "2026-01-01T00:00:00+00:00", "avg_value": 2.5,
+            "min_value": 1.0, "max_value": 4.0, "sample_count": 3,
+        }])
+
+        assert df["value"].tolist() == [2.5]
+        assert df["sensor_unit"].tolist() == [""]
+        assert str(df["recorded_at"].dt.tz) == str(DEFAULT_TIMEZONE)
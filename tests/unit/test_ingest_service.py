@@ -0,0 +1,151 @@
+"""
+Unit tests for the ingestion service's write-behind buffer.
+"""
+
+import asyncio
+import io
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+import ingest_service
+from database import queries
+from database.backend import RejectedDataError
+from database.catalog import SensorCatalog
+from database.sqlite_backend import SQLiteBackend
+from utils.export import sign_export_link
+
+RECORDED_AT = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class FakeBackend:
+    """insert_records stand-in with a switchable outage and a rejected value."""
+
+    def __init__(self):
+        self.outage = False
+        self.bad_value = None
+        self.stored = []
+
+    def insert_records(self, payloads, returning=True, ignore_duplicates=False):
+        if self.outage:
+            raise ConnectionError("502 Bad Gateway")
+        if any(payload["value"] == self.bad_value for payload in payloads):
+            raise RejectedDataError("violates foreign key constraint")
+        self.stored.extend(payloads)
+        return []
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    fake = FakeBackend()
+    monkeypatch.setattr(queries, "get_backend", lambda: fake)
+    return fake
+
+
+def _flush(readings, buffer):
+    async def run():
+        assert buffer.offer(readings)
+        return await buffer._flush()
+    return asyncio.run(run())
+
+
+class TestWriteBehindBuffer:
+    """Acknowledged readings survive transient storage failures."""
+
+    def test_transient_failure_requeues_everything(self, backend):
+        backend.outage = True
+        buffer = ingest_service.WriteBehindBuffer(capacity=100, flush_size=10, flush_interval=60)
+        readings = [("sensor-a", RECORDED_AT, float(value)) for value in range(5)]
+
+        assert _flush(readings, buffer) is False
+
+        assert len(buffer) == 5
+        assert buffer.stats["dropped"] == 0
+        assert [reading for _, reading in buffer._queue] == readings
+
+    def test_rejected_reading_is_dropped_rest_written(self, backend):
+        backend.bad_value = 3.0
+        buffer = ingest_service.WriteBehindBuffer(capacity=100, flush_size=10, flush_interval=60)
+        readings = [("sensor-a", RECORDED_AT, float(value)) for value in range(5)]
+
+        assert _flush(readings, buffer) is True
+
+        assert len(buffer) == 0
+        assert buffer.stats["dropped"] == 1
+        assert sorted(payload["value"] for payload in backend.stored) == [0.0, 1.0, 2.0, 4.0]
+
+    def test_full_buffer_refuses_whole_request(self, backend):
+        buffer = ingest_service.WriteBehindBuffer(capacity=4, flush_size=10, flush_interval=60)
+        readings = [("sensor-a", RECORDED_AT, float(value)) for value in range(3)]
+
+        assert buffer.offer(readings)
+        assert not buffer.offer(readings)
+        assert len(buffer) == 3
+        assert buffer.stats["rejected_full"] == 1
+
+
+EXPORT_SECRET = "test-secret"
+
+
+@pytest.fixture
+def export_backend(monkeypatch, tmp_path):
+    store = SQLiteBackend(str(tmp_path / "export.db"))
+    sensor = store.insert_sensor({"name": "Temperature", "unit": "°C"})
+    store.insert_records([
+        {"sensor_id": sensor["id"], "recorded_at": RECORDED_AT + timedelta(minutes=minute), "value": float(minute)}
+        for minute in range(25)
+    ])
+    monkeypatch.setattr(queries, "get_backend", lambda: store)
+    monkeypatch.setattr(queries, "sensor_catalog", SensorCatalog(store.list_sensors))
+    monkeypatch.setattr(queries, "RECORDS_PAGE_SIZE", 10)
+    return sensor
+
+
+def _get(path):
+    async def run():
+        app = ingest_service.create_app(ingest_service.WriteBehindBuffer(), export_secret=EXPORT_SECRET)
+        async with TestClient(TestServer(app)) as client:
+            response = await client.get(path)
+            return response.status, response.headers, await response.read()
+    return asyncio.run(run())
+
+
+class TestExportEndpoint:
+    """Signed export links stream the file; anything else is refused."""
+
+    def test_streams_signed_export(self, export_backend):
+        token = sign_export_link([export_backend["id"]], None, None, False, "csv", EXPORT_SECRET, 60)
+
+        status, headers, body = _get(f"/export?token={token}")
+
+        assert status == 200
+        assert headers["Content-Type"].startswith("text/csv")
+        assert "attachment" in headers["Content-Disposition"]
+        df = pd.read_csv(io.BytesIO(body))
+        assert list(df.columns) == ["Sensor", "Unit", "Timestamp", "Value"]
+        assert df["Value"].tolist() == [float(minute) for minute in range(25)]
+        assert set(df["Sensor"]) == {"Temperature"}
+
+    def test_parquet_export_is_readable(self, export_backend):
+        token = sign_export_link(None, None, None, True, "parquet", EXPORT_SECRET, 60)
+
+        status, _, body = _get(f"/export?token={token}")
+
+        assert status == 200
+        assert pd.read_parquet(io.BytesIO(body))["Value"].tolist() == [float(minute) for minute in range(24, -1, -1)]
+
+    def test_forged_token_is_refused(self, export_backend):
+        token = sign_export_link(None, None, None, True, "csv", "other-secret", 60)
+
+        status, _, _ = _get(f"/export?token={token}")
+
+        assert status == 403
+
+    def test_export_is_disabled_without_secret(self):
+        async def run():
+            app = ingest_service.create_app(ingest_service.WriteBehindBuffer(), export_secret="")
+            async with TestClient(TestServer(app)) as client:
+                return (await client.get("/export")).status
+        assert asyncio.run(run()) == 404
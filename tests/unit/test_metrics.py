@@ -0,0 +1,39 @@
+"""
+Unit tests for query instrumentation.
+"""
+
+import pandas as pd
+
+from database import metrics
+
+
+class TestCountRows:
+    """Row counts reflect the rows a result carries, not its Python type."""
+
+    def test_list_counts_items(self):
+        assert metrics._count_rows([{"id": "a"}, {"id": "b"}]) == 2
+
+    def test_batch_summary_counts_inserted(self):
+        summary = {"inserted": 998, "failed": [{"index": 3}, {"index": 7}]}
+        assert metrics._count_rows(summary) == 998
+
+    def test_single_record_counts_one(self):
+        assert metrics._count_rows({"id": "a", "value": 1.0}) == 1
+
+    def test_frame_counts_rows(self):
+        assert metrics._count_rows(pd.DataFrame({"value": [1.0, 2.0, 3.0]})) == 3
+
+    def test_scalars_and_none_count_zero(self):
+        assert metrics._count_rows(42) == 0
+        assert metrics._count_rows(None) == 0
+        assert metrics._count_rows({"sensors": 3, "rows": 10}) == 0
+
+    def test_instrumented_batch_records_inserted_rows(self):
+        @metrics.instrumented
+        def create_records_batch_probe(rows):
+            return {"inserted": len(rows) - 1, "failed": [{"index": 0}]}
+
+        create_records_batch_probe([1, 2, 3])
+
+        series = metrics._series[("create_records_batch_probe", "rows")]
+        assert series.rows == 2
@@ -0,0 +1,124 @@
+"""
+Unit tests for the durable record outbox and Supabase error classification.
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+from postgrest.exceptions import APIError
+
+from database import supabase_backend
+from database.outbox import RecordOutbox
+from database.supabase_backend import SupabaseBackend, is_data_error
+
+RECORDED_AT = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class FakeTable:
+    """sensor_records table stand-in: stores rows or raises a preset error."""
+
+    def __init__(self, fail_with=None, bad_sensor=None):
+        self.fail_with = fail_with
+        self.bad_sensor = bad_sensor
+        self.stored = {}
+        self.calls = 0
+        self._payloads = None
+
+    def upsert(self, payloads, **kwargs):
+        self._payloads = payloads
+        return self
+
+    insert = upsert
+
+    def execute(self):
+        self.calls += 1
+        if self.fail_with:
+            raise APIError(self.fail_with)
+        if any(p["sensor_id"] == self.bad_sensor for p in self._payloads):
+            raise APIError({"code": "23503", "message": "violates foreign key constraint"})
+        for payload in self._payloads:
+            self.stored.setdefault(payload["id"], payload)
+        return type("Response", (), {"data": []})()
+
+
+@pytest.fixture
+def table(monkeypatch):
+    """Route SupabaseBackend writes to a FakeTable."""
+    fake = FakeTable()
+    client = type("Client", (), {"table": lambda self, name: fake})()
+    monkeypatch.setattr(supabase_backend, "get_supabase", lambda: client)
+    return fake
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    """Outbox writing through SupabaseBackend.insert_records."""
+    def writer(payloads):
+        SupabaseBackend().insert_records(payloads, returning=False, ignore_duplicates=True)
+    return RecordOutbox(str(tmp_path / "outbox.db"), writer, batch_size=10)
+
+
+class TestIsDataError:
+    """Only errors caused by the rows themselves count as rejections."""
+
+    @pytest.mark.parametrize("code", ["23503", "23505", "22P02", "PGRST204"])
+    def test_data_errors(self, code):
+        assert is_data_error(APIError({"code": code, "message": "x"}))
+
+    @pytest.mark.parametrize("code", [503, 502, "57014", "PGRST301", "42501", None])
+    def test_transient_or_request_errors(self, code):
+        assert not is_data_error(APIError({"code": code, "message": "x"}))
+
+
+class TestRecordOutbox:
+    """Retry and reject state of queued readings."""
+
+    def test_gateway_error_leaves_rows_pending(self, outbox, table):
+        for value in range(5):
+            outbox.enqueue("sensor-a", RECORDED_AT, value)
+        table.fail_with = {"code": 503, "message": "JSON could not be generated"}
+
+        with pytest.raises(APIError):
+            outbox.flush()
+
+        stats = outbox.stats()
+        assert stats["pending"] == 5
+        assert stats["rejected"] == 0
+        assert stats["last_error"]
+        # Not bisected into per-row requests
+        assert table.calls == 1
+
+        table.fail_with = None
+        assert outbox.flush() == 5
+        assert outbox.stats()["pending"] == 0
+        assert len(table.stored) == 5
+
+    def test_constraint_violation_rejects_only_bad_row(self, outbox, table):
+        table.bad_sensor = "sensor-gone"
+        ids = [outbox.enqueue("sensor-a", RECORDED_AT, value) for value in range(4)]
+        bad_id = outbox.enqueue("sensor-gone", RECORDED_AT, 99.0)
+
+        assert outbox.flush() == 5
+
+        assert set(table.stored) == set(ids)
+        rejected = outbox.rejected()
+        assert [row["id"] for row in rejected] == [bad_id]
+        assert "foreign key" in rejected[0]["last_error"]
+        assert outbox.stats() == {"pending": 0, "rejected": 1, "last_error": None}
+
+    def test_resent_batch_is_not_duplicated(self, outbox, table):
+        record_id = outbox.enqueue("sensor-a", RECORDED_AT, 1.0)
+        outbox._writer([{"id": record_id, "sensor_id": "sensor-a",
+                         "recorded_at": RECORDED_AT.isoformat(), "value": 1.0}])
+
+        assert outbox.flush() == 1
+        assert list(table.stored) == [record_id]
+
+    def test_discard_removes_rejected_row(self, outbox, table):
+        table.bad_sensor = "sensor-gone"
+        bad_id = outbox.enqueue("sensor-gone", RECORDED_AT, 1.0)
+        outbox.flush()
+
+        outbox.discard(bad_id)
+
+        assert outbox.stats()["rejected"] == 0
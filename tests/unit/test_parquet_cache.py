@@ -0,0 +1,202 @@
+"""
+Unit tests for the on-disk Parquet cache.
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from database import parquet_cache
+from database.parquet_cache import ParquetStore
+
+pytestmark = pytest.mark.skipif(parquet_cache.pa is None, reason="pyarrow is not installed")
+
+JAN = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class FakeBackend:
+    """Record table of one sensor with a reading on the 1st and 15th of each month."""
+
+    def __init__(self, months=6):
+        self.rows = {}
+        for month in range(months):
+            first = (JAN + timedelta(days=32 * month)).replace(day=1)
+            for day in (0, 14):
+                self.add(f"r{month}-{day}", first + timedelta(days=day), float(month))
+        self.range_calls = []
+        self.count_calls = []
+        # Set to a threading.Event to hold fetch_ranges for windows starting
+        # in gated_month (after reading the rows) until it is set
+        self.gate = None
+        self.gated_month = None
+        self.fetching = threading.Event()
+
+    def add(self, record_id, recorded_at, value, updated_at=JAN):
+        self.rows[record_id] = {"id": record_id, "sensor_id": "s", "recorded_at": recorded_at.isoformat(),
+                                "value": value, "updated_at": updated_at.isoformat()}
+
+    def _in(self, row, start, end):
+        moment = datetime.fromisoformat(row["recorded_at"])
+        return (start is None or moment >= start) and (end is None or moment <= end)
+
+    def fetch_ranges(self, windows):
+        self.range_calls.append(list(windows))
+        result = [sorted((dict(row) for row in self.rows.values() if self._in(row, start, end)),
+                         key=lambda row: row["recorded_at"])
+                  for _, start, end in windows]
+        if self.gate is not None and windows[0][1].strftime("%Y-%m") == self.gated_month:
+            self.fetching.set()
+            assert self.gate.wait(5)
+        return result
+
+    def fetch_changes(self, sensor_ids, since):
+        since = datetime.fromisoformat(since)
+        return [dict(row) for row in self.rows.values() if datetime.fromisoformat(row["updated_at"]) >= since]
+
+    def latest_update(self, sensor_ids):
+        return JAN.isoformat()
+
+    def fetch_monthly_counts(self, sensor_id, start, end):
+        self.count_calls.append((start, end))
+        counts = {}
+        for row in self.rows.values():
+            if self._in(row, start, end):
+                month = row["recorded_at"][:7]
+                counts[month] = counts.get(month, 0) + 1
+        return counts
+
+
+def _store(tmp_path, backend, **kwargs):
+    return ParquetStore(str(tmp_path), backend.fetch_ranges, backend.fetch_changes,
+                        backend.latest_update, backend.fetch_monthly_counts, **kwargs)
+
+
+class TestDownload:
+    """Months are downloaded one request each, only when a read needs them."""
+
+    def test_only_requested_months_are_downloaded(self, tmp_path):
+        backend = FakeBackend()
+        store = _store(tmp_path, backend)
+
+        [(times, ids, values)] = store.read_windows([("s", datetime(2026, 2, 10, tzinfo=timezone.utc),
+                                                      datetime(2026, 3, 10, tzinfo=timezone.utc))])
+
+        assert ids.tolist() == ["r1-14", "r2-0"]
+        assert times.dtype == np.int64 and values.dtype == np.float64
+        assert times.tolist() == [pd.Timestamp(backend.rows[i]["recorded_at"]).value for i in ids]
+        assert sorted(os.listdir(tmp_path / "s")) == ["2026-02.parquet", "2026-03.parquet"]
+        assert all(len(call) == 1 for call in backend.range_calls)
+
+    def test_cached_months_are_not_fetched_again(self, tmp_path):
+        backend = FakeBackend()
+        store = _store(tmp_path, backend)
+        window = ("s", JAN, datetime(2026, 2, 28, tzinfo=timezone.utc))
+        store.read_windows([window])
+        calls = len(backend.range_calls)
+
+        store.read_windows([window])
+
+        assert len(backend.range_calls) == calls
+
+    def test_open_start_resolves_to_first_month_with_records(self, tmp_path):
+        backend = FakeBackend(months=3)
+        store = _store(tmp_path, backend)
+
+        [(times, _, _)] = store.read_windows([("s", None, datetime(2026, 3, 31, tzinfo=timezone.utc))])
+
+        assert len(times) == 6
+        assert [call[0][1] for call in backend.range_calls] == [
+            datetime(2026, month, 1, tzinfo=timezone.utc) for month in (1, 2, 3)
+        ]
+
+
+class TestVerification:
+    """Only touched or overdue months are checked against the backend counts."""
+
+    def test_edit_verifies_only_the_touched_month(self, tmp_path):
+        backend = FakeBackend()
+        store = _store(tmp_path, backend)
+        window = ("s", JAN, datetime(2026, 6, 30, tzinfo=timezone.utc))
+        store.read_windows([window])
+        backend.range_calls.clear()
+        backend.count_calls.clear()
+
+        # Deleted by this process: March loses a row
+        deleted = backend.rows.pop("r2-14")
+        store.request_verification("s", [deleted["recorded_at"]])
+        [(_, ids, _)] = store.read_windows([window])
+
+        march = (datetime(2026, 3, 1, tzinfo=timezone.utc),
+                 datetime(2026, 3, 31, 23, 59, 59, 999999, tzinfo=timezone.utc))
+        assert backend.count_calls == [march]
+        assert backend.range_calls == [[("s", *march)]]
+        assert "r2-14" not in set(ids)
+
+    def test_matching_counts_keep_the_partition(self, tmp_path):
+        backend = FakeBackend()
+        store = _store(tmp_path, backend, verify_interval=0)
+        window = ("s", JAN, datetime(2026, 1, 31, tzinfo=timezone.utc))
+        store.read_windows([window])
+        backend.range_calls.clear()
+
+        store.read_windows([window])
+
+        assert len(backend.count_calls) == 1
+        assert backend.range_calls == []
+
+
+class TestConcurrency:
+    """Downloads run outside the store lock without losing concurrent changes."""
+
+    def test_cached_read_does_not_wait_for_a_download(self, tmp_path):
+        backend = FakeBackend()
+        store = _store(tmp_path, backend)
+        january = ("s", JAN, datetime(2026, 1, 31, tzinfo=timezone.utc))
+        store.read_windows([january])
+
+        backend.gate, backend.gated_month = threading.Event(), "2026-03"
+        loader = threading.Thread(target=store.read_windows, args=([
+            ("s", datetime(2026, 3, 1, tzinfo=timezone.utc), datetime(2026, 3, 31, tzinfo=timezone.utc))
+        ],))
+        loader.start()
+        assert backend.fetching.wait(5)
+
+        done = threading.Event()
+        reader = threading.Thread(target=lambda: (store.read_windows([january]), done.set()))
+        reader.start()
+        try:
+            assert done.wait(2), "cached read waited for another session's download"
+        finally:
+            backend.gate.set()
+            loader.join()
+            reader.join()
+
+    def test_change_during_download_is_applied_later(self, tmp_path):
+        backend = FakeBackend()
+        store = _store(tmp_path, backend)
+        january = ("s", JAN, datetime(2026, 1, 31, tzinfo=timezone.utc))
+        march = ("s", datetime(2026, 3, 1, tzinfo=timezone.utc), datetime(2026, 3, 31, tzinfo=timezone.utc))
+        store.read_windows([january])
+
+        backend.gate, backend.gated_month = threading.Event(), "2026-03"
+        loader = threading.Thread(target=store.read_windows, args=([march],))
+        loader.start()
+        assert backend.fetching.wait(5)
+
+        # Edited after the March download read its rows; the next sync moves
+        # the high-water mark past the edit while March is not cached yet
+        row = backend.rows["r2-0"]
+        backend.add("r2-0", datetime.fromisoformat(row["recorded_at"]), 99.0, updated_at=JAN + timedelta(hours=1))
+        # A later January edit puts the mark beyond the sync overlap
+        backend.add("r0-0", JAN, 0.5, updated_at=JAN + timedelta(hours=2))
+        store.read_windows([january])
+        backend.gate.set()
+        loader.join()
+
+        [(_, ids, values)] = store.read_windows([march])
+
+        assert dict(zip(ids, values))["r2-0"] == 99.0
@@ -0,0 +1,208 @@
+"""
+Unit tests for database.queries.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from database import async_queries, queries
+from database.backend import RejectedDataError
+from database.sqlite_backend import SQLiteBackend
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class FakeBackend:
+    """insert_records stand-in that rejects bad rows or fails in transport."""
+
+    def __init__(self, bad_values=(), outage=False):
+        self.bad_values = set(bad_values)
+        self.outage = outage
+        self.calls = 0
+        self.stored = []
+
+    def insert_records(self, payloads, returning=True, ignore_duplicates=False):
+        self.calls += 1
+        if self.outage:
+            raise ConnectionError("503 Service Unavailable")
+        if any(payload["value"] in self.bad_values for payload in payloads):
+            raise RejectedDataError("violates check constraint")
+        self.stored.extend(payloads)
+        return []
+
+
+def _chunk(values):
+    rows = [("sensor-a", START, value) for value in values]
+    return [(index, row, queries._serialize_record(*row)) for index, row in enumerate(rows)]
+
+
+class TestInsertChunk:
+    """Splitting on rejections, not on transport failures."""
+
+    def test_rejected_row_is_isolated(self):
+        backend = FakeBackend(bad_values={3.0})
+
+        failures = queries._insert_chunk(backend, _chunk([float(v) for v in range(8)]))
+
+        assert [(f["index"], f["retryable"]) for f in failures] == [(3, False)]
+        assert len(backend.stored) == 7
+
+    def test_transport_error_is_not_split(self):
+        backend = FakeBackend(outage=True)
+
+        failures = queries._insert_chunk(backend, _chunk([float(v) for v in range(8)]))
+
+        assert backend.calls == 1
+        assert [f["index"] for f in failures] == list(range(8))
+        assert all(f["retryable"] for f in failures)
+
+    def test_outage_during_split_marks_rest_retryable(self):
+        backend = FakeBackend(bad_values={0.0})
+        original = backend.insert_records
+
+        def insert_then_fail(payloads, **kwargs):
+            # The first (full) request is rejected, the link drops afterwards
+            if backend.calls >= 1:
+                backend.outage = True
+            return original(payloads, **kwargs)
+
+        backend.insert_records = insert_then_fail
+        failures = queries._insert_chunk(backend, _chunk([float(v) for v in range(8)]))
+
+        assert backend.calls == 2
+        assert [f["index"] for f in failures] == list(range(8))
+        assert all(f["retryable"] for f in failures)
+
+
+class TestPlanChartQuery:
+    """Coarsest rollup tier that keeps a bucket per pixel and ROLLUP_MIN_POINTS buckets."""
+
+    @pytest.mark.parametrize("span, tier", [
+        (timedelta(days=365), "1d"),
+        (timedelta(days=200), "1d"),
+        (timedelta(days=100), "1h"),
+        (timedelta(days=3), "1m"),
+        (timedelta(hours=2), None),
+    ])
+    def test_tier_for_span(self, span, tier):
+        assert queries.plan_chart_query(START, START + span, min_points=200) == tier
+
+    def test_min_points_threshold_is_inclusive(self):
+        assert queries.plan_chart_query(START, START + timedelta(days=200), min_points=200) == "1d"
+        assert queries.plan_chart_query(START, START + timedelta(days=199), min_points=200) == "1h"
+
+    @pytest.mark.parametrize("span, tier", [
+        (timedelta(days=365), "1h"),
+        (timedelta(days=50), "1h"),
+        (timedelta(days=49), "1m"),
+        (timedelta(hours=20), "1m"),
+        (timedelta(hours=19), None),
+    ])
+    def test_pixel_width_gets_a_bucket_per_pixel(self, span, tier):
+        assert queries.plan_chart_query(START, START + span, pixel_width=1200, min_points=200) == tier
+
+    def test_narrow_chart_falls_back_to_min_points(self):
+        assert queries.plan_chart_query(START, START + timedelta(days=365), pixel_width=100,
+                                        min_points=200) == "1d"
+
+
+@pytest.fixture
+def month_backend(monkeypatch, tmp_path):
+    store = SQLiteBackend(str(tmp_path / "months.db"))
+    sensor = store.insert_sensor({"name": "Temperature", "unit": "°C"})
+    # 3 readings in January, none in February, 2 in March (one on the last instant)
+    recorded = [START + timedelta(days=day) for day in (0, 10, 30)]
+    recorded += [datetime(2026, 3, 5, tzinfo=timezone.utc),
+                 datetime(2026, 3, 31, 23, 59, 59, tzinfo=timezone.utc)]
+    store.insert_records([
+        {"sensor_id": sensor["id"], "recorded_at": at, "value": 1.0} for at in recorded
+    ])
+    monkeypatch.setattr(queries, "get_backend", lambda: store)
+    monkeypatch.setattr(async_queries, "get_backend", lambda: store)
+    monkeypatch.setattr(queries, "_rollup_probe", {"available": False, "checked_at": None})
+    return store, sensor["id"]
+
+
+class TestMonthlyCounts:
+    """Month counts come from the rollups when installed, from count(*) otherwise."""
+
+    def test_fallback_matches_rollups(self, month_backend, monkeypatch):
+        _, sensor_id = month_backend
+        from_rollups = queries._fetch_monthly_counts(sensor_id, None, None)
+        monkeypatch.setattr(queries, "rollups_available", lambda: False)
+
+        assert queries._fetch_monthly_counts(sensor_id, None, None) == from_rollups
+        assert from_rollups == {"2026-01": 3, "2026-03": 2}
+
+    def test_bounded_range_clips_months(self, month_backend):
+        _, sensor_id = month_backend
+
+        counts = queries._count_months(sensor_id, START + timedelta(days=5),
+                                       datetime(2026, 3, 10, tzinfo=timezone.utc))
+
+        assert counts == {"2026-01": 2, "2026-03": 1}
+
+    def test_sensor_without_records(self, month_backend):
+        store, _ = month_backend
+        empty = store.insert_sensor({"name": "Humidity", "unit": "%"})
+
+        assert queries._count_months(empty["id"], None, None) == {}
+
+    def test_missing_rollups_are_probed_again(self, month_backend, monkeypatch):
+        store, _ = month_backend
+        probes = []
+        monkeypatch.setattr(store, "has_rollups", lambda: probes.append(1) or len(probes) > 1)
+
+        assert not queries.rollups_available()
+        assert not queries.rollups_available()
+        assert len(probes) == 1
+
+        queries._rollup_probe["checked_at"] -= queries.ROLLUP_PROBE_INTERVAL + 1
+        assert queries.rollups_available()
+        assert queries.rollups_available()
+        assert len(probes) == 2
+
+
+@pytest.fixture
+def page_backend(monkeypatch, tmp_path):
+    store = SQLiteBackend(str(tmp_path / "pages.db"))
+    sensor = store.insert_sensor({"name": "Temperature", "unit": "°C"})
+    # Pairs share a timestamp, so pages break ties by id
+    store.insert_records([
+        {"sensor_id": sensor["id"], "recorded_at": START + timedelta(minutes=index // 2), "value": float(index)}
+        for index in range(7)
+    ])
+    monkeypatch.setattr(queries, "get_backend", lambda: store)
+    return sensor["id"]
+
+
+def _key(record):
+    return (record["recorded_at"], record["id"])
+
+
+class TestRecordsPage:
+    """Keyset pages walk forwards, backwards and from the end without gaps."""
+
+    @pytest.mark.parametrize("descending", [False, True])
+    def test_pages_cover_every_row_once(self, page_backend, descending):
+        pages = [queries.get_records_page([page_backend], page_size=3, descending=descending)]
+        while len(pages[-1]) == 3:
+            pages.append(queries.get_records_page([page_backend], after=_key(pages[-1][-1]),
+                                                  page_size=3, descending=descending))
+        rows = [record for page in pages for record in page]
+
+        assert [len(page) for page in pages] == [3, 3, 1]
+        assert len({record["id"] for record in rows}) == 7
+        assert [_key(record) for record in rows] == sorted(map(_key, rows), reverse=descending)
+
+    @pytest.mark.parametrize("descending", [False, True])
+    def test_from_end_and_before_mirror_forward_pages(self, page_backend, descending):
+        forward = queries.get_records_page([page_backend], page_size=7, descending=descending)
+
+        last = queries.get_records_page([page_backend], from_end=True, page_size=3, descending=descending)
+        previous = queries.get_records_page([page_backend], before=_key(last[0]), page_size=3,
+                                            descending=descending)
+
+        assert last == forward[4:]
+        assert previous == forward[1:4]
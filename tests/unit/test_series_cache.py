@@ -0,0 +1,233 @@
+"""
+Unit tests for the per-sensor series cache.
+"""
+
+import threading
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from database.series_cache import SeriesCache
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class FakeStore:
+    """In-memory record table with updated_at stamps and optional fetch gates."""
+
+    def __init__(self):
+        self.rows = {}
+        self.clock = T0
+        self.range_calls = []
+        self.change_calls = []
+        # Set to a threading.Event to hold fetch_ranges until it is set
+        self.gate = None
+        self.fetching = threading.Event()
+
+    def stamp(self):
+        # Further apart than the sync overlap
+        self.clock += timedelta(minutes=1)
+        return self.clock.isoformat()
+
+    def put(self, record_id, sensor_id, minute, value):
+        self.rows[record_id] = {
+            "id": record_id, "sensor_id": sensor_id,
+            "recorded_at": (T0 + timedelta(minutes=minute)).isoformat(),
+            "value": value, "updated_at": self.stamp(),
+        }
+
+    def fetch_ranges(self, windows):
+        self.range_calls.append(list(windows))
+        result = []
+        for sensor_id, start, end in windows:
+            result.append(sorted(
+                (row for row in self.rows.values()
+                 if row["sensor_id"] == sensor_id
+                 and (start is None or datetime.fromisoformat(row["recorded_at"]) >= start)
+                 and (end is None or datetime.fromisoformat(row["recorded_at"]) <= end)),
+                key=lambda row: row["recorded_at"],
+            ))
+        # Rows are read before the gate, like a response still in transit
+        self.fetching.set()
+        if self.gate is not None:
+            assert self.gate.wait(5)
+        return result
+
+    def fetch_changes(self, sensor_ids, since):
+        self.change_calls.append((list(sensor_ids), since))
+        return [row for row in self.rows.values()
+                if row["sensor_id"] in sensor_ids and row["updated_at"] >= since]
+
+    def latest_update(self, sensor_ids):
+        stamps = [row["updated_at"] for row in self.rows.values() if row["sensor_id"] in sensor_ids]
+        return max(stamps) if stamps else None
+
+
+def _cache(store, **kwargs):
+    return SeriesCache(store.fetch_ranges, store.fetch_changes, store.latest_update, **kwargs)
+
+
+def _values(frame):
+    return frame["value"].tolist()
+
+
+class TestDeltaSync:
+    """Repeat reads reconcile edits with a delta query instead of reloading."""
+
+    def test_repeat_read_applies_inserts_and_edits(self):
+        store = FakeStore()
+        for minute in range(5):
+            store.put(f"a{minute}", "a", minute, float(minute))
+        cache = _cache(store)
+        end = T0 + timedelta(minutes=10)
+
+        assert _values(cache.get(["a"], T0, end)) == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+        store.put("a2", "a", 2, 20.0)
+        store.put("a5", "a", 5, 5.0)
+        assert _values(cache.get(["a"], T0, end)) == [0.0, 1.0, 20.0, 3.0, 4.0, 5.0]
+        assert len(store.range_calls) == 1
+        assert len(store.change_calls) == 1
+
+    def test_sync_of_one_sensor_does_not_advance_another(self):
+        store = FakeStore()
+        store.put("a0", "a", 0, 1.0)
+        store.put("b0", "b", 0, 1.0)
+        cache = _cache(store)
+        end = T0 + timedelta(minutes=10)
+        cache.get(["a"], T0, end)
+        cache.get(["b"], T0, end)
+
+        # Edit b, then a change of a (synced alone) moves a's mark past b's edit
+        store.put("b0", "b", 0, 2.0)
+        store.put("a0", "a", 0, 3.0)
+        cache.get(["a"], T0, end)
+
+        assert _values(cache.get(["b"], T0, end)) == [2.0]
+
+    def test_gap_is_fetched_once(self):
+        store = FakeStore()
+        for minute in range(10):
+            store.put(f"a{minute}", "a", minute, float(minute))
+        cache = _cache(store)
+        cache.get(["a"], T0 + timedelta(minutes=5), T0 + timedelta(minutes=9))
+
+        records = cache.get(["a"], T0, T0 + timedelta(minutes=9))
+
+        assert _values(records) == [float(minute) for minute in range(10)]
+        assert store.range_calls[-1] == [("a", T0, T0 + timedelta(minutes=5))]
+
+
+class TestLocking:
+    """Network fetches run outside the cache lock."""
+
+    def test_cache_hit_is_not_blocked_by_a_load(self):
+        store = FakeStore()
+        store.put("a0", "a", 0, 1.0)
+        store.put("b0", "b", 0, 2.0)
+        cache = _cache(store)
+        end = T0 + timedelta(minutes=10)
+        cache.get(["a"], T0, end)
+
+        store.gate = threading.Event()
+        store.fetching.clear()
+        loader = threading.Thread(target=cache.get, args=(["b"], T0, end))
+        loader.start()
+        assert store.fetching.wait(5)
+        try:
+            hit = {}
+            reader = threading.Thread(target=lambda: hit.update(a=cache.get(["a"], T0, end)))
+            reader.start()
+            reader.join(2)
+            assert not reader.is_alive()
+            assert _values(hit["a"]) == [1.0]
+        finally:
+            store.gate.set()
+            loader.join(5)
+
+    def test_stale_load_does_not_hide_a_concurrent_edit(self):
+        store = FakeStore()
+        for minute in range(10):
+            store.put(f"a{minute}", "a", minute, float(minute))
+        cache = _cache(store)
+        end = T0 + timedelta(minutes=9)
+        cache.get(["a"], T0 + timedelta(minutes=5), end)
+
+        store.gate = threading.Event()
+        store.fetching.clear()
+        loader = threading.Thread(target=cache.get, args=(["a"], T0, end))
+        loader.start()
+        assert store.fetching.wait(5)
+        # Edited and synced while the gap load (which read the old row) is in flight
+        store.put("a5", "a", 5, 50.0)
+        cache._sync(["a"])
+        store.put("a9", "a", 9, 90.0)
+        cache._sync(["a"])
+        store.gate.set()
+        loader.join(5)
+
+        assert _values(cache.get(["a"], T0, end))[5] == 50.0
+
+    def test_evicted_series_is_served_uncached(self):
+        store = FakeStore()
+        store.put("a0", "a", 0, 1.0)
+        cache = _cache(store)
+        end = T0 + timedelta(minutes=10)
+        # Every merge is undone before the coverage re-check
+        original = cache._load
+
+        def load_then_drop(windows, start, finish):
+            original(windows, start, finish)
+            cache.drop_sensor("a")
+
+        cache._load = load_then_drop
+
+        assert _values(cache.get(["a"], T0, end)) == [1.0]
+        assert cache.stats() == {"sensors": 0, "rows": 0}
+
+
+class TestColumns:
+    """Series are stored and returned as columns."""
+
+    def test_frame_is_grouped_by_sensor_in_request_order(self):
+        store = FakeStore()
+        store.put("a1", "a", 1, 1.0)
+        store.put("b0", "b", 0, 2.0)
+        store.put("a0", "a", 0, 0.0)
+        cache = _cache(store)
+
+        frame = cache.get(["b", "a"], T0, T0 + timedelta(minutes=10))
+
+        assert frame["sensor_id"].tolist() == ["b", "a", "a"]
+        assert frame["id"].tolist() == ["b0", "a0", "a1"]
+        assert str(frame["recorded_at"].dtype) == "datetime64[ns, UTC]"
+        assert frame["recorded_at"].iloc[2] == T0 + timedelta(minutes=1)
+
+    def test_moved_and_deleted_records_leave_their_series(self):
+        store = FakeStore()
+        store.put("a0", "a", 0, 0.0)
+        store.put("a1", "a", 1, 1.0)
+        store.put("b0", "b", 0, 2.0)
+        cache = _cache(store)
+        end = T0 + timedelta(minutes=10)
+        cache.get(["a", "b"], T0, end)
+
+        cache.apply_update({"id": "a1", "sensor_id": "b",
+                            "recorded_at": (T0 + timedelta(minutes=1)).isoformat(), "value": 5.0})
+        cache.discard("a0")
+
+        assert cache.stats() == {"sensors": 2, "rows": 2}
+        assert cache._series["a"].ids.tolist() == []
+        assert cache._series["b"].ids.tolist() == ["b0", "a1"]
+
+    def test_column_windows_merge_without_row_dicts(self):
+        # A record moved between months can be in two partitions for a moment
+        times = np.array([pd.Timestamp(T0 + timedelta(minutes=m)).value for m in (2, 0, 1)])
+        columns = (times, np.array(["a2", "a0", "a2"], dtype=object), np.array([2.0, 0.0, 1.0]))
+        cache = SeriesCache(lambda windows: [columns for _ in windows], lambda *_: [], lambda _: None)
+
+        frame = cache.get(["a"], T0, T0 + timedelta(minutes=10))
+
+        assert frame["id"].tolist() == ["a0", "a2"]
+        assert _values(frame) == [0.0, 1.0]
@@ -0,0 +1,147 @@
+"""
+Unit tests for the embedded SQLite storage backend.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from database.backend import RecordNotFoundError, RejectedDataError
+from database.sqlite_backend import SQLiteBackend
+
+T0 = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return SQLiteBackend(str(tmp_path / "sensors.db"))
+
+
+@pytest.fixture
+def sensor(backend):
+    return backend.insert_sensor({"name": "Temperature", "unit": "°C"})
+
+
+def _insert(backend, sensor_id, minutes, value=1.0):
+    return backend.insert_records([
+        {"sensor_id": sensor_id, "recorded_at": T0 + timedelta(minutes=minute), "value": value}
+        for minute in minutes
+    ])
+
+
+def _rollup(backend, tier, sensor_id):
+    return backend.fetch_rollup_page(tier, [sensor_id], T0 - timedelta(days=1), T0 + timedelta(days=1),
+                                     None, 100)
+
+
+class TestSensors:
+    """Sensor CRUD, with records removed by cascade."""
+
+    def test_create_update_delete(self, backend, sensor):
+        updated = backend.update_sensor(sensor["id"], {"comment": "north wall"})
+        _insert(backend, sensor["id"], [0])
+
+        backend.delete_sensor(sensor["id"])
+
+        assert updated["comment"] == "north wall"
+        assert backend.get_sensor(sensor["id"]) is None
+        assert backend.count_records(None, None, None) == 0
+
+
+class TestRecords:
+    """Record writes store UTC text and keep the rollups current."""
+
+    def test_timestamps_are_stored_as_utc(self, backend, sensor):
+        local = datetime(2026, 1, 1, 13, 0, tzinfo=timezone(timedelta(hours=1)))
+        [record] = backend.insert_records([{"sensor_id": sensor["id"], "recorded_at": local, "value": 2.0}])
+
+        assert backend.get_record(record["id"])["recorded_at"] == "2026-01-01T12:00:00.000000+00:00"
+
+    def test_duplicate_ids_are_rejected_or_ignored(self, backend, sensor):
+        [record] = _insert(backend, sensor["id"], [0])
+        duplicate = {**record, "value": 5.0}
+
+        with pytest.raises(RejectedDataError):
+            backend.insert_records([duplicate])
+        backend.insert_records([duplicate], ignore_duplicates=True)
+
+        assert backend.get_record(record["id"])["value"] == 1.0
+
+    def test_update_moves_the_record_between_buckets(self, backend, sensor):
+        [record] = _insert(backend, sensor["id"], [0], value=3.0)
+
+        updated = backend.update_record(record["id"], {"recorded_at": T0 + timedelta(minutes=5), "value": 4.0})
+
+        assert updated["value"] == 4.0
+        assert [(row["bucket_start"], row["sum_value"]) for row in _rollup(backend, "1m", sensor["id"])] == [
+            ((T0 + timedelta(minutes=5)).isoformat(timespec="microseconds"), 4.0)
+        ]
+
+    def test_update_of_a_missing_record_raises(self, backend, sensor):
+        with pytest.raises(RecordNotFoundError):
+            backend.update_record("no-such-record", {"value": 1.0})
+        with pytest.raises(RecordNotFoundError):
+            backend.update_record("no-such-record", {})
+
+    def test_delete_empties_the_rollups(self, backend, sensor):
+        [record] = _insert(backend, sensor["id"], [0])
+
+        backend.delete_record(record["id"])
+
+        assert backend.get_record(record["id"]) is None
+        assert _rollup(backend, "1d", sensor["id"]) == []
+
+
+class TestReads:
+    """Counts, change feeds, stats and rollup tiers agree with the raw rows."""
+
+    def test_count_with_date_filter(self, backend, sensor):
+        _insert(backend, sensor["id"], range(10))
+
+        assert backend.count_records([sensor["id"]], T0 + timedelta(minutes=2), T0 + timedelta(minutes=5)) == 4
+        assert backend.count_records(None, None, None) == 10
+
+    def test_changes_since_a_mark(self, backend, sensor):
+        [first, second] = _insert(backend, sensor["id"], [0, 1])
+        mark = backend.latest_update([sensor["id"]])
+        edited = backend.update_record(first["id"], {"value": 9.0})
+
+        changes = backend.fetch_changes_page([sensor["id"]], edited["updated_at"], None, 10)
+
+        assert [row["id"] for row in changes] == [first["id"]]
+        assert mark < backend.latest_update([sensor["id"]])
+        assert second["id"] not in {row["id"] for row in changes}
+
+    def test_stats(self, backend, sensor):
+        backend.insert_records([
+            {"sensor_id": sensor["id"], "recorded_at": T0 + timedelta(minutes=minute), "value": value}
+            for minute, value in enumerate([2.0, 4.0, 6.0])
+        ])
+
+        [stats] = backend.fetch_record_stats([sensor["id"]], None, None)
+
+        assert (stats["sample_count"], stats["min_value"], stats["max_value"]) == (3, 2.0, 6.0)
+        assert stats["avg_value"] == pytest.approx(4.0)
+        assert stats["stddev_value"] == pytest.approx(2.0)
+        assert (stats["first_value"], stats["last_value"]) == (2.0, 6.0)
+
+    def test_rollup_tiers_sum_the_raw_rows(self, backend, sensor):
+        _insert(backend, sensor["id"], range(0, 120, 10), value=1.5)
+
+        hours = _rollup(backend, "1h", sensor["id"])
+        [day] = _rollup(backend, "1d", sensor["id"])
+
+        assert [row["sample_count"] for row in hours] == [6, 6]
+        assert len(_rollup(backend, "1m", sensor["id"])) == 12
+        assert (day["sample_count"], day["sum_value"]) == (12, 18.0)
+
+    def test_rollup_pages_continue_after_the_key(self, backend, sensor):
+        _insert(backend, sensor["id"], range(5))
+
+        first = backend.fetch_rollup_page("1m", [sensor["id"]], T0, T0 + timedelta(hours=1), None, 3)
+        last = first[-1]
+        rest = backend.fetch_rollup_page("1m", [sensor["id"]], T0, T0 + timedelta(hours=1),
+                                         (last["sensor_id"], last["bucket_start"]), 3)
+
+        assert [len(first), len(rest)] == [3, 2]
+        assert rest[0]["bucket_start"] > last["bucket_start"]
@@ -0,0 +1,325 @@
+"""
+Bulk import utilities for logger dumps (CSV or Excel).
+
+Files are read in fixed-size row chunks so memory stays flat regardless of
+file size. Each chunk is a wide table: one timestamp column in local time
+plus one column per sensor, matched to sensors by name.
+
+Timestamps are parsed with one declared format for the whole file (ISO
+8601 unless the user picks another), never guessed per file: "03/04/2026"
+means different days in different locales, so cells that do not match the
+format are reported as rejected instead.
+"""
+
+import csv
+import io
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+import pandas as pd
+from utils.timezone import DEFAULT_TIMEZONE, local_series_to_utc
+from utils.validation import validate_numeric_column, validate_timestamp_column
+
+
+# Rows read from the file per chunk
+IMPORT_CHUNK_ROWS = 5000
+
+# Rejected cells kept for the import report; the rest are only counted
+IMPORT_REPORT_MAX_ROWS = 10000
+
+# Header names tried, in order, when guessing the timestamp column
+TIMESTAMP_COLUMN_HINTS = ["timestamp", "recorded_at", "datetime", "date_time", "time", "date"]
+
+# Timestamp formats offered for import (pandas format -> label); "ISO8601"
+# accepts any ISO 8601 layout, the others are strict strptime patterns
+TIMESTAMP_FORMATS = {
+    "ISO8601": "ISO 8601 (2026-03-14 13:45:00)",
+    "%d.%m.%Y %H:%M:%S": "DD.MM.YYYY HH:MM:SS",
+    "%d.%m.%Y %H:%M": "DD.MM.YYYY HH:MM",
+    "%d/%m/%Y %H:%M:%S": "DD/MM/YYYY HH:MM:SS",
+    "%d/%m/%Y %H:%M": "DD/MM/YYYY HH:MM",
+    "%m/%d/%Y %H:%M:%S": "MM/DD/YYYY HH:MM:SS",
+    "%m/%d/%Y %H:%M": "MM/DD/YYYY HH:MM",
+}
+
+DEFAULT_TIMESTAMP_FORMAT = "ISO8601"
+
+# Trailing UTC offset of an ISO 8601 timestamp
+_UTC_OFFSET_PATTERN = r"(?:Z|[+-]\d{2}:?\d{2})$"
+
+
+def is_excel_file(file_name: str) -> bool:
+    """Check whether an uploaded file is an Excel workbook."""
+    return file_name.lower().endswith((".xlsx", ".xlsm"))
+
+
+def read_import_header(file: BinaryIO, file_name: str) -> List[str]:
+    """
+    Read only the header row of an uploaded file.
+
+    Args:
+        file: Uploaded file object (rewound afterwards)
+        file_name: Original file name, used to detect the format
+
+    Returns:
+        List of column names
+    """
+    try:
+        if is_excel_file(file_name):
+            from openpyxl import load_workbook
+
+            workbook = load_workbook(file, read_only=True, data_only=True)
+            try:
+                header = next(workbook.active.iter_rows(max_row=1, values_only=True), ())
+            finally:
+                workbook.close()
+            return [str(cell).strip() for cell in header if cell is not None]
+
+        text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+        try:
+            header = next(csv.reader(text), [])
+        finally:
+            text.detach()
+        return [cell.strip() for cell in header]
+    finally:
+        file.seek(0)
+
+
+def iter_import_chunks(file: BinaryIO, file_name: str,
+                       chunk_rows: int = IMPORT_CHUNK_ROWS) -> Iterator[Tuple[pd.DataFrame, float]]:
+    """
+    Stream an uploaded file as DataFrame chunks.
+
+    Args:
+        file: Uploaded file object
+        file_name: Original file name, used to detect the format
+        chunk_rows: Rows per chunk (default: IMPORT_CHUNK_ROWS)
+
+    Yields:
+        Tuples of (chunk, progress) where progress is the fraction of the
+        file read so far (0.0 - 1.0). Chunk indexes are 0-based data row
+        numbers, counted across the whole file.
+    """
+    file.seek(0)
+
+    if is_excel_file(file_name):
+        yield from _iter_excel_chunks(file, chunk_rows)
+        return
+
+    file_size = max(getattr(file, "size", 0) or len(file.getbuffer()), 1)
+    reader = pd.read_csv(
+        file,
+        chunksize=chunk_rows,
+        dtype=str,
+        keep_default_na=False,
+        skipinitialspace=True,
+        encoding="utf-8-sig",
+    )
+    with reader:
+        for chunk in reader:
+            chunk.columns = [str(column).strip() for column in chunk.columns]
+            yield chunk, min(file.tell() / file_size, 1.0)
+
+
+def _iter_excel_chunks(file: BinaryIO, chunk_rows: int) -> Iterator[Tuple[pd.DataFrame, float]]:
+    """Stream the active sheet of a workbook in read-only mode."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        rows = sheet.iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else "" for cell in next(rows, ())]
+        total_rows = max((sheet.max_row or 1) - 1, 1)
+
+        buffer = []
+        row_start = 0
+        for row in rows:
+            buffer.append(row[:len(header)])
+            if len(buffer) == chunk_rows:
+                index = pd.RangeIndex(row_start, row_start + len(buffer))
+                yield pd.DataFrame(buffer, columns=header, index=index), min((row_start + len(buffer)) / total_rows, 1.0)
+                row_start += len(buffer)
+                buffer = []
+
+        if buffer:
+            index = pd.RangeIndex(row_start, row_start + len(buffer))
+            yield pd.DataFrame(buffer, columns=header, index=index), 1.0
+    finally:
+        workbook.close()
+
+
+def guess_timestamp_column(columns: List[str]) -> Optional[str]:
+    """Pick the most likely timestamp column from a header row."""
+    lowered = {column.lower(): column for column in columns}
+    for hint in TIMESTAMP_COLUMN_HINTS:
+        if hint in lowered:
+            return lowered[hint]
+    return columns[0] if columns else None
+
+
+def match_sensor_columns(columns: List[str], sensors: List[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Map file columns to sensors by name.
+
+    A column matches a sensor when its header equals the sensor name, or the
+    name followed by the unit in parentheses, ignoring case and spacing.
+
+    Args:
+        columns: Column names from the file header
+        sensors: Sensor dictionaries with keys: id, name, unit
+
+    Returns:
+        Dictionary mapping column name to sensor ID
+    """
+    def normalize(text: str) -> str:
+        return " ".join(text.lower().split())
+
+    lookup = {}
+    for sensor in sensors:
+        lookup[normalize(sensor['name'])] = sensor['id']
+        if sensor['unit']:
+            lookup[normalize(f"{sensor['name']} ({sensor['unit']})")] = sensor['id']
+
+    return {
+        column: lookup[normalize(column)]
+        for column in columns
+        if normalize(column) in lookup
+    }
+
+
+def parse_timestamp_column(raw_timestamps: pd.Series,
+                           timestamp_format: str = DEFAULT_TIMESTAMP_FORMAT) -> Tuple[pd.Series, pd.Series]:
+    """
+    Parse a column of local-time timestamps with one declared format.
+
+    Cells with a UTC offset (ISO 8601) are converted to local wall time;
+    cells without one are taken as local wall time.
+
+    Args:
+        raw_timestamps: Cells of the timestamp column (strings, or datetimes
+            from Excel)
+        timestamp_format: Key of TIMESTAMP_FORMATS (or any pandas format)
+
+    Returns:
+        Tuple of (timestamps, errors)
+        - timestamps: naive datetime64 in local wall time, NaT where a cell
+          was rejected
+        - errors: error message per cell, None where it parsed
+    """
+    errors = pd.Series([None] * len(raw_timestamps), index=raw_timestamps.index, dtype=object)
+    text = raw_timestamps.astype("string").str.strip()
+    missing = raw_timestamps.isna() | (text == "")
+
+    # Cells with an explicit offset are exact instants and converted to
+    # local wall time; cells without one are local wall time already
+    with_offset = text.str.contains(_UTC_OFFSET_PATTERN, regex=True).fillna(False).astype(bool)
+    timestamps = pd.Series(pd.NaT, index=raw_timestamps.index, dtype="datetime64[ns]")
+    if with_offset.any():
+        instants = pd.to_datetime(raw_timestamps[with_offset], errors="coerce", format=timestamp_format, utc=True)
+        timestamps[with_offset] = instants.dt.tz_convert(DEFAULT_TIMEZONE).dt.tz_localize(None)
+    if (~with_offset).any():
+        timestamps[~with_offset] = pd.to_datetime(
+            raw_timestamps[~with_offset], errors="coerce", format=timestamp_format
+        )
+
+    label = TIMESTAMP_FORMATS.get(timestamp_format, timestamp_format)
+    errors[timestamps.isna() & ~missing] = f"Does not match the timestamp format {label}"
+    errors[missing] = "Missing timestamp"
+    return timestamps, errors
+
+
+def prepare_import_chunk(chunk: pd.DataFrame, timestamp_column: str,
+                         column_map: Dict[str, str],
+                         timestamp_format: str = DEFAULT_TIMESTAMP_FORMAT
+                         ) -> Tuple[List[Tuple], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Validate one chunk column-wise and turn it into insertable readings.
+
+    Empty sensor cells are skipped (loggers leave gaps), everything else
+    that fails validation is rejected, including timestamps that do not
+    match timestamp_format.
+
+    Args:
+        chunk: Wide DataFrame chunk from iter_import_chunks
+        timestamp_column: Name of the local-time timestamp column
+        column_map: Mapping of column name to sensor ID
+        timestamp_format: Key of TIMESTAMP_FORMATS (default: ISO 8601)
+
+    Returns:
+        Tuple of (records, origins, rejections)
+        - records: (sensor_id, recorded_at_utc, value) tuples
+        - origins: {"row", "column"} for each record, in the same order
+        - rejections: {"row", "column", "value", "error"} for rejected cells
+        Row numbers are 1-based data rows (the header is not counted).
+    """
+    records = []
+    origins = []
+    rejections = []
+
+    # Timestamps: parse, validate and convert the whole column at once
+    raw_timestamps = chunk[timestamp_column]
+    timestamps_local, parse_errors = parse_timestamp_column(raw_timestamps, timestamp_format)
+    timestamp_errors = parse_errors.combine_first(validate_timestamp_column(timestamps_local))
+    timestamps_utc = local_series_to_utc(timestamps_local)
+
+    bad_timestamps = timestamp_errors.notna()
+    for row_index in chunk.index[bad_timestamps]:
+        rejections.append({
+            "row": row_index + 1,
+            "column": timestamp_column,
+            "value": raw_timestamps[row_index],
+            "error": timestamp_errors[row_index],
+        })
+
+    for column, sensor_id in column_map.items():
+        cells = chunk.loc[~bad_timestamps, column]
+        cells = cells[cells.notna() & (cells.astype("string").str.strip() != "")]
+        if cells.empty:
+            continue
+
+        values, errors = validate_numeric_column(cells)
+        invalid = errors.notna()
+
+        for row_index in cells.index[invalid]:
+            rejections.append({
+                "row": row_index + 1,
+                "column": column,
+                "value": cells[row_index],
+                "error": errors[row_index],
+            })
+
+        valid_index = cells.index[~invalid]
+        records.extend(zip(
+            [sensor_id] * len(valid_index),
+            timestamps_utc[valid_index],
+            values[valid_index].tolist(),
+        ))
+        origins.extend({"row": row_index + 1, "column": column} for row_index in valid_index)
+
+    return records, origins, rejections
+
+
+class RejectionReport:
+    """Rejected cells of one import: all are counted, the first max_rows are kept."""
+
+    def __init__(self, max_rows: int = IMPORT_REPORT_MAX_ROWS):
+        self.max_rows = max_rows
+        self.rows: List[Dict[str, Any]] = []
+        self.total = 0
+
+    def add(self, rejections: Iterable[Dict[str, Any]]) -> None:
+        """Count rejections ({"row", "column", "value", "error"}) and keep them while there is room."""
+        for rejection in rejections:
+            self.total += 1
+            if len(self.rows) < self.max_rows:
+                self.rows.append(rejection)
+
+    @property
+    def truncated(self) -> bool:
+        """True if some rejections were counted but not kept."""
+        return self.total > len(self.rows)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Kept rejections as a report table (Row, Column, Value, Reason)."""
+        report_df = pd.DataFrame(self.rows, columns=["row", "column", "value", "error"])
+        report_df.columns = ["Row", "Column", "Value", "Reason"]
+        return report_df
@@ -0,0 +1,113 @@
+"""
+Visual downsampling of time series for plotting.
+
+Largest-Triangle-Three-Buckets (LTTB) keeps the points that shape a line as
+drawn: the series is cut into equal-count buckets and from each bucket the
+point forming the largest triangle with the previously kept point and the
+average of the next bucket is kept. The per-bucket work is vectorized; only
+the walk over buckets (one iteration per output point) runs in Python.
+
+MinMaxLTTB first keeps the minimum and maximum of many small buckets and
+runs LTTB on those candidates only. It is much faster on large inputs and
+never drops a spike, because every local extreme is a candidate.
+"""
+
+import numpy as np
+
+# Candidate points per output point in minmax_lttb (min and max of ratio/2 buckets)
+MINMAX_RATIO = 4
+
+
+def _as_float(values: np.ndarray) -> np.ndarray:
+    """Numeric view of x values (datetime64 as nanoseconds from the first point)."""
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        values = values.astype('datetime64[ns]').astype(np.int64)
+        return (values - values[0]).astype(np.float64)
+    return values.astype(np.float64)
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Select n_out points with Largest-Triangle-Three-Buckets.
+
+    Args:
+        x: Sorted x values (numbers or datetime64)
+        y: Values
+        n_out: Number of points to keep (first and last always included)
+
+    Returns:
+        Sorted indices of the kept points
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    xf = _as_float(x)
+    yf = np.asarray(y, dtype=np.float64)
+
+    # n_out - 2 equal-count buckets over the interior points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    counts = np.diff(edges)
+
+    # Bucket averages do not depend on the selection: compute them up front.
+    # The "next bucket" of the last interior bucket is the final point.
+    avg_x = np.append(np.add.reduceat(xf, edges[:-1]) / counts, xf[-1])
+    avg_y = np.append(np.add.reduceat(yf, edges[:-1]) / counts, yf[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    anchor = 0
+    for bucket in range(n_out - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        ax, ay = xf[anchor], yf[anchor]
+        # Twice the triangle area, sign dropped
+        area = np.abs(
+            (ax - avg_x[bucket + 1]) * (yf[lo:hi] - ay)
+            - (ax - xf[lo:hi]) * (avg_y[bucket + 1] - ay)
+        )
+        anchor = lo + int(np.argmax(area))
+        selected[bucket + 1] = anchor
+
+    return selected
+
+
+def _minmax_indices(y: np.ndarray, n_buckets: int) -> np.ndarray:
+    """Indices of the minimum and maximum of n_buckets equal-count buckets of y."""
+    size = -(-len(y) // n_buckets)
+    rows = -(-len(y) // size)
+    padding = rows * size - len(y)
+
+    grid_max = np.concatenate((y, np.full(padding, -np.inf))).reshape(rows, size)
+    grid_min = np.concatenate((y, np.full(padding, np.inf))).reshape(rows, size)
+    offsets = np.arange(rows) * size
+
+    return np.concatenate((offsets + grid_min.argmin(axis=1), offsets + grid_max.argmax(axis=1)))
+
+
+def minmax_lttb(x: np.ndarray, y: np.ndarray, n_out: int, ratio: int = MINMAX_RATIO) -> np.ndarray:
+    """
+    Select n_out points with MinMaxLTTB (spike-preserving LTTB).
+
+    Args:
+        x: Sorted x values (numbers or datetime64)
+        y: Values
+        n_out: Number of points to keep (first and last always included)
+        ratio: Candidates per output point
+
+    Returns:
+        Sorted indices of the kept points
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    if n <= n_out * ratio:
+        return lttb(x, y, n_out)
+
+    yf = np.asarray(y, dtype=np.float64)
+    interior = _minmax_indices(yf[1:-1], n_out * ratio // 2) + 1
+    candidates = np.unique(np.concatenate(([0], interior, [n - 1])))
+
+    return candidates[lttb(np.asarray(x)[candidates], yf[candidates], n_out)]
@@ -0,0 +1,265 @@
+"""
+Streaming export of record frames to CSV, gzip CSV, Parquet or Arrow IPC.
+
+Exports consume an iterator of DataFrame chunks (one keyset page each) and
+produce the file as a stream of byte chunks, so memory use stays at one
+page no matter how many rows are exported, and the first bytes are ready
+as soon as the first page arrives.
+
+Export links let the ingestion service (ingest_service.py) stream a file
+straight to the browser: the app signs the export parameters with a secret
+shared with the service, and the service checks the signature and expiry
+before streaming.
+"""
+
+import io
+import hmac
+import json
+import time
+import zlib
+import base64
+import hashlib
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow ships with streamlit
+    pa = None
+    pq = None
+
+from utils.frames import SensorLookup, records_to_frame
+from utils.timezone import DEFAULT_TIMEZONE
+
+# Columns of an export chunk, in file order
+EXPORT_COLUMNS = ['Sensor', 'Unit', 'Timestamp', 'Value']
+
+# Format key -> (label, file extension, MIME type)
+EXPORT_FORMATS: Dict[str, tuple] = {
+    'csv': ("CSV", ".csv", "text/csv"),
+    'csv.gz': ("CSV (gzip)", ".csv.gz", "application/gzip"),
+    'parquet': ("Parquet", ".parquet", "application/vnd.apache.parquet"),
+    'arrow': ("Arrow IPC", ".arrow", "application/vnd.apache.arrow.file"),
+}
+
+
+def to_export_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Select and rename record columns (timestamps stay typed) for export."""
+    export_df = df[['sensor_name', 'sensor_unit', 'recorded_at', 'value']].copy()
+    export_df.columns = EXPORT_COLUMNS
+    return export_df
+
+
+def export_frames(chunks: Iterable[List[Dict[str, Any]]], lookup: SensorLookup) -> Iterator[pd.DataFrame]:
+    """
+    Convert record pages into export frames, one page at a time.
+
+    Args:
+        chunks: Record dictionary pages, e.g. from queries.iter_records
+        lookup: Sensor metadata lookup (see utils.frames.records_to_frame)
+
+    Yields:
+        Frames with columns Sensor, Unit, Timestamp and Value
+    """
+    for chunk in chunks:
+        yield to_export_frame(records_to_frame(chunk, lookup))
+
+
+def export_filename(fmt: str) -> str:
+    """Download file name for an export in the given format."""
+    return f"biogas_sensor_data_{datetime.now().strftime('%Y%m%d')}{EXPORT_FORMATS[fmt][1]}"
+
+
+def _arrow_schema():
+    """Typed schema shared by the Parquet and Arrow exports."""
+    return pa.schema([
+        ('Sensor', pa.string()),
+        ('Unit', pa.string()),
+        ('Timestamp', pa.timestamp('us', tz=str(DEFAULT_TIMEZONE))),
+        ('Value', pa.float64()),
+    ])
+
+
+def _iter_csv(frames: Iterable[pd.DataFrame]) -> Iterator[bytes]:
+    """Encode chunks as CSV with one header line, timestamps formatted for display."""
+    header = True
+    for frame in frames:
+        frame = frame[EXPORT_COLUMNS].copy()
+        frame['Timestamp'] = frame['Timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S')
+        yield frame.to_csv(index=False, header=header).encode('utf-8')
+        header = False
+
+    if header:
+        # No rows matched, still emit the column header
+        yield pd.DataFrame(columns=EXPORT_COLUMNS).to_csv(index=False).encode('utf-8')
+
+
+def _iter_gzip(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Gzip-compress a byte stream incrementally."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def _iter_arrow(frames: Iterable[pd.DataFrame],
+                open_writer: Callable[[io.BytesIO, "pa.Schema"], object]) -> Iterator[bytes]:
+    """
+    Write chunks with an Arrow writer, yielding the bytes written for each chunk.
+
+    Args:
+        open_writer: Creates the writer (Parquet or IPC file) on a sink and schema
+    """
+    schema = _arrow_schema()
+    sink = io.BytesIO()
+    writer = open_writer(sink, schema)
+
+    def drain() -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    try:
+        for frame in frames:
+            table = pa.Table.from_pandas(frame[EXPORT_COLUMNS], schema=schema, preserve_index=False)
+            writer.write_table(table)
+            data = drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield drain()
+
+
+def iter_export(frames: Iterable[pd.DataFrame], fmt: str = 'csv') -> Iterator[bytes]:
+    """
+    Stream record chunks as an export file.
+
+    Args:
+        frames: DataFrames with columns Sensor, Unit, Timestamp (tz-aware local
+            datetime) and Value, one per page
+        fmt: Key of EXPORT_FORMATS
+
+    Yields:
+        Byte chunks of the file, in order
+
+    Raises:
+        ValueError: If the format is unknown or needs pyarrow and it is missing
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'")
+    if fmt in ('parquet', 'arrow') and pa is None:
+        raise ValueError(f"{EXPORT_FORMATS[fmt][0]} export requires pyarrow")
+
+    if fmt == 'csv':
+        return _iter_csv(frames)
+    if fmt == 'csv.gz':
+        return _iter_gzip(_iter_csv(frames))
+    if fmt == 'parquet':
+        return _iter_arrow(frames, lambda sink, schema: pq.ParquetWriter(sink, schema, compression='zstd'))
+    return _iter_arrow(frames, lambda sink, schema: pa.ipc.new_file(sink, schema))
+
+
+def write_export(frames: Iterable[pd.DataFrame], path: str, fmt: str = 'csv',
+                 on_chunk: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Stream record chunks into an export file on disk.
+
+    Args:
+        frames: Record chunks (see iter_export)
+        path: Output file path
+        fmt: Key of EXPORT_FORMATS
+        on_chunk: Called with the number of bytes written so far after each chunk
+
+    Returns:
+        Size of the written file in bytes
+    """
+    written = 0
+    with open(path, 'wb') as f:
+        for data in iter_export(frames, fmt):
+            f.write(data)
+            written += len(data)
+            if on_chunk:
+                on_chunk(written)
+    return written
+
+
+# ============================================================================
+# EXPORT LINKS
+# ============================================================================
+
+def _signature(payload: bytes, secret: str) -> str:
+    return hmac.new(secret.encode('utf-8'), payload, hashlib.sha256).hexdigest()
+
+
+def sign_export_link(sensor_ids: Optional[List[str]], start_date: Optional[datetime],
+                     end_date: Optional[datetime], newest_first: bool, fmt: str,
+                     secret: str, ttl_seconds: int) -> str:
+    """
+    Build a signed, expiring token describing one export.
+
+    Args:
+        sensor_ids: Sensor IDs to export (None for all sensors)
+        start_date: Start of date range (optional)
+        end_date: End of date range (optional)
+        newest_first: Export newest records first
+        fmt: Key of EXPORT_FORMATS
+        secret: Secret shared with the service that streams the export
+        ttl_seconds: Seconds the token stays valid
+
+    Returns:
+        URL-safe token for the service's /export?token= endpoint
+    """
+    payload = json.dumps({
+        'sensor_ids': list(sensor_ids) if sensor_ids else None,
+        'start': start_date.isoformat() if start_date else None,
+        'end': end_date.isoformat() if end_date else None,
+        'newest_first': newest_first,
+        'format': fmt,
+        'expires': int(time.time()) + ttl_seconds,
+    }, separators=(',', ':')).encode('utf-8')
+    return f"{base64.urlsafe_b64encode(payload).decode('ascii')}.{_signature(payload, secret)}"
+
+
+def verify_export_link(token: str, secret: str) -> Dict[str, Any]:
+    """
+    Check an export token and decode its parameters.
+
+    Args:
+        token: Token from sign_export_link
+        secret: Shared secret
+
+    Returns:
+        Dictionary with keys sensor_ids, start_date, end_date (datetimes or
+        None), newest_first and format
+
+    Raises:
+        ValueError: If the token is malformed, forged or expired
+    """
+    encoded, _, signature = token.partition('.')
+    try:
+        payload = base64.urlsafe_b64decode(encoded.encode('ascii'))
+    except ValueError as e:
+        raise ValueError("Malformed export link") from e
+    if not signature or not hmac.compare_digest(signature, _signature(payload, secret)):
+        raise ValueError("Invalid export link")
+
+    request = json.loads(payload)
+    if request['expires'] < time.time():
+        raise ValueError("Export link has expired")
+    if request['format'] not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{request['format']}'")
+
+    return {
+        'sensor_ids': request['sensor_ids'],
+        'start_date': datetime.fromisoformat(request['start']) if request['start'] else None,
+        'end_date': datetime.fromisoformat(request['end']) if request['end'] else None,
+        'newest_first': request['newest_first'],
+        'format': request['format'],
+    }
@@ -9,6 +9,8 @@ User input is converted from local timezone to UTC before storage.
 from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
 from typing import Optional
+import numpy as np
+import pandas as pd
 
 
 # Default timezone for the application (Europe/Kiev for Ukraine)
@@ -45,6 +47,45 @@ def local_to_utc(dt: datetime) -> datetime:
     return dt_utc
 
 
+def local_series_to_utc(timestamps: pd.Series) -> pd.Series:
+    """
+    Convert a column of naive local datetimes to UTC in one vectorized step.
+
+    Resolves DST edge cases the same way as local_to_utc: ambiguous times
+    take the first (summer time) occurrence and times skipped by the
+    spring-forward gap are read with the pre-transition offset.
+
+    Args:
+        timestamps: Series of naive datetime64 values in local timezone
+
+    Returns:
+        Series of timezone-aware datetimes in UTC
+    """
+    return (
+        timestamps.dt.tz_localize(
+            DEFAULT_TIMEZONE,
+            ambiguous=np.ones(len(timestamps), dtype=bool),
+            nonexistent=pd.Timedelta(hours=1),
+        )
+        .dt.tz_convert(timezone.utc)
+    )
+
+
+def utc_series_to_local(timestamps: pd.Series) -> pd.Series:
+    """
+    Convert a column of UTC datetimes to local timezone in one vectorized step.
+
+    Args:
+        timestamps: Series of timezone-aware (or naive, taken as UTC) datetime64 values
+
+    Returns:
+        Series of timezone-aware datetimes in local timezone
+    """
+    if timestamps.dt.tz is None:
+        timestamps = timestamps.dt.tz_localize(timezone.utc)
+    return timestamps.dt.tz_convert(DEFAULT_TIMEZONE)
+
+
 def utc_to_local(dt: datetime) -> datetime:
     """
     Convert a UTC datetime to local timezone.
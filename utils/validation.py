@@ -5,6 +5,7 @@ Validation utilities for user inputs.
 from datetime import datetime, timezone as tz
 from typing import Tuple, Optional
 import re
+import pandas as pd
 from utils.timezone import utc_to_local
 
 
@@ -60,6 +61,50 @@ def validate_timestamp(timestamp: datetime) -> Tuple[bool, Optional[str]]:
     return True, None
 
 
+def validate_numeric_column(values: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """
+    Validate a whole column of values, like validate_numeric_value per cell.
+
+    Args:
+        values: Series of strings or numbers to validate
+
+    Returns:
+        Tuple of (numbers, errors)
+        - numbers: Float series, NaN where a cell is invalid
+        - errors: Series of error messages, None where a cell is valid
+    """
+    text = values.astype("string").str.strip()
+    numbers = pd.to_numeric(text, errors="coerce").astype(float)
+    errors = pd.Series([None] * len(values), index=values.index, dtype=object)
+
+    empty = text.isna() | (text == "")
+    invalid = ~empty & numbers.isna()
+    errors[empty] = "Value cannot be empty"
+    errors[invalid] = "'" + text[invalid] + "' is not a valid number"
+
+    return numbers, errors
+
+
+def validate_timestamp_column(timestamps: pd.Series) -> pd.Series:
+    """
+    Validate a whole column of timestamps, like validate_timestamp per cell.
+
+    Args:
+        timestamps: Series of naive datetime64 values in local timezone
+            (NaT for cells that could not be parsed)
+
+    Returns:
+        Series of error messages, None where a timestamp is valid
+    """
+    now_local_naive = pd.Timestamp(utc_to_local(datetime.now(tz.utc)).replace(tzinfo=None))
+    errors = pd.Series([None] * len(timestamps), index=timestamps.index, dtype=object)
+
+    errors[timestamps.isna()] = "Invalid timestamp"
+    errors[timestamps > now_local_naive] = "Cannot record future timestamps"
+
+    return errors
+
+
 def validate_required_field(value: str, field_name: str = "Field") -> Tuple[bool, Optional[str]]:
     """
     Validate that a required field is not empty.